@@ -0,0 +1,177 @@
+"""
+Validation en ligne de commande (sans interface) de livraisons GeoPackage.
+
+    python -m VERIF_INFRA.cli livraison1.gpkg livraison2.gpkg dossier/ --processus 8 --sortie rapports/
+
+Chaque fichier est contrôlé par les mêmes analyses que TOTAL CONTROL (paramètres
+par défaut, aucune écriture) dans un processus séparé ; un rapport JSON
+<nom du fichier>.verif.json est écrit pour chacun. Avec --export, les constats
+sont aussi écrits, contrôle par contrôle, dans <nom du fichier>.erreurs.gpkg / .csv.
+Avec --profil, les mesures de chaque contrôle (cf. profiling.py) sont ajoutées à
+<nom du fichier>.profil.jsonl ; --cprofile NOM capture en plus l'analyse d'un contrôle.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+from contextlib import closing
+
+from qgis.core import QgsApplication, QgsVectorLayer
+
+from .main import MonPlugin
+from .scheduler import CONTROLES, executer_une
+from .snapshot import ProjectSnapshot
+from .export import ExportConstats
+from .results import constats_resultat
+from .profiling import activer as activer_profilage, desactiver as desactiver_profilage
+from .endpoints import COUCHES_NOEUDS
+from .graph import COUCHES_ARETES
+
+
+# Sans arbre des couches, les groupes sont déduits des noms de couches
+GROUPES_GPKG = {
+    'Infrastructure': COUCHES_NOEUDS + COUCHES_ARETES + ['Batiment'],
+    'Cuivre': ['Cable Cuivre', 'SR', 'Manchon', 'PC'],
+    'Fibre Optique': ['Cable Fo', 'SRO', 'Closer', 'BPE', 'PCO'],
+}
+
+# Paramètres utilisés à la place des saisies utilisateur (parametres_X)
+PARAMETRES_DEFAUT = {
+    "accrochage_lignes_points": ("Infrastructure", MonPlugin.GROUPES_ACCROCHAGE["Infrastructure"]),
+}
+
+_application = None  # une QgsApplication sans interface par processus
+
+
+def _demarrer_qgis():
+    global _application
+    if _application is None:
+        _application = QgsApplication([], False)
+        _application.initQgis()
+
+
+def tables_geopackage(chemin):
+    """Noms des tables d'entités et d'attributs déclarées dans gpkg_contents."""
+    with closing(sqlite3.connect(chemin)) as connexion:
+        lignes = connexion.execute(
+            "SELECT table_name FROM gpkg_contents WHERE data_type IN ('features', 'attributes')"
+        ).fetchall()
+    return [nom for (nom,) in lignes]
+
+
+def ouvrir_geopackage(chemin):
+    """Couches valides du GeoPackage et leur répartition par groupe (cf. GROUPES_GPKG)."""
+    layers = []
+    for nom in tables_geopackage(chemin):
+        layer = QgsVectorLayer(f"{chemin}|layername={nom}", nom, "ogr")
+        if layer.isValid():
+            layers.append(layer)
+    groupes = {groupe: [layer for layer in layers if layer.name() in noms]
+               for groupe, noms in GROUPES_GPKG.items()}
+    return layers, groupes
+
+
+def valider_fichier(chemin, sortie=None, exporter=False, profil=False, cprofile=None):
+    """Contrôle un GeoPackage et écrit son rapport JSON ; retourne (chemin du rapport, nb d'échecs)."""
+    _demarrer_qgis()
+    rapport = {"fichier": os.path.abspath(chemin), "couches": {}, "controles": []}
+    echecs = 0
+    dossier = sortie or os.path.dirname(os.path.abspath(chemin))
+    nom_fichier = os.path.splitext(os.path.basename(chemin))[0]
+    export = None
+    if profil:
+        rapport["profil"] = os.path.join(dossier, nom_fichier + ".profil.jsonl")
+        activer_profilage(rapport["profil"], cprofile, remettre_pic=True)  # processus dédié
+    try:
+        layers, groupes = ouvrir_geopackage(chemin)
+        rapport["couches"] = {layer.name(): layer.featureCount() for layer in layers}
+        snap = ProjectSnapshot(layers=layers, groupes=groupes)
+        plugin = MonPlugin(None)
+        if exporter:
+            export = ExportConstats(dossier, nom_fichier + ".erreurs", snap=snap)
+        for nom in CONTROLES:
+            _, resultat, erreur = executer_une(nom, getattr(plugin, "analyse_" + nom),
+                                               snap, PARAMETRES_DEFAUT.get(nom))
+            rapport["controles"].append(_controle_json(nom, resultat, erreur))
+            echecs += erreur is not None
+            if export is not None and resultat is not None:
+                export.ajouter(constats_resultat(nom, resultat))
+    except Exception as e:
+        rapport["erreur"] = str(e)
+        echecs += 1
+    finally:
+        desactiver_profilage()
+        if export is not None:
+            export.fermer()
+            rapport["export"] = {"gpkg": export.chemin_gpkg, "csv": export.chemin_csv, "constats": export.ecrits}
+
+    chemin_rapport = os.path.join(dossier, nom_fichier + ".verif.json")
+    with open(chemin_rapport, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=2)
+    return chemin_rapport, echecs
+
+
+def _controle_json(nom, resultat, erreur):
+    if resultat is None:
+        return {"controle": nom, "erreur": erreur}
+    selections = {layer.name(): sorted(fids) for layer, fids in resultat.selections.items() if fids}
+    return {
+        "controle": nom,
+        "titre": resultat.titre,
+        "niveau": resultat.niveau,
+        "message": resultat.message,
+        "entites": sum(len(fids) for fids in selections.values()),
+        "selections": selections,
+    }
+
+
+def _valider(args):
+    return valider_fichier(*args)
+
+
+def lister_fichiers(chemins):
+    fichiers = []
+    for chemin in chemins:
+        if os.path.isdir(chemin):
+            fichiers.extend(sorted(glob.glob(os.path.join(chemin, "*.gpkg"))))
+        else:
+            fichiers.append(chemin)
+    return fichiers
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VERIF'INFRA : validation de GeoPackages sans interface.")
+    parser.add_argument("chemins", nargs="+", help="fichiers .gpkg ou dossiers les contenant")
+    parser.add_argument("--sortie", help="dossier des rapports JSON (par défaut : à côté de chaque fichier)")
+    parser.add_argument("--export", action="store_true",
+                        help="écrire aussi les constats dans <fichier>.erreurs.gpkg et .csv")
+    parser.add_argument("--profil", action="store_true",
+                        help="mesurer chaque contrôle (temps, lectures, prédicats, mémoire) dans <fichier>.profil.jsonl")
+    parser.add_argument("--cprofile", choices=CONTROLES, help="capturer aussi l'analyse de ce contrôle avec cProfile")
+    parser.add_argument("--processus", type=int, default=os.cpu_count() or 1,
+                        help="nombre de fichiers contrôlés en parallèle")
+    args = parser.parse_args(argv)
+
+    fichiers = lister_fichiers(args.chemins)
+    if not fichiers:
+        parser.error("aucun GeoPackage trouvé")
+    if args.sortie:
+        os.makedirs(args.sortie, exist_ok=True)
+
+    # spawn : chaque processus démarre sa propre QgsApplication (pas d'état Qt hérité par fork)
+    contexte = multiprocessing.get_context("spawn")
+    taches = [(chemin, args.sortie, args.export, args.profil or bool(args.cprofile), args.cprofile)
+              for chemin in fichiers]
+    total_echecs = 0
+    with contexte.Pool(processes=max(1, min(args.processus, len(fichiers)))) as pool:
+        for chemin_rapport, echecs in pool.imap_unordered(_valider, taches):
+            total_echecs += echecs
+            print(f"{'❌' if echecs else '✅'} {chemin_rapport}")
+    return 1 if total_echecs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+from .nulls import est_vide
+
+
+# ============================================================
+# Compatibilité TYPE CPS (Canalisation) / TYPE (Chambre).
+# La table de référence est compilée une fois, à l'import, en ensembles figés
+# de types normalisés (majuscules, espaces réduits) : "Caniveau type A" et
+# "CANIVEAU TYPE A" désignent la même chambre.
+# ============================================================
+
+# Dictionnaire complet des connexions autorisées
+CONNEXION_VALIDE = {
+    "CPS1": ["CANIVEAU TYPE A", "CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2","PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC","PNP6", "PNP6C"],
+    "CPS1M": ["CANIVEAU TYPE A", "CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2",
+            "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER","PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+    "CPS1L": ["CANIVEAU TYPE A", "CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2","PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC","PNP6", "PNP6C"],
+    "CPS2": ["CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2",
+            "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+    "CPS2M": ["CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2",
+            "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+    "CPS2L": ["PNS1","PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
+            "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
+            "PNP5L", "PNP5LC", "PNP6", "PNP6C", "CANIVEAU TYPE B"],
+    "CPS4": ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
+            "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
+            "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
+    "CPS4L": ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
+            "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
+            "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
+    "CPS4LBis": ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
+                "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
+                "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
+    "CPS4M": ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
+                "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
+                "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
+    "CPS6"  :   ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
+                "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
+                "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
+
+    "CPS6L"  :   ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
+                "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
+                "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
+
+    "CPS6M"  :   ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
+                "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
+                "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
+
+    "CPP9": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+    "CPP9AC": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+
+    "CPP9Bis": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+                "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+                "PNP6", "PNP6C"],
+    "CPP12": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+    "CPP12A.L": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+
+    "CPP12A.M": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+
+    "CPP15B.L": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+
+    "CPP15B.M": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"],
+
+    "CPP20" : ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP20B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP20B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP25": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP25B.L":  ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP25B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP30": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP30B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP30B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP35": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP35B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP35B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP42": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP42B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP42B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP49": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP49B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+    "CPP49B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
+
+    "Buse de 10": ["Caniveau type A", "Caniveau type B", "PNS1", "PNS2", "PNS2C",
+                "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+                "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L",
+                "PNP5LC", "PNP6", "PNP6C"],
+
+    "Buse de 15": ["Caniveau type A", "Caniveau type B", "PNS1", "PNS2", "PNS2C",
+                "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+                "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L",
+                "PNP5LC", "PNP6", "PNP6C"],
+
+    "Buse de 20": ["Caniveau type A", "Caniveau type B", "PNS1", "PNS2", "PNS2C",
+                "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+                "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L",
+                "PNP5LC", "PNP6", "PNP6C"],
+
+    "Buse de 30": ["Caniveau type A", "Caniveau type B", "PNS1", "PNS2", "PNS2C",
+                "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+                "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L",
+                "PNP5LC", "PNP6", "PNP6C"],
+
+    "Basement 5": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
+            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
+            "PNP6", "PNP6C"], #aucune source je précise, c'est moi, Sylvius j'ai pris cet engagement en me basant que le CPP9 comme c'était le CPP9 on prenaait avant à la place de Basement 5
+}
+
+
+def normaliser_type(valeur):
+    """Type en majuscules, espaces de bord retirés et espaces internes réduits ; '' si vide."""
+    if est_vide(valeur):
+        return ""
+    return " ".join(str(valeur).split()).upper()
+
+
+COMPATIBILITES = {
+    normaliser_type(cps): frozenset(normaliser_type(t) for t in types)
+    for cps, types in CONNEXION_VALIDE.items()
+}
+
+
+def chambres_autorisees(type_cps):
+    """Types de chambre (normalisés) acceptés pour un TYPE CPS, ou None si le type est inconnu."""
+    return COMPATIBILITES.get(normaliser_type(type_cps))
+
+
+# FONCTION attendue d'une chambre selon son nombre de canalisations Distribution
+FONCTIONS_PAR_DEGRE = {
+    1: "Chambre de Terminaison",
+    2: "Chambre de tirage",
+}
+FONCTION_RACCORDEMENT = "Chambre de raccordement"  # 3 canalisations Distribution et plus
+
+
+def fonction_attendue(degre):
+    """FONCTION attendue pour `degre` canalisations Distribution, ou None si aucune."""
+    if degre <= 0:
+        return None
+    return FONCTIONS_PAR_DEGRE.get(degre, FONCTION_RACCORDEMENT)
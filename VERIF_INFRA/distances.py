@@ -0,0 +1,76 @@
+import math
+
+from .metric import paires_voisines, haversine
+
+
+# ============================================================
+# Moteur de distances minimales : les points sont projetés une seule fois
+# dans un repère métrique local (LayerSnapshot.metric_points), une grille
+# donne les paires candidates, et la distance exacte (géodésique pour une
+# couche géographique) n'est calculée que pour ces candidates.
+# ============================================================
+
+# Marge sur la grille pour ne perdre aucune paire entre repère local et distance géodésique
+_MARGE_GRILLE = 1.01
+
+
+def distance_m(couche, points_m, fid1, fid2):
+    """Distance en mètres entre deux points d'un LayerSnapshot.
+
+    points_m : couche.metric_points(), récupéré une fois par l'appelant avant sa boucle.
+    """
+    if couche.geographique:
+        p1, p2 = couche.points[fid1], couche.points[fid2]
+        return haversine(p1.x(), p1.y(), p2.x(), p2.y())
+    (x1, y1), (x2, y2) = points_m[fid1], points_m[fid2]
+    return math.hypot(x1 - x2, y1 - y2)
+
+
+# ============================================================
+# Évaluation groupée : toutes les règles d'une même couche sont testées
+# pendant un seul balayage de voisinage (rayon = plus grande distance).
+# ============================================================
+
+
+def regrouper_regles(distance_rules):
+    """{nom_couche: [(dist_min, types ou None)]} à partir des règles intra-couche.
+
+    Format d'une règle : (NomCouche, NomCouche, DistMin_mètres[, TypeVal1, TypeVal2]).
+    """
+    regles = {}
+    for lay_name1, lay_name2, dist_min, *type_vals in distance_rules:
+        if lay_name1 != lay_name2:
+            continue  # On traite uniquement distances intra-couche ici
+        types = frozenset(type_vals) if len(type_vals) == 2 else None
+        regles.setdefault(lay_name1, []).append((dist_min, types))
+    return regles
+
+
+def violations_regles(couche, regles):
+    """[(fid1, fid2, distance, dist_min)] pour toutes les règles d'une couche, en un seul balayage.
+
+    Une règle typée ne s'applique que si le TYPE des deux points fait partie de ses types.
+    """
+    if not regles:
+        return []
+    points_m = couche.metric_points()
+    type_de = {}
+    if any(types is not None for _, types in regles):
+        type_de = {fid: couche.valeur(fid, "TYPE") for fid in points_m}
+        if all(types is not None for _, types in regles):
+            # Seuls les points concernés par au moins une règle entrent dans la grille
+            tous_types = frozenset().union(*(types for _, types in regles))
+            points_m = {fid: xy for fid, xy in points_m.items() if type_de[fid] in tous_types}
+
+    rayon = max(dist_min for dist_min, _ in regles)
+    violations = []
+    for fid1, fid2 in paires_voisines(points_m, rayon * _MARGE_GRILLE):
+        distance = None
+        for dist_min, types in regles:
+            if types is not None and (type_de[fid1] not in types or type_de[fid2] not in types):
+                continue
+            if distance is None:
+                distance = distance_m(couche, points_m, fid1, fid2)
+            if distance < dist_min:
+                violations.append((fid1, fid2, distance, dist_min))
+    return violations
@@ -0,0 +1,116 @@
+from collections import defaultdict
+
+from .metric import paires_voisines, projeter_local
+
+
+# ============================================================
+# Moteur de doublons ponctuels : toutes les couches en un seul tableau.
+# Deux points sont rapprochés s'ils ont les mêmes coordonnées (un seul tri
+# du tableau) ou s'ils sont à moins de la tolérance métrique de leur couche
+# (grille commune à toutes les couches). Les paires d'une même couche sont
+# regroupées de proche en proche (union-find) en doublons internes ; les
+# paires entre couches différentes sont les superpositions interdites.
+# ============================================================
+
+# Tolérance (mètres) sous laquelle deux points sont des doublons ;
+# 0 : seules les coordonnées identiques comptent (mode exact)
+TOLERANCES_DOUBLONS = {
+    "Chambre": 0.10,
+    "Poteau": 0.10,
+    "Point Technique": 0.05,
+}
+TOLERANCE_DOUBLON_DEFAUT = 0
+
+
+def detecter_doublons(couches, tolerances, exceptions_par_paires=(), precision=5):
+    """Doublons et superpositions de points sur un ensemble de couches ponctuelles.
+
+    couches : liste de LayerSnapshot ponctuels, dans un même SCR (ValueError sinon).
+    tolerances : tolérance en mètres de chaque couche (même ordre que `couches`).
+      Entre deux couches, la plus grande des deux tolérances s'applique. Avec une tolérance
+      nulle, seules les coordonnées identiques (arrondies à `precision` décimales) comptent ;
+      sinon seule la distance métrique est testée (en degrés, l'arrondi ferait ~1 m).
+    exceptions_par_paires : paires de noms de couches autorisées à se superposer.
+    Retourne (doublons, superpositions) :
+      doublons       : [(index_couche, [fids])]   groupes de points proches dans une même couche
+      superpositions : [(index_couche1, fid1, index_couche2, fid2)]   entre deux couches
+    """
+    if any(couche.crs != couches[0].crs for couche in couches[1:]):
+        raise ValueError("Doublons ponctuels : toutes les couches doivent être dans le même SCR.")
+    exceptions = set()
+    for nom1, nom2 in exceptions_par_paires:
+        exceptions.add((nom1, nom2))
+        exceptions.add((nom2, nom1))
+
+    paires = set(_paires_exactes(couches, [t <= 0 for t in tolerances], precision))
+    rayon = max(tolerances, default=0)
+    if rayon > 0:
+        points_m = projeter_local(
+            {(code, fid): pt for code, couche in enumerate(couches) for fid, pt in couche.points.items()},
+            couches[0].geographique,
+        )
+        for a, b in paires_voisines(points_m, rayon):
+            tolerance = max(tolerances[a[0]], tolerances[b[0]])
+            if tolerance < rayon:
+                (xa, ya), (xb, yb) = points_m[a], points_m[b]
+                if (xa - xb) ** 2 + (ya - yb) ** 2 > tolerance * tolerance:
+                    continue
+            paires.add((a, b) if a < b else (b, a))
+
+    # Doublons internes : groupes de proche en proche
+    parent = {}
+
+    def racine(point):
+        parent.setdefault(point, point)
+        while parent[point] != point:
+            parent[point] = parent[parent[point]]  # compression de chemin
+            point = parent[point]
+        return point
+
+    for a, b in paires:
+        if a[0] == b[0]:
+            ra, rb = racine(a), racine(b)
+            if ra != rb:
+                parent[rb] = ra
+
+    groupes = defaultdict(list)
+    for point in parent:
+        groupes[racine(point)].append(point[1])
+    doublons = sorted((tete[0], sorted(fids)) for tete, fids in groupes.items())
+
+    # Les entités déjà en doublon dans leur couche ne sont pas reprises en superposition
+    superpositions = []
+    for a, b in sorted(paires):
+        if a[0] == b[0] or a in parent or b in parent:
+            continue
+        if (couches[a[0]].nom, couches[b[0]].nom) in exceptions:
+            continue
+        superpositions.append((a[0], a[1], b[0], b[1]))
+    return doublons, superpositions
+
+
+def _paires_exactes(couches, exactes, precision):
+    """Paires ((code, fid), (code, fid)) de points aux coordonnées identiques (arrondies).
+
+    Seules les couches en mode exact (exactes[code]) sont prises en compte.
+    """
+    tableau = []
+    for code, couche in enumerate(couches):
+        if not exactes[code]:
+            continue
+        for fid, pt in couche.points.items():
+            tableau.append((round(pt.x(), precision), round(pt.y(), precision), code, fid))
+    tableau.sort()
+
+    n = len(tableau)
+    debut = 0
+    while debut < n:
+        x, y = tableau[debut][0], tableau[debut][1]
+        fin = debut + 1
+        while fin < n and tableau[fin][0] == x and tableau[fin][1] == y:
+            fin += 1
+        groupe = [(code, fid) for _, _, code, fid in tableau[debut:fin]]
+        for i, a in enumerate(groupe):
+            for b in groupe[i + 1:]:
+                yield a, b
+        debut = fin
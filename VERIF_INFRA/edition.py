@@ -0,0 +1,59 @@
+# ============================================================
+# Écritures groupées : une seule commande d'édition par couche au lieu d'une
+# session par entité et par champ. Les valeurs passent toujours par le tampon
+# d'édition de la couche : annulables, et signalées (attributeValueChanged)
+# au suivi des modifications (incremental.py).
+# ============================================================
+
+
+def ecrire_attributs(layer, changements, libelle="VERIF'INFRA"):
+    """Applique {fid: {index du champ: valeur}} en une seule commande d'édition ; True si réussi.
+
+    Couche hors édition : une session est ouverte pour l'occasion puis enregistrée.
+    Couche déjà en édition : les valeurs restent dans le tampon de l'utilisateur, avec
+    ses propres modifications en cours, sans rien enregistrer à sa place.
+    """
+    if not changements:
+        return True
+    ouverte_ici = not layer.isEditable()
+    if ouverte_ici and not layer.startEditing():
+        return False
+    layer.beginEditCommand(libelle)
+    ok = True
+    for fid, valeurs in changements.items():
+        ok = layer.changeAttributeValues(fid, valeurs) and ok
+    if not ok:
+        layer.destroyEditCommand()
+        if ouverte_ici:
+            layer.rollBack()
+        return False
+    layer.endEditCommand()
+    if ouverte_ici:
+        return layer.commitChanges()
+    return True
+
+
+def ecrire_valeurs(couche, nouvelles, libelle="VERIF'INFRA"):
+    """Écrit {fid: {champ: valeur}} dans la couche d'un LayerSnapshot chargé.
+
+    Seules les valeurs différentes des valeurs actuelles sont envoyées, en une seule
+    commande d'édition (ecrire_attributs). Retourne le nombre d'entités modifiées,
+    ou None si l'écriture a échoué.
+    """
+    index = {}
+    changements = {}
+    for fid, valeurs in nouvelles.items():
+        feat = couche.features.get(fid)
+        if feat is None:
+            continue
+        modifiees = {}
+        for champ, valeur in valeurs.items():
+            if feat[champ] != valeur:
+                if champ not in index:
+                    index[champ] = couche.fields.indexFromName(champ)
+                modifiees[index[champ]] = valeur
+        if modifiees:
+            changements[fid] = modifiees
+    if not ecrire_attributs(couche.layer, changements, libelle):
+        return None
+    return len(changements)
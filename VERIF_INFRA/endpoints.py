@@ -0,0 +1,65 @@
+import math
+
+from . import profiling
+
+
+# Couches ponctuelles servant de nœuds du réseau Infrastructure
+COUCHES_NOEUDS = ['Chambre', 'Point Technique', 'Poteau', 'Site', 'Point GC']
+
+# Même marge que l'égalité de QgsPointXY (qgsDoubleNear 1E-8)
+TOLERANCE_NOEUD = 1e-8
+
+
+class EndpointIndex:
+    """Grille de hachage des nœuds : « quel(s) point(s) se trouve(nt) à cette extrémité ? » en O(1).
+
+    Avec une tolérance nulle la clé est la coordonnée exacte ; sinon la grille a des
+    cellules de la taille de la tolérance et la recherche regarde les 9 cellules voisines.
+    """
+
+    def __init__(self, tolerance=TOLERANCE_NOEUD):
+        self.tolerance = tolerance
+        self._grille = {}  # clé -> [(ordre, nom_couche, fid, x, y)]
+        self._ordre = 0
+
+    def _cle(self, x, y):
+        if self.tolerance > 0:
+            return (math.floor(x / self.tolerance), math.floor(y / self.tolerance))
+        return (x, y)
+
+    def add(self, nom_couche, fid, pt):
+        x, y = pt.x(), pt.y()
+        self._grille.setdefault(self._cle(x, y), []).append((self._ordre, nom_couche, fid, x, y))
+        self._ordre += 1
+
+    def add_layer(self, couche):
+        """Ajoute tous les points d'un LayerSnapshot."""
+        for fid, pt in couche.points.items():
+            self.add(couche.nom, fid, pt)
+
+    def nodes_at(self, pt, layers=None):
+        """Liste des (nom_couche, fid) situés sur `pt`, dans l'ordre d'ajout des couches.
+
+        `layers` : ensemble optionnel de noms de couches auxquelles limiter la recherche.
+        """
+        if profiling.actif:
+            profiling.compter("requetes_index")
+        x, y = pt.x(), pt.y()
+        if self.tolerance > 0:
+            cx, cy = self._cle(x, y)
+            tol2 = self.tolerance * self.tolerance
+            trouves = []
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for entree in self._grille.get((cx + dx, cy + dy), ()):
+                        if (entree[3] - x) ** 2 + (entree[4] - y) ** 2 <= tol2:
+                            trouves.append(entree)
+            trouves.sort()
+        else:
+            trouves = self._grille.get((x, y), ())
+        return [(nom, fid) for _, nom, fid, _, _ in trouves if layers is None or nom in layers]
+
+    def first_at(self, pt, layers=None):
+        """Premier (nom_couche, fid) trouvé sur `pt`, ou None."""
+        noeuds = self.nodes_at(pt, layers)
+        return noeuds[0] if noeuds else None
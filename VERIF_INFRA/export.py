@@ -0,0 +1,204 @@
+import csv
+import os
+from collections import defaultdict
+from datetime import datetime
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (
+    QgsApplication, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsFeature,
+    QgsFeatureRequest, QgsField, QgsFields, QgsGeometry, QgsProject, QgsVectorFileWriter,
+    QgsVectorLayer, QgsWkbTypes
+)
+
+
+# ============================================================
+# Export des constats sur disque, au fil de l'eau.
+# Un GeoPackage (couche erreurs_points, couche erreurs_lignes) et un CSV sont
+# créés pour une exécution ; les constats y sont ajoutés par lots d'au plus
+# TAILLE_LOT, depuis la tâche, à mesure que chaque contrôle se termine : seules
+# les entités d'export du lot en cours sont préparées (les constats eux-mêmes
+# restent portés par les Resultat jusqu'aux rapports). Chaque lot ouvre les
+# couches du GeoPackage et les referme aussitôt : aucun objet QGIS de l'export
+# ne survit au thread qui a écrit. Les géométries sont reprises de
+# l'instantané de l'exécution (entités déjà lues), sinon lues par identifiant
+# depuis sa source, jamais depuis la couche. Les polygones
+# sont exportés par un point intérieur, les entités sans géométrie (fantômes)
+# dans la couche de points, géométrie vide.
+# ============================================================
+
+TAILLE_LOT = 1000
+
+COUCHE_POINTS = "erreurs_points"
+COUCHE_LIGNES = "erreurs_lignes"
+
+# "fid" est réservé par le GeoPackage : l'identifiant de l'entité contrôlée est fid_entite
+COLONNES_CSV = ["controle", "couche", "fid_entite", "niveau", "message", "x", "y"]
+
+
+def champs_constats():
+    champs = QgsFields()
+    champs.append(QgsField("controle", QVariant.String))
+    champs.append(QgsField("couche", QVariant.String))
+    champs.append(QgsField("fid_entite", QVariant.LongLong))
+    champs.append(QgsField("niveau", QVariant.String))
+    champs.append(QgsField("message", QVariant.String))
+    return champs
+
+
+def dossier_export():
+    """Dossier 'verif_infra' à côté du projet, ou dans le profil QGIS si le projet n'est pas enregistré."""
+    base = QgsProject.instance().homePath() or QgsApplication.qgisSettingsDirPath()
+    return os.path.join(base, "verif_infra")
+
+
+class ExportConstats:
+    """GeoPackage + CSV des constats d'une exécution, alimentés par lots, depuis un seul thread à la fois.
+
+    snap : ProjectSnapshot de l'exécution, d'où sont reprises les géométries.
+    creer_vide=False : aucun fichier n'est créé si l'exécution ne produit aucun constat.
+    """
+
+    def __init__(self, dossier, nom=None, crs=None, taille_lot=TAILLE_LOT, snap=None, creer_vide=True):
+        nom = nom or datetime.now().strftime("constats_%Y%m%d_%H%M%S")
+        self.dossier = dossier
+        self.chemin_gpkg = os.path.join(dossier, nom + ".gpkg")
+        self.chemin_csv = os.path.join(dossier, nom + ".csv")
+        self.crs = crs
+        self.taille_lot = taille_lot
+        self.snap = snap
+        self.creer_vide = creer_vide
+        self.ecrits = 0
+        self._lot = []
+        self._champs = champs_constats()
+        self._cree = False    # couches du GeoPackage créées (au premier lot)
+        self._transformations = {}
+        self._fichier_csv = None
+        self._csv = None
+        if creer_vide:
+            self._ouvrir_csv()
+
+    def ajouter(self, constats):
+        """Ajoute des Constat publiés ; écrit chaque fois qu'un lot est plein."""
+        for constat in constats:
+            self._lot.append(constat)
+            if len(self._lot) >= self.taille_lot:
+                self.vider()
+
+    def vider(self):
+        """Écrit le lot en cours."""
+        lot, self._lot = self._lot, []
+        if not lot:
+            return
+        par_couche = defaultdict(list)
+        for constat in lot:
+            par_couche[constat.couche].append(constat)
+
+        ecrivain_csv = self._ouvrir_csv()
+        entites = {"points": [], "lignes": []}
+        for layer, constats in par_couche.items():
+            geometries = self._geometries(layer, [c.fid for c in constats])
+            nom_couche = "(couche supprimée)" if sip.isdeleted(layer) else layer.name()
+            for constat in constats:
+                cible, geom = self._preparer(geometries.get(constat.fid))
+                feat = QgsFeature(self._champs)
+                feat.setAttributes([constat.controle, nom_couche, constat.fid, constat.niveau, constat.message])
+                if geom is not None:
+                    feat.setGeometry(geom)
+                entites[cible].append(feat)
+                x = y = ""
+                if geom is not None:
+                    pt = geom.pointOnSurface().asPoint()
+                    x, y = pt.x(), pt.y()
+                ecrivain_csv.writerow([constat.controle, nom_couche, constat.fid, constat.niveau, constat.message, x, y])
+
+        self._creer()
+        for cible, feats in entites.items():
+            if feats:
+                nom = COUCHE_LIGNES if cible == "lignes" else COUCHE_POINTS
+                couche = QgsVectorLayer(f"{self.chemin_gpkg}|layername={nom}", nom, "ogr")
+                couche.dataProvider().addFeatures(feats)
+                del couche  # refermée dans le thread qui écrit
+        self._fichier_csv.flush()
+        self.ecrits += len(lot)
+
+    def fermer(self):
+        self.vider()
+        if self.creer_vide:
+            self._creer()  # GeoPackage créé même sans constat
+        if self._fichier_csv is not None:
+            self._fichier_csv.close()
+
+    # ---------- interne ----------
+
+    def _ouvrir_csv(self):
+        if self._csv is None:
+            os.makedirs(self.dossier, exist_ok=True)
+            self._fichier_csv = open(self.chemin_csv, "w", newline="", encoding="utf-8")
+            self._csv = csv.writer(self._fichier_csv, delimiter=";")
+            self._csv.writerow(COLONNES_CSV)
+        return self._csv
+
+    def _entites(self, layer, fids):
+        """Entités `fids` : celles de l'instantané si la couche y est lue, sinon une requête sur sa source."""
+        couche = self.snap.get(layer, charger=False) if self.snap is not None else None
+        if couche is not None and couche.charge:
+            return (couche.features[fid] for fid in fids if fid in couche.features)
+        requete = QgsFeatureRequest().setFilterFids(list(fids)).setNoAttributes()
+        if couche is not None:
+            return couche.source.getFeatures(requete) if couche.source is not None else ()
+        return layer.getFeatures(requete)
+
+    def _geometries(self, layer, fids):
+        """{fid: géométrie dans le SCR d'export} des entités `fids` d'une couche."""
+        if sip.isdeleted(layer):
+            return {}
+        if self.crs is None:
+            self.crs = layer.crs()
+        transformation = self._transformations.get(layer.id())
+        if transformation is None and layer.crs() != self.crs:
+            transformation = self._transformations[layer.id()] = QgsCoordinateTransform(
+                layer.crs(), self.crs, QgsProject.instance())
+        geometries = {}
+        for feat in self._entites(layer, fids):
+            geom = feat.geometry()
+            if geom is None or geom.isEmpty():
+                continue
+            geom = QgsGeometry(geom)
+            if transformation is not None:
+                geom.transform(transformation)
+            geometries[feat.id()] = geom
+        return geometries
+
+    def _preparer(self, geom):
+        """(couche cible, géométrie 2D multi-parties ou None)."""
+        if geom is None:
+            return "points", None
+        type_geom = QgsWkbTypes.geometryType(geom.wkbType())
+        if type_geom == QgsWkbTypes.PolygonGeometry:
+            geom = geom.pointOnSurface()
+        elif type_geom not in (QgsWkbTypes.PointGeometry, QgsWkbTypes.LineGeometry):
+            return "points", None
+        cible = "lignes" if type_geom == QgsWkbTypes.LineGeometry else "points"
+        geom.get().dropZValue()
+        geom.get().dropMValue()
+        geom.convertToMultiType()
+        return cible, geom
+
+    def _creer(self):
+        if self._cree:
+            return
+        os.makedirs(self.dossier, exist_ok=True)
+        crs = self.crs or QgsCoordinateReferenceSystem()
+        for nom, type_wkb in ((COUCHE_POINTS, QgsWkbTypes.MultiPoint), (COUCHE_LIGNES, QgsWkbTypes.MultiLineString)):
+            options = QgsVectorFileWriter.SaveVectorOptions()
+            options.driverName = "GPKG"
+            options.layerName = nom
+            if os.path.exists(self.chemin_gpkg):
+                options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
+            ecrivain = QgsVectorFileWriter.create(self.chemin_gpkg, self._champs, type_wkb, crs,
+                                                  QgsProject.instance().transformContext(), options)
+            if ecrivain.hasError() != QgsVectorFileWriter.NoError:
+                raise IOError(f"{self.chemin_gpkg} : {ecrivain.errorMessage()}")
+            del ecrivain  # ferme la couche vide ; les lots sont ajoutés par le fournisseur
+        self._cree = True
@@ -0,0 +1,108 @@
+from collections import Counter
+
+from .endpoints import COUCHES_NOEUDS
+
+
+# Couches linéaires servant d'arêtes du réseau Infrastructure
+COUCHES_ARETES = ['Canalisation', 'Support', 'Tranchee']
+
+# Connexions ignorées : une Canalisation ne s'accroche jamais sur un Point GC
+CONNEXIONS_EXCLUES = {
+    'Canalisation': {'Point GC'},
+}
+
+
+class NetworkGraph:
+    """Graphe du réseau construit une fois par exécution.
+
+    Nœud = (nom_couche, fid) d'une entité ponctuelle, arête = (nom_couche, fid)
+    d'une entité linéaire reliant les nœuds trouvés à ses deux extrémités.
+    """
+
+    def __init__(self):
+        self.noeuds = {}      # noeud -> {arete: None} (dict ordonné utilisé comme ensemble)
+        self.aretes = {}      # arete -> (noeuds au début, noeuds à la fin)
+
+    @classmethod
+    def build(cls, snap, noeuds=COUCHES_NOEUDS, aretes=COUCHES_ARETES):
+        graphe = cls()
+        index = snap.endpoint_index(noeuds)
+        for nom in noeuds:
+            couche = snap.get(nom)
+            if couche is not None:
+                for fid in couche.points:
+                    graphe.add_node((couche.nom, fid))
+        for nom in aretes:
+            couche = snap.get(nom)
+            if couche is None:
+                continue
+            exclues = CONNEXIONS_EXCLUES.get(couche.nom, set())
+            autorisees = {n for n in noeuds if n not in exclues} if exclues else None
+            for fid, (debut, fin) in couche.extremites.items():
+                graphe.add_edge((couche.nom, fid),
+                                index.nodes_at(debut, autorisees),
+                                index.nodes_at(fin, autorisees))
+        return graphe
+
+    def add_node(self, noeud):
+        self.noeuds.setdefault(noeud, {})
+
+    def add_edge(self, arete, noeuds_debut, noeuds_fin):
+        self.aretes[arete] = (tuple(noeuds_debut), tuple(noeuds_fin))
+        for noeud in (*noeuds_debut, *noeuds_fin):
+            self.noeuds.setdefault(noeud, {})[arete] = None
+
+    # ---------- requêtes ----------
+
+    def ends(self, arete):
+        """(noeuds au début, noeuds à la fin) d'une arête ; tuples vides si non accrochée."""
+        return self.aretes.get(arete, ((), ()))
+
+    def end_node(self, arete, extremite, couches=None):
+        """Premier nœud (optionnellement limité aux `couches`) à l'extrémité 0 (début) ou 1 (fin)."""
+        for noeud in self.ends(arete)[extremite]:
+            if couches is None or noeud[0] in couches:
+                return noeud
+        return None
+
+    def edges(self, noeud, couches=None, filtre=None):
+        """Arêtes incidentes à un nœud, limitées aux couches et/ou à un prédicat filtre(arete)."""
+        return [a for a in self.noeuds.get(noeud, ())
+                if (couches is None or a[0] in couches) and (filtre is None or filtre(a))]
+
+    def degree(self, noeud, couches=None, filtre=None):
+        return len(self.edges(noeud, couches, filtre))
+
+    def neighbours(self, noeud):
+        voisins = {}
+        for arete in self.noeuds.get(noeud, ()):
+            for autre in (*self.aretes[arete][0], *self.aretes[arete][1]):
+                if autre != noeud:
+                    voisins[autre] = None
+        return list(voisins)
+
+    def neighbour_types(self, noeud):
+        """Compte des voisins par couche, ex. Counter({'Chambre': 2, 'Poteau': 1})."""
+        return Counter(voisin[0] for voisin in self.neighbours(noeud))
+
+    def isolated_nodes(self):
+        return [noeud for noeud, aretes in self.noeuds.items() if not aretes]
+
+    def connected_components(self):
+        """Liste des composantes connexes (listes de nœuds), parcours en largeur."""
+        vus = set()
+        composantes = []
+        for depart in self.noeuds:
+            if depart in vus:
+                continue
+            vus.add(depart)
+            composante = [depart]
+            i = 0
+            while i < len(composante):
+                for voisin in self.neighbours(composante[i]):
+                    if voisin not in vus:
+                        vus.add(voisin)
+                        composante.append(voisin)
+                i += 1
+            composantes.append(composante)
+        return composantes
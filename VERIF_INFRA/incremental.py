@@ -0,0 +1,243 @@
+import math
+import threading
+from collections import defaultdict, namedtuple
+
+from qgis.core import QgsFeatureRequest, QgsRectangle
+
+from .metric import metres_en_unites
+from .scheduler import ECRITURES, couches_lues
+from .tasks import Resultat
+
+
+# ============================================================
+# Revalidation incrémentale.
+# Les signaux d'édition des couches suivies (ajout, suppression, géométrie,
+# attribut) alimentent un journal d'entités modifiées. À la relance d'un
+# contrôle déjà exécuté, seules sont relues :
+#   zone     : anciennes et nouvelles emprises des entités modifiées (+ marge)
+#   coeur    : entités des couches lues par le contrôle qui touchent la zone
+#   contexte : coeur + voisines de ses entités (lignes accrochées, points proches)
+# Le contrôle tourne sans modification sur ce contexte ; ses constats sur le
+# coeur remplacent les anciens, les autres constats sont conservés.
+# Hypothèse (déjà faite par les contrôles) : toutes les couches dans le même SCR.
+# ============================================================
+
+# Plus grande distance de voisinage utilisée par un contrôle (règle Point Technique à 5 m)
+MARGE_VOISINAGE = 5.0
+
+# Au-delà de ce nombre d'emprises à interroger, une exécution complète est plus rapide
+MAX_EMPRISES = 200
+
+# Les contrôles qui écrivent s'appuient sur des données globales (valeur majoritaire,
+# liste complète des entités à supprimer / renommer) : toujours exécutés en entier
+NON_INCREMENTAUX = set(ECRITURES)
+
+# État d'un contrôle après sa dernière exécution
+Base = namedtuple("Base", "numero params resultat emprises")
+
+
+def _elargir(rect, couche, marge=MARGE_VOISINAGE):
+    """Emprise agrandie de `marge` mètres (convertie en degrés pour une couche géographique)."""
+    if couche.geographique:
+        lat = math.radians(rect.center().y())
+        marge = metres_en_unites(marge, True) / max(math.cos(lat), 0.1)  # degrés de longitude, plus courts
+    return QgsRectangle(rect.xMinimum() - marge, rect.yMinimum() - marge,
+                        rect.xMaximum() + marge, rect.yMaximum() + marge)
+
+
+def _emprises(couche, requete):
+    """Itère (fid, emprise) des entités de la source d'une couche répondant à `requete`."""
+    if couche.source is None:
+        return
+    requete.setNoAttributes()
+    for feat in couche.source.getFeatures(requete):
+        geom = feat.geometry()
+        if geom and not geom.isEmpty():
+            yield feat.id(), geom.boundingBox()
+
+
+class SuiviModifications:
+    """Journal des entités modifiées dans les couches suivies, et dernier résultat de chaque contrôle."""
+
+    def __init__(self):
+        self.numero = 0
+        self.journal = []     # (numéro, layer.id(), fid), rempli sur le thread principal
+        self.suivies = set()  # layer.id() des couches écoutées
+        self.bases = {}       # nom du contrôle -> Base
+        self._verrou = threading.Lock()
+        self._connexions = []
+
+    def suivre(self, layers):
+        for layer in layers:
+            if layer.id() in self.suivies:
+                continue
+            self.suivies.add(layer.id())
+
+            def marquer(fid, *args, layer_id=layer.id()):
+                self.marquer(layer_id, fid)
+
+            def marquer_valides(layer_id, features):
+                # fids définitifs des entités ajoutées, attribués à l'enregistrement
+                for feat in features:
+                    self.marquer(layer_id, feat.id())
+
+            for signal, slot in ((layer.featureAdded, marquer),
+                                 (layer.featureDeleted, marquer),
+                                 (layer.geometryChanged, marquer),
+                                 (layer.attributeValueChanged, marquer),
+                                 (layer.committedFeaturesAdded, marquer_valides)):
+                signal.connect(slot)
+                self._connexions.append((signal, slot))
+
+    def arreter(self):
+        for signal, slot in self._connexions:
+            try:
+                signal.disconnect(slot)
+            except (TypeError, RuntimeError):
+                pass  # couche supprimée entre-temps
+        self._connexions.clear()
+        self.suivies.clear()
+        self.journal.clear()
+        self.bases.clear()
+
+    def marquer(self, layer_id, fid):
+        self.numero += 1
+        self.journal.append((self.numero, layer_id, fid))
+
+    def modifiees(self, depuis):
+        """{layer.id(): fids} des entités modifiées après le numéro `depuis`."""
+        sales = defaultdict(set)
+        for numero, layer_id, fid in self.journal:
+            if numero > depuis:
+                sales[layer_id].add(fid)
+        return sales
+
+    def analyse(self, nom, analyse):
+        """Version incrémentale de `analyse` ; à appeler sur le thread principal, au lancement.
+
+        Le journal est lu ici ; la fonction retournée s'exécute ensuite dans la tâche.
+        """
+        with self._verrou:
+            base = self.bases.get(nom)
+            if self.bases:
+                plus_ancien = min(b.numero for b in self.bases.values())
+                self.journal = [e for e in self.journal if e[0] > plus_ancien]
+        numero = self.numero
+        sales = self.modifiees(base.numero) if base is not None else None
+
+        def executer(snap, params):
+            layers = snap.resoudre(couches_lues(nom, params))
+            if (base is None or base.params != params or nom in NON_INCREMENTAUX
+                    or any(layer.id() not in self.suivies for layer in layers)):
+                return self._complet(nom, analyse, snap, params, layers, numero)
+            lues = {layer.id() for layer in layers}
+            sales_lues = {layer_id: fids for layer_id, fids in sales.items() if layer_id in lues}
+            if not sales_lues:
+                # rien n'a changé dans les couches du contrôle depuis sa dernière exécution
+                self._enregistrer(nom, base._replace(numero=numero))
+                return base.resultat
+            resultat = self._revalider(nom, analyse, snap, params, layers, base, sales_lues, numero)
+            if resultat is None:
+                return self._complet(nom, analyse, snap, params, layers, numero)
+            return resultat
+
+        return executer
+
+    def _enregistrer(self, nom, base):
+        if nom not in NON_INCREMENTAUX:
+            with self._verrou:
+                self.bases[nom] = base
+
+    def _complet(self, nom, analyse, snap, params, layers, numero):
+        resultat = analyse(snap, params)
+        if nom in NON_INCREMENTAUX:
+            return resultat  # aucune base conservée : inutile de lire les géométries pour les emprises
+        emprises = {}
+        for layer in layers:
+            couche = snap.get(layer)
+            for fid, geom in couche.geometries():
+                emprises[(layer.id(), fid)] = geom.boundingBox()
+        self._enregistrer(nom, Base(numero, params, resultat, emprises))
+        return resultat
+
+    def _revalider(self, nom, analyse, snap, params, layers, base, sales, numero):
+        """Exécution restreinte au contexte des entités modifiées, fusionnée avec `base`.
+
+        Retourne None si la zone est trop étendue (exécution complète préférable).
+        """
+        couches = {layer.id(): snap.get(layer, charger=False) for layer in layers}
+        emprises = dict(base.emprises)
+
+        # Zone : anciennes emprises (dernière exécution) et nouvelles emprises des entités modifiées
+        zones = []
+        for layer_id, fids in sales.items():
+            couche = couches.get(layer_id)
+            if couche is None:
+                continue
+            for fid in fids:
+                ancienne = emprises.pop((layer_id, fid), None)
+                if ancienne is not None:
+                    zones.append(_elargir(ancienne, couche))
+            for _, rect in _emprises(couche, QgsFeatureRequest().setFilterFids(list(fids))):
+                zones.append(_elargir(rect, couche))
+        if len(zones) > MAX_EMPRISES:
+            return None
+
+        # Coeur : entités modifiées et entités qui touchent la zone
+        coeur = defaultdict(set)
+        rects_coeur = []
+        for layer_id, couche in couches.items():
+            coeur[layer_id].update(sales.get(layer_id, ()))
+            for zone in zones:
+                for fid, rect in _emprises(couche, QgsFeatureRequest().setFilterRect(zone)):
+                    if fid not in coeur[layer_id]:
+                        coeur[layer_id].add(fid)
+                        rects_coeur.append(_elargir(rect, couche))
+        if len(rects_coeur) > MAX_EMPRISES:
+            return None
+
+        # Contexte : voisines des entités du coeur, pour que chacune soit jugée comme en exécution complète
+        contexte = {layer_id: set(fids) for layer_id, fids in coeur.items()}
+        for layer_id, couche in couches.items():
+            for rect in rects_coeur:
+                contexte[layer_id].update(fid for fid, _ in _emprises(couche, QgsFeatureRequest().setFilterRect(rect)))
+
+        vue = snap.vue(contexte)
+        nouveau = analyse(vue, params)
+
+        # Fusion : constats du coeur recalculés, les autres repris de la dernière exécution
+        ids = {couche.layer: layer_id for layer_id, couche in couches.items()}
+        resultat = Resultat(nouveau.titre, niveau=nouveau.niveau)
+        repris = 0
+        for layer, fids in base.resultat.selections.items():
+            recalcules = coeur.get(ids.get(layer), ())
+            conserves = [fid for fid in fids if fid not in recalcules]
+            repris += len(conserves)
+            resultat.selectionner(layer, conserves)
+        constats_coeur = 0
+        for layer, fids in nouveau.selections.items():
+            dans_coeur = [fid for fid in fids if layer not in ids or fid in coeur[ids[layer]]]
+            constats_coeur += len(dans_coeur)
+            resultat.selectionner(layer, dans_coeur)
+        resultat.constats = [c for c in base.resultat.constats if c.fid not in coeur.get(ids.get(c.couche), ())]
+        resultat.constats += [c for c in nouveau.constats if c.couche not in ids or c.fid in coeur[ids[c.couche]]]
+
+        total = sum(len(fids) for fids in resultat.selections.values())
+        # nouveau.message ne décrit que le contexte relu : les constats repris sont comptés à part
+        if constats_coeur:
+            message = f"Zone modifiée :\n{nouveau.message}"
+        else:
+            message = "✅ Aucune erreur dans la zone modifiée."
+            resultat.niveau = base.resultat.niveau if total else "information"
+        resultat.message = (f"{message}\n\n♻ Revalidation incrémentale : "
+                            f"{sum(len(f) for f in sales.values())} entité(s) modifiée(s), "
+                            f"{sum(len(f) for f in coeur.values())} re-contrôlée(s) "
+                            f"dont {constats_coeur} en erreur, "
+                            f"{repris} en erreur reprise(s) de la dernière exécution, "
+                            f"{total} en erreur au total.")
+
+        for layer_id in couches:
+            for fid, geom in vue.get(couches[layer_id].layer).geometries():
+                emprises[(layer_id, fid)] = geom.boundingBox()
+        self._enregistrer(nom, Base(numero, params, resultat, emprises))
+        return resultat
@@ -1,18 +1,46 @@
-from qgis.PyQt.QtWidgets import QAction, QMenu, QMessageBox, QInputDialog,QDockWidget, QWidget, QVBoxLayout, QTextEdit
+from qgis.PyQt.QtWidgets import QAction, QMenu, QMessageBox, QInputDialog
 from qgis.PyQt.QtGui import QIcon
-from qgis.core import (
-    QgsProject, QgsVectorLayer, QgsWkbTypes, QgsCoordinateTransform,
-    QgsCoordinateReferenceSystem, QgsGeometry, QgsPointXY, QgsSpatialIndex,QgsRectangle,QgsDistanceArea
-)
-from collections import defaultdict, Counter
+from qgis.PyQt.QtCore import Qt
+from qgis.PyQt import sip
+from qgis.core import Qgis, QgsApplication, QgsMessageLog, QgsProject
+from collections import defaultdict
 import os
-import unicodedata
+
+from .snapshot import ProjectSnapshot
+from .duplicates import (
+    detecter_doublons, TOLERANCES_DOUBLONS, TOLERANCE_DOUBLON_DEFAUT
+)
+from .distances import regrouper_regles, violations_regles
+from .overlap import recouvrements, classer, couverture, appariements
+from .metric import metres_en_unites
+from .tasks import ControlesTask, Resultat
+from .nulls import scanner_nulls
+from .edition import ecrire_attributs, ecrire_valeurs
+from .names import IndexUnicite
+from .connexions import chambres_autorisees, normaliser_type, fonction_attendue
+from .scheduler import ordre_rapports
+from .results import DockConstats, constats_resultat, abreger
+from .export import ExportConstats, dossier_export
+from .profiling import mesurer, phase, compter_predicat, sequentiel, desactiver as desactiver_profilage
  
 class MonPlugin:
+    # Groupes de l'accrochage : couches nœuds et couches lignes
+    GROUPES_ACCROCHAGE = {
+        'Infrastructure': {'points':['Chambre','Point Technique','Poteau','Point GC','Site'],
+                        'lignes':['Canalisation','Support','Tranchee']},
+        'Cuivre':         {'points':['SR','Manchon','PC'],
+                        'lignes':['Cable Cuivre']},
+        'Fibre Optique':  {'points':['SRO','Closer','BPE','PCO'],
+                        'lignes':['Cable Fo']}
+    }
+
     def __init__(self, iface):
         self.iface = iface
         self.menu = None
         self.action_main = None
+        self._taches = []  # tâches de fond en cours (références gardées jusqu'à la fin)
+        self.suivi = None  # SuiviModifications quand le mode incrémental est actif
+        self.dock_constats = None  # panneau des résultats (results.py), créé au premier rapport
 
     def initGui(self):
         icon_path = os.path.join(os.path.dirname(__file__), 'icon.png')
@@ -46,6 +74,13 @@ class MonPlugin:
         self.iface.addToolBarIcon(self.action_main)
 
     def unload(self):
+        desactiver_profilage()
+        if self.suivi is not None:
+            self.suivi.arreter()
+        if self.dock_constats is not None:
+            self.iface.removeDockWidget(self.dock_constats)
+            self.dock_constats.deleteLater()
+            self.dock_constats = None
         self.iface.removePluginMenu("▶ Outils Vecteurs", self.action_main)
         self.iface.removeToolBarIcon(self.action_main)
 
@@ -53,6 +88,131 @@ class MonPlugin:
         project = QgsProject.instance()
         layers = project.mapLayersByName(name)
         return layers[0] if layers else None
+
+    def snapshot(self):
+        """Instantané neuf du projet (à créer sur le thread principal)."""
+        return ProjectSnapshot()
+
+    # ---------- exécution en tâche de fond (cf. tasks.py) ----------
+
+    def lancer_controles(self, noms, description, fin=None, parallele=False):
+        """Lance les analyses des contrôles `noms` dans une seule tâche de fond.
+
+        Les saisies (parametres_X) sont demandées avant le lancement ; les rapports
+        (rapport_X) sont affichés à la fin sur le thread principal, ceux qui écrivent
+        dans les couches en dernier (cf. scheduler.ECRITURES).
+        fin(erreurs, non_executes) est appelé en dernier (par défaut : message d'erreur éventuel),
+        non_executes étant la liste des contrôles abandonnés par une annulation.
+        """
+        etapes = []
+        for nom in noms:
+            parametres = getattr(self, "parametres_" + nom, None)
+            params = parametres() if parametres else None
+            if parametres and params is None:
+                continue  # saisie annulée par l'utilisateur
+            analyse = getattr(self, "analyse_" + nom)
+            if self.suivi is not None:
+                analyse = self.suivi.analyse(nom, analyse)  # revalidation incrémentale (incremental.py)
+            etapes.append((nom, analyse, params))
+        if not etapes:
+            return None
+
+        snap = ProjectSnapshot()  # sources d'entités créées ici, sur le thread principal
+        export = ExportConstats(dossier_export(), snap=snap, creer_vide=False)
+        erreurs_export = []
+
+        def a_chaque(nom, resultat, erreur):
+            # Dans la tâche : export au fil de l'eau, contrôle par contrôle ; la liste des
+            # constats d'un contrôle n'est gardée que le temps de l'écrire
+            if resultat is None or erreurs_export:
+                return
+            try:
+                with mesurer(nom, "export"):
+                    self.exporter_constats(export, constats_resultat(nom, resultat))
+            except Exception as e:
+                erreurs_export.append(f"export → {str(e)}")
+
+        def termine(resultats, non_executes):
+            self._taches.remove(tache)
+            erreurs = list(erreurs_export)
+            with mesurer("publication", "rapport"):
+                self.publier_constats([(nom, constats_resultat(nom, resultat))
+                                       for nom, resultat, _ in resultats if resultat is not None])
+                try:
+                    self.fermer_export(export)
+                except Exception as e:
+                    erreurs.append(f"export → {str(e)}")
+            for nom, resultat, erreur in ordre_rapports(resultats):
+                if erreur is not None:
+                    erreurs.append(f"{nom} → {erreur}")
+                    continue
+                try:
+                    # (temps d'attente des boîtes de dialogue compris)
+                    with mesurer(nom, "rapport"):
+                        getattr(self, "rapport_" + nom, self.rapport)(resultat)
+                except Exception as e:
+                    erreurs.append(f"{nom} → {str(e)}")
+            (fin or self.fin_controle)(erreurs, non_executes)
+
+        parallele = parallele and not sequentiel()  # profilage mémoire : un contrôle à la fois
+        tache = ControlesTask(description, snap, etapes, termine, parallele, precharger=self.suivi is None,
+                              a_chaque=a_chaque)
+        self._taches.append(tache)
+        QgsApplication.taskManager().addTask(tache)
+        return tache
+
+    def publier_constats(self, publies):
+        """Affiche les constats [(nom du contrôle, [Constat])] dans le panneau des résultats.
+
+        Les constats précédents de ces contrôles sont remplacés, ceux des autres conservés.
+        """
+        if self.dock_constats is None:
+            self.dock_constats = DockConstats(self.iface, self.iface.mainWindow())
+            self.iface.addDockWidget(Qt.BottomDockWidgetArea, self.dock_constats)
+        constats = [c for _, constats_controle in publies for c in constats_controle]
+        self.dock_constats.publier([nom for nom, _ in publies], constats)
+        if constats:
+            self.dock_constats.show()
+
+    def exporter_constats(self, export, constats):
+        """Écrit les constats d'un contrôle terminé dans l'export de l'exécution (cf. export.py).
+
+        Appelé depuis la tâche : le lot est écrit et les couches de l'export refermées aussitôt,
+        les géométries sont reprises de l'instantané.
+        """
+        export.ajouter(constats)
+        export.vider()
+
+    def fermer_export(self, export):
+        """Ferme l'export d'une exécution (GeoPackage et CSV créés seulement s'il y a des constats)."""
+        export.fermer()
+        if export.ecrits:
+            QgsMessageLog.logMessage(f"{export.ecrits} constat(s) exporté(s) : {export.chemin_gpkg} ; {export.chemin_csv}",
+                                     "VERIF'INFRA", Qgis.Info)
+
+    def fin_controle(self, erreurs, non_executes):
+        if erreurs:
+            QMessageBox.critical(None, "Erreur", "Une erreur est survenue :\n" + "\n".join(erreurs))
+        elif non_executes:
+            QMessageBox.information(None, "Annulé", "❌ Contrôle annulé.")
+
+    def rapport(self, resultat):
+        """Présentation par défaut d'un Resultat : sélections puis message."""
+        self.appliquer_selections(resultat)
+        self.afficher_message(resultat)
+
+    def appliquer_selections(self, resultat):
+        with phase("selection"):
+            for layer, fids in resultat.selections.items():
+                if sip.isdeleted(layer):
+                    continue  # couche retirée du projet pendant l'analyse
+                layer.removeSelection()
+                if fids:
+                    layer.selectByIds(list(fids))
+
+    def afficher_message(self, resultat):
+        boites = {"warning": QMessageBox.warning, "critical": QMessageBox.critical}
+        boites.get(resultat.niveau, QMessageBox.information)(None, resultat.titre, abreger(resultat.message))
     
     
     """
@@ -84,13 +244,12 @@ class MonPlugin:
     
 
     def check_geometry_duplicates(self):
-        project = QgsProject.instance()
-        infra_group = project.layerTreeRoot().findGroup("Infrastructure")
-        if infra_group is None:
-            QMessageBox.information(None, "Doublons", "Groupe Infrastructure introuvable.")
-            return
+        self.lancer_controles(["check_geometry_duplicates"], "Doublons géométriques")
 
-        all_layers = [node.layer() for node in infra_group.findLayers() if isinstance(node.layer(), QgsVectorLayer)]
+    def analyse_check_geometry_duplicates(self, snap, params=None):
+        all_layers = snap.group("Infrastructure")
+        if all_layers is None:
+            return Resultat("Doublons", "Groupe Infrastructure introuvable.")
 
         exceptions_par_paires = {
             ("Canalisation", "Tranchee"),
@@ -98,142 +257,58 @@ class MonPlugin:
             # ajouter d'autres paires ici si besoin
         }
 
-        layer_points = {}
-        for layer in all_layers:
-            if QgsWkbTypes.geometryType(layer.wkbType()) != QgsWkbTypes.PointGeometry:
-                continue
-            src = layer.crs()
-            # Pas de transformation, on reste en 4326 mais on utilisera QgsDistanceArea pour distances géodésiques
-            coords_dict = defaultdict(list)
-            for f in layer.getFeatures():
-                g = f.geometry()
-                if not g or g.isEmpty():
-                    continue
-                geom = QgsGeometry(g)
-                pt = geom.asPoint()
-                key = (round(pt.x(), 5), round(pt.y(), 5))
-                fields_names = [fld.name() for fld in layer.fields()]
-                label = f["NOM"] if ("NOM" in fields_names and f["NOM"]) else f"ID {f.id()}"
-                coords_dict[key].append((f.id(), label, pt, f))
-            layer_points[layer] = coords_dict
+        couches_points = [couche for couche in all_layers if couche.est_point()]
 
+        resultat = Resultat("Doublons")
         msg = ""
-        doubl_ids_per_layer = defaultdict(set)
-
-        # Détection doublons exacts
-        for layer, coords_dict in layer_points.items():
-            layer.removeSelection()
-            for key, feats in coords_dict.items():
-                if len(feats) > 1:
-                    ids = [fid for fid, _, _, _ in feats]
-                    noms = [label for _, label, _, _ in feats]
-                    doubl_ids_per_layer[layer].update(ids)
-                    layer.selectByIds(ids)
-                    msg += f"\n🟢 Doublons exacts {layer.name()}: {', '.join(noms)}"
-
-        # Détection superpositions interdites entre couches différentes
-        checked_pairs = set()
-        for layer1 in layer_points:
-            for layer2 in layer_points:
-                if layer1 == layer2:
-                    continue
-                pair = (layer1.name(), layer2.name())
-                pair_inv = (layer2.name(), layer1.name())
-                if pair in checked_pairs or pair_inv in checked_pairs:
-                    continue
-                checked_pairs.add(pair)
-                checked_pairs.add(pair_inv)
-
-                if pair in exceptions_par_paires or pair_inv in exceptions_par_paires:
-                    continue
 
-                cds1 = layer_points[layer1]
-                cds2 = layer_points[layer2]
-
-                selected_fids_1 = set(layer1.selectedFeatureIds())
-                selected_fids_2 = set(layer2.selectedFeatureIds())
-
-                for key in cds1:
-                    if key in cds2:
-                        for id1, nom1, _, _ in cds1[key]:
-                            if id1 in doubl_ids_per_layer[layer1]:
-                                continue
-                            for id2, nom2, _, _ in cds2[key]:
-                                if id2 in doubl_ids_per_layer[layer2]:
-                                    continue
-                                selected_fids_1.add(id1)
-                                selected_fids_2.add(id2)
-                                msg += f"\n🔴 Superposition entre '{nom1}' ({layer1.name()}) et '{nom2}' ({layer2.name()})"
+        # Doublons internes et superpositions interdites, avec la tolérance métrique de chaque couche
+        # (0 : coordonnées identiques), en une seule passe sur toutes les couches
+        tolerances = [TOLERANCES_DOUBLONS.get(couche.nom, TOLERANCE_DOUBLON_DEFAUT) for couche in couches_points]
+        doublons, superpositions = detecter_doublons(couches_points, tolerances, exceptions_par_paires)
+        selection_points = defaultdict(set)
+
+        for code, ids in doublons:
+            couche = couches_points[code]
+            selection_points[code].update(ids)
+            libelles = ', '.join(str(couche.libelle(fid)) for fid in ids)
+            if tolerances[code] > 0:
+                msg += f"\n🟢 Doublons {couche.nom} (< {tolerances[code]} m): {libelles}"
+            else:
+                msg += f"\n🟢 Doublons exacts {couche.nom}: {libelles}"
 
-                layer1.selectByIds(list(selected_fids_1))
-                layer2.selectByIds(list(selected_fids_2))
+        for code1, id1, code2, id2 in superpositions:
+            couche1, couche2 = couches_points[code1], couches_points[code2]
+            selection_points[code1].add(id1)
+            selection_points[code2].add(id2)
+            msg += (f"\n🔴 Superposition entre '{couche1.libelle(id1)}' ({couche1.nom}) "
+                    f"et '{couche2.libelle(id2)}' ({couche2.nom})")
 
-        # Détection des doublons de LIGNES
-        for layer in all_layers:
-            if QgsWkbTypes.geometryType(layer.wkbType()) != QgsWkbTypes.LineGeometry:
-                continue
+        for code, couche in enumerate(couches_points):
+            resultat.selectionner(couche.layer, selection_points[code])
 
-            feats = list(layer.getFeatures())
-            if len(feats) < 2:
+        # Détection des doublons de LIGNES (géométries préparées + pré-filtres, cf. overlap.py)
+        for couche in all_layers:
+            if not couche.est_ligne() or len(couche.features) < 2:
                 continue
+            layer = couche.layer
+            ids_lignes = set()
 
-            spatial_index = QgsSpatialIndex()
-            feat_dict = {}
-            for f in feats:
-                g = f.geometry()
-                if not g or g.isEmpty():
+            for rec in recouvrements(couche):
+                nature = classer(rec)
+                if nature is None:
                     continue
-                spatial_index.addFeature(f)
-                feat_dict[f.id()] = (f, g)
-
-            already_checked = set()
-            for fid, (feat, geom1) in feat_dict.items():
-                rect = geom1.boundingBox()
-                candidate_ids = spatial_index.intersects(rect)
-
-                for nid in candidate_ids:
-                    if nid == fid:
-                        continue
-                    pair = tuple(sorted((fid, nid)))
-                    if pair in already_checked:
-                        continue
-                    already_checked.add(pair)
-
-                    feat2, geom2 = feat_dict[nid]
-
-                    inter = geom1.intersection(geom2)
-                    if not inter or inter.isEmpty():
-                        continue
-
-                    inter_length = inter.length()
-                    if inter_length <= 0:
-                        continue
-
-                    len1 = geom1.length()
-                    len2 = geom2.length()
-
-                    ratio1 = inter_length / len1
-                    ratio2 = inter_length / len2
-
-                    nom1 = feat.attribute("NOM") or f"ID {feat.id()}"
-                    nom2 = feat2.attribute("NOM") or f"ID {feat2.id()}"
-
-                    # Vérifie les cas
-                    if ratio1 >= 0.99 and ratio2 >= 0.99:
-                        msg += (f"\n🔴{layer.name()}: superposition totale "
-                                f"entre '{nom1}' et '{nom2}'")
-                        layer.selectByIds([fid, nid])
-                    elif ratio1 >= 0.1 or ratio2 >= 0.1:
-                        msg += (f"\n🟠 {layer.name()}: Superposition partielle "
-                                f"entre '{nom1}' et '{nom2}' "
-                                f"({ratio1*100:.1f}% / {ratio2*100:.1f}% recouvrement)")
-                        layer.selectByIds([fid, nid])
-
-
-        # Préparation pour distance géodésique
-        d = QgsDistanceArea()
-        d.setEllipsoid('WGS84')
-        d.setSourceCrs(QgsCoordinateReferenceSystem("EPSG:4326"), project.transformContext())
+                ids_lignes.update((rec.fid1, rec.fid2))
+                nom1, nom2 = couche.libelle(rec.fid1), couche.libelle(rec.fid2)
+                if nature == "totale":
+                    msg += (f"\n🔴{couche.nom}: superposition totale "
+                            f"entre '{nom1}' et '{nom2}'")
+                else:
+                    msg += (f"\n🟠 {couche.nom}: Superposition partielle "
+                            f"entre '{nom1}' et '{nom2}' "
+                            f"({rec.ratio1*100:.1f}% / {rec.ratio2*100:.1f}% recouvrement)")
+
+            resultat.selectionner(layer, ids_lignes)
 
         # Règles de distance minimale (intra-couche)
         # Format: (NomCouche, NomCouche, DistMin_mètres, (TypeVal1), (TypeVal2)) - types optionnels
@@ -249,80 +324,23 @@ class MonPlugin:
             # Ajouter d'autres règles ici
         ]
 
-        for lay_name1, lay_name2, dist_min, *type_vals in distance_rules:
-            if lay_name1 != lay_name2:
-                continue  # On traite uniquement distances intra-couche ici
-
-            layers = [layer for layer in layer_points.keys() if layer.name() == lay_name1]
-            for layer in layers:
-                feats = list(layer.getFeatures())
-                spatial_index = QgsSpatialIndex()
-                feat_dict = {}
-
-                for feat in feats:
-                    geom = feat.geometry()
-                    if not geom or geom.isEmpty():
-                        continue
-                    spatial_index.addFeature(feat)
-                    feat_dict[feat.id()] = (feat, geom)
-
-                errors = []
-
-                for feat, geom1 in feat_dict.values():
-                    attr_type1 = None
-                    # Vérifier type le cas échéant
-                    if lay_name1 == "Point Technique" and len(type_vals) == 2:
-                        attr_type1 = feat.attribute("TYPE")
-                        if attr_type1 not in type_vals:
-                            continue
-
-                    center = geom1.boundingBox().center()
-                    buffer = dist_min / 111320.0  # Approximate degree buffer (~epsg4326)
-                    # Pour simplifier recherche spatiale: nous faisons un buffer en degrés approx.
-                    rect = QgsRectangle(
-                        center.x() - buffer,
-                        center.y() - buffer,
-                        center.x() + buffer,
-                        center.y() + buffer
-                    )
-
-                    neighbors_ids = spatial_index.intersects(rect)
-
-                    for nid in neighbors_ids:
-                        if nid == feat.id():
-                            continue
-                        feat2, geom2 = feat_dict[nid]
-                        attr_type2 = None
-                        if lay_name1 == "Point Technique" and len(type_vals) == 2:
-                            attr_type2 = feat2.attribute("TYPE")
-                            if attr_type2 not in type_vals:
-                                continue
-
-                        # Calcul distance géodésique précise WGS84
-                        distance = d.measureLine(geom1.asPoint(), geom2.asPoint())
-
-                        if distance < dist_min:
-                            nom1 = feat.attribute("NOM") or f"ID {feat.id()}"
-                            nom2 = feat2.attribute("NOM") or f"ID {feat2.id()}"
-                            errors.append((nom1, nom2, distance, layer.name(), dist_min))
-
-                if errors:
-                    feat_ids = set()
-                    # Récupérer IDs des entités concernées pour sélectionner
-                    for e in errors:
-                        for f in feats:
-                            if f.attribute("NOM") == e[0] or f.attribute("NOM") == e[1] or f.id() == e[0] or f.id() == e[1]:
-                                feat_ids.add(f.id())
-                    layer.selectByIds(list(feat_ids))
-                    for nom1, nom2, dist, lname, dist_min_val in errors:
-                        msg += (f"\n⚠️ Distance minimale non respectée "
-                                f"dans couche {lname} : entre '{nom1}' et '{nom2}', "
-                                f"distance {dist:.2f} m (minimum {dist_min_val} m)")
+        # Toutes les règles d'une couche sont évaluées en un seul balayage de voisinage
+        regles_par_couche = regrouper_regles(distance_rules)
+        for couche in couches_points:
+            errors = violations_regles(couche, regles_par_couche.get(couche.nom))
+            if errors:
+                layer = couche.layer
+                resultat.selectionner(layer, {fid for fid1, fid2, _, _ in errors for fid in (fid1, fid2)})
+                for fid1, fid2, dist, dist_min in errors:
+                    msg += (f"\n⚠️ Distance minimale non respectée "
+                            f"dans couche {couche.nom} : entre '{couche.libelle(fid1)}' et '{couche.libelle(fid2)}', "
+                            f"distance {dist:.2f} m (minimum {dist_min} m)")
 
         if msg.strip():
-            QMessageBox.information(None, "Doublons détectés", msg.strip())
+            resultat.titre, resultat.message = "Doublons détectés", msg.strip()
         else:
-            QMessageBox.information(None, "Doublons", "✅ Aucun doublon détecté.")
+            resultat.message = "✅ Aucun doublon détecté."
+        return resultat
 
 
 
@@ -334,79 +352,74 @@ class MonPlugin:
 
    
     def check_name_duplicates(self):
-            from collections import defaultdict
-            couches = QgsProject.instance().mapLayers().values()
-            total = 0
-            details = ""
-            prefixes = {
-                "Chambre": "Cham_",
-                "Canalisation": "Canal_",
-                "Tranchee": "Tran_",
-                "Point Technique": "PT_",
-                "Support": "Supp_",
-                "Batiment": "Bati_"
-            }
-
-            for layer in couches:
-                if not isinstance(layer, QgsVectorLayer):
-                    continue
-                fields_names = [f.name() for f in layer.fields()]
-                if "NOM" not in fields_names and not any(f in fields_names for f in ["id", "ID", "Id"]):
-                    continue
-
-                nomdict = defaultdict(list)
-                iddict = defaultdict(list)
-
-                # Détection du champ d'id métier présent
-                id_field_candidates = [f for f in ["id", "ID", "Id"] if f in fields_names]
-                id_field = id_field_candidates[0] if id_field_candidates else None
-
-                for feat in layer.getFeatures():
-                    nom_value = feat["NOM"] if "NOM" in fields_names else None
-                    if nom_value is not None:
-                        nomdict[str(nom_value).strip()].append(feat.id())
-
-                    if id_field:
-                        id_val = feat[id_field]
-                        if id_val is not None:
-                            iddict[str(id_val).strip()].append(feat.id())
-
-                dup_ids_nom = []
-                dup_ids_id = []
-
-                for val, ids in nomdict.items():
-                    if len(ids) > 1:
-                        dup_ids_nom.extend(ids)
-                        details += f"🔁 '{val}' ×{len(ids)} dans {layer.name()} (champ NOM)\n"
-
-                for val, ids in iddict.items():
-                    if len(ids) > 1:
-                        dup_ids_id.extend(ids)
-                        details += f"🔂 '{val}' ×{len(ids)} fois dans la couche {layer.name()}\n"
-
-                dup_ids = list(set(dup_ids_nom + dup_ids_id))
-
-                if dup_ids:
-                    total += len(dup_ids)
-                    layer.removeSelection()
-                    layer.selectByIds(dup_ids)
-
-            if total > 0:
-                r = QMessageBox.question(
-                    None, "Doublons NOM/ID internes",
-                    f"{total} entités doublons détectées :\n\n{details} \n Ces entités sont sélectionnées dans leur couche",
-                )
-
-            else:
-                QMessageBox.information(None, "Doublons NOM/ID internes", "✅ Aucun doublon trouvé.")
-            
-            if total > 0:
-                r = QMessageBox.question(
-                    None, "Doublons NOM/ID internes",
-                    f"{total} entités doublons détectées :\n\n{details} \nCes entités sont sélectionnées dans leur couche.\nVoulez-vous renommer ces entités ?",
-                )
-                if r == QMessageBox.Yes:
-                    self.renommer_tous_les_noms()
+            self.lancer_controles(["check_name_duplicates"], "Doublons NOM et ID")
+
+    def analyse_check_name_duplicates(self, snap, params=None):
+            resultat = Resultat("Doublons NOM/ID")
+
+            # Une lecture des seules colonnes NOM / id par couche, sans géométrie
+            index = IndexUnicite()
+            for couche in snap.vector_layers(charger=False):
+                index.ajouter(couche, snap.feedback)
+
+            internes = defaultdict(list)  # nom de couche -> lignes du rapport
+            entre_couches = ""
+            for doublon in index.doublons_noms():
+                if len(doublon.occurrences) == 1:
+                    couche, fids = doublon.occurrences[0]
+                    ligne = f"🔁 '{doublon.valeur}' ×{len(fids)} dans {couche.nom} (champ NOM)"
+                    internes[couche.nom].append(ligne + "\n")
+                else:
+                    repartition = ", ".join(f"{couche.nom} ×{len(fids)}" for couche, fids in doublon.occurrences)
+                    ligne = f"🔀 '{doublon.valeur}' dans plusieurs couches : {repartition} (champ NOM)"
+                    entre_couches += ligne + "\n"
+                for couche, fids in doublon.occurrences:
+                    for fid in fids:
+                        resultat.constater(couche.layer, fid, ligne)
+            for doublon in index.doublons_ids():
+                couche, fids = doublon.occurrences[0]
+                ligne = f"🔂 '{doublon.valeur}' ×{len(fids)} fois dans la couche {couche.nom}"
+                internes[couche.nom].append(ligne + "\n")
+                for fid in fids:
+                    resultat.constater(couche.layer, fid, ligne)
+
+            # Noms proches : casse, accents, séparateurs, zéros ou une faute de frappe d'écart
+            proches = ""
+            for doublon in index.noms_proches():
+                variantes = " / ".join(f"'{nom}'" for nom in doublon.valeur)
+                repartition = ", ".join(f"{couche.nom} ×{len(fids)}" for couche, fids in doublon.occurrences)
+                ligne = f"≈ {variantes} : {repartition}"
+                proches += ligne + "\n"
+                for couche, fids in doublon.occurrences:
+                    for fid in fids:
+                        resultat.constater(couche.layer, fid, ligne)
+
+            details = "".join(ligne for couche in index.couches for ligne in internes.pop(couche.nom, ()))
+            details += entre_couches
+            if proches:
+                details += f"\nNoms proches (probables doublons) :\n{proches}"
+            total = sum(len(fids) for fids in resultat.selections.values())
+
+            resultat.donnees["total"] = total
+            resultat.donnees["details"] = details
+            resultat.message = f"{total} entités doublons détectées :\n\n{details}" if total > 0 else "✅ Aucun doublon trouvé."
+            return resultat
+
+    def rapport_check_name_duplicates(self, resultat):
+            self.appliquer_selections(resultat)
+            total = resultat.donnees["total"]
+            details = resultat.donnees["details"]
+
+            if total == 0:
+                QMessageBox.information(None, "Doublons NOM/ID", "✅ Aucun doublon trouvé.")
+                return
+            r = QMessageBox.question(
+                None, "Doublons NOM/ID",
+                f"{total} entités doublons détectées :\n\n{abreger(details)} \nCes entités sont sélectionnées dans leur couche.\nVoulez-vous renommer ces entités ?",
+                QMessageBox.Yes | QMessageBox.No,
+            )
+            if r == QMessageBox.Yes:
+                self.renommer_tous_les_noms()
 
 
     def renommer_tous_les_noms(self):
@@ -440,41 +453,36 @@ class MonPlugin:
                         QMessageBox.warning(None, "Erreur", "❌ Valeur NOM_ZR non fournie. Opération annulée.")
                         return
                     zr_value = zr_value.strip()
+                    snap = self.snapshot()
+
+                    # Nouveaux 'id' (1..n dans l'ordre de lecture), si le champ existe
+                    def nouveaux_ids(couche):
+                        if not couche.a_champ('id'):
+                            return {}
+                        return {fid: i for i, fid in enumerate(couche.features, 1)}
 
-                    # Fonction pour incrémenter le champ 'id' s'il existe dans une couche
-                    def increment_id_if_exists(layer):
-                        idx_id = layer.fields().indexFromName('id')
-                        if idx_id == -1:
-                            return  # Pas de champ 'id', on quitte
-                        layer.startEditing()
-                        i = 1
-                        for feat in layer.getFeatures():
-                            layer.changeAttributeValue(feat.id(), idx_id, i)
-                            i += 1
-                        layer.commitChanges()
-
-                    # Renommage des points en fonction de NOM_ZR et prefix
+                    # Renommage des points en fonction de NOM_ZR et prefix :
+                    # toutes les valeurs calculées d'abord, puis une seule écriture par couche
                     def rename_points_with_nom_zr(zr_value):
                         for layer_name, prefix in point_layers.items():
-                            layers = QgsProject.instance().mapLayersByName(layer_name)
-                            if not layers:
+                            couche = snap.get(layer_name)
+                            if couche is None:
                                 QMessageBox.warning(None, "Attention", f"⚠️ Couche '{layer_name}' introuvable.")
                                 continue
-                            layer = layers[0]
-
-                            # Incrémentation de l'attribut id si présent
-                            increment_id_if_exists(layer)
-
-                            layer.startEditing()
-                            idx_nom = layer.fields().indexFromName('NOM')
-                            idx_id = layer.fields().indexFromName('id')
-                            for feat in layer.getFeatures():
-                                # Utilisation de l'id comme compteur si il existe, sinon feat.id()+1
-                                num = feat['id'] if idx_id != -1 else feat.id() + 1
-                                new_nom = f"{zr_value}-{prefix}{zero_pad(num)}"
-                                if idx_nom != -1:
-                                    layer.changeAttributeValue(feat.id(), idx_nom, new_nom)
-                            layer.commitChanges()
+
+                            ids = nouveaux_ids(couche)
+                            nouvelles = {}
+                            for fid in couche.features:
+                                valeurs = nouvelles[fid] = {}
+                                if ids:
+                                    valeurs['id'] = ids[fid]
+                                if couche.a_champ('NOM'):
+                                    # Utilisation de l'id comme compteur si il existe, sinon feat.id()+1
+                                    num = ids[fid] if ids else fid + 1
+                                    valeurs['NOM'] = f"{zr_value}-{prefix}{zero_pad(num)}"
+                            if ecrire_valeurs(couche, nouvelles, "VERIF'INFRA – renommage") is None:
+                                QMessageBox.warning(None, "Erreur", f"❌ Renommage de la couche '{couche.nom}' non enregistré.")
+                            snap.invalidate(couche.layer)
 
                     # Chargement des couches connexion avec champ pour rechercher nom point
                     loaded_connexion_layers = []
@@ -485,57 +493,55 @@ class MonPlugin:
                         else:
                             QMessageBox.warning(None, "Attention", f"⚠️ Couche de point '{name}' introuvable.")
 
+                    champ_par_couche = {layer.name(): (layer, champ) for layer, champ in loaded_connexion_layers}
+
                     # Recherche du nom de connexion à partir d'un point
-                    def get_connexion_name(point_geom):
-                        for layer, field in loaded_connexion_layers:
-                            for feat in layer.getFeatures():
-                                if feat.geometry().contains(point_geom):
-                                    value = feat[field]
-                                    if value is None or str(value).strip() == '':
-                                        QMessageBox.warning(None, "Erreur", f"❌ Une entité de '{layer.name()}' n’a pas de valeur dans le champ '{field}'.")
-                                        layer.selectByIds([feat.id()])
-                                        return None
-                                    return str(value)
-                        return None
+                    def get_connexion_name(point, index_connexion):
+                        noeud = index_connexion.first_at(point)
+                        if noeud is None:
+                            return None
+                        layer, field = champ_par_couche[noeud[0]]
+                        # Lu après le renommage des points (instantané invalidé après l'écriture,
+                        # tampon d'édition compris si la couche était déjà en édition)
+                        feat = snap.get(layer).features[noeud[1]]
+                        value = feat[field]
+                        if value is None or str(value).strip() == '':
+                            QMessageBox.warning(None, "Erreur", f"❌ Une entité de '{layer.name()}' n’a pas de valeur dans le champ '{field}'.")
+                            layer.selectByIds([feat.id()])
+                            return None
+                        return str(value)
 
                     # Renommage des lignes selon les noms des points de connexion
                     def rename_lignes():
+                        # Les géométries des points ne bougent pas pendant le renommage des lignes
+                        index_connexion = snap.endpoint_index(list(champ_par_couche))
                         for layer_name, prefix in line_layers.items():
-                            layers = QgsProject.instance().mapLayersByName(layer_name)
-                            if not layers:
+                            couche = snap.get(layer_name)
+                            if couche is None:
                                 QMessageBox.warning(None, "Attention", f"⚠️ Couche {layer_name} introuvable.")
                                 continue
-                            layer = layers[0]
 
                             # Incrémentation de l'attribut id si présent (optionnel, tu peux l'enlever si inutile pour les lignes)
-                            increment_id_if_exists(layer)
-
+                            ids = nouveaux_ids(couche)
+                            nouvelles = {fid: {'id': i} for fid, i in ids.items()}
                             erreurs = []
-                            layer.startEditing()
-                            idx_nom = layer.fields().indexFromName('NOM')
-                            for feat in layer.getFeatures():
-                                geom = feat.geometry()
-                                if geom.isMultipart():
-                                    line_points = geom.asMultiPolyline()[0]
-                                else:
-                                    line_points = geom.asPolyline()
-                                if not line_points or len(line_points) < 2:
+                            for fid in couche.features:
+                                ext = couche.extremites.get(fid)
+                                if ext is None:
                                     continue
-                                start_geom = QgsGeometry.fromPointXY(line_points[0])
-                                end_geom = QgsGeometry.fromPointXY(line_points[-1])
-                                nom_start = get_connexion_name(start_geom)
-                                nom_end = get_connexion_name(end_geom)
+                                nom_start = get_connexion_name(ext[0], index_connexion)
+                                nom_end = get_connexion_name(ext[1], index_connexion)
                                 if nom_start and nom_end:
-                                    if nom_start != nom_end:
-                                        new_nom = f"{prefix}{nom_start}-{nom_end}"
-                                        if idx_nom != -1:
-                                            layer.changeAttributeValue(feat.id(), idx_nom, new_nom)
+                                    if nom_start != nom_end and couche.a_champ('NOM'):
+                                        nouvelles.setdefault(fid, {})['NOM'] = f"{prefix}{nom_start}-{nom_end}"
                                 else:
-                                    erreurs.append(feat.id())
-                            layer.commitChanges()
+                                    erreurs.append(fid)
+                            if ecrire_valeurs(couche, nouvelles, "VERIF'INFRA – renommage") is None:
+                                QMessageBox.warning(None, "Erreur", f"❌ Renommage de la couche '{couche.nom}' non enregistré.")
+                            snap.invalidate(couche.layer)
                             if erreurs:
-                                layer.selectByIds(erreurs)
-                                QMessageBox.warning(None, "Erreur", f"❌ {len(erreurs)} entité(s) mal connectée(s) dans la couche '{layer.name()}' (voir sélection).")
+                                couche.layer.selectByIds(erreurs)
+                                QMessageBox.warning(None, "Erreur", f"❌ {len(erreurs)} entité(s) mal connectée(s) dans la couche '{couche.nom}' (voir sélection).")
 
                     # Exécution complète
                     rename_points_with_nom_zr(zr_value)
@@ -549,41 +555,35 @@ class MonPlugin:
 # ============================================================
 
     def null_values(self):
-        from collections import defaultdict, Counter
-        root = QgsProject.instance().layerTreeRoot()
-        grp = root.findGroup("Infrastructure")
-        if not grp:
-            QMessageBox.critical(None, "Erreur", "❌ Groupe 'Infrastructure' introuvable.")
-            return
+        self.lancer_controles(["null_values"], "NULL VALUES")
+
+    def analyse_null_values(self, snap, params=None):
+        grp = snap.group("Infrastructure", charger=False)  # lecture par colonnes, sans géométrie
+        if grp is None:
+            return Resultat("Erreur", "❌ Groupe 'Infrastructure' introuvable.", "critical")
         autorise = {"MENAGE","COMMERCE","ENTREPRISE","ADMINISTRA","TOTAL PH"}
         rempl = {"REP","NOM_SR","PROJET"}
         total = 0
-        tofill = defaultdict(lambda: defaultdict(list))
+        remplissage = {}  # layer -> {champ: (valeur majoritaire, fids vides)}
         manquants = defaultdict(lambda: defaultdict(int))  # <--- Ajout
-
-        for node in grp.findLayers():
-            layer = node.layer()
-            if not isinstance(layer, QgsVectorLayer): continue
-            champs = [f.name() for f in layer.fields()]
-            ids = []
-            for feat in layer.getFeatures():
-                empties = []
-                for ch in champs:
-                    v = feat[ch]
-                    empty = v is None or (isinstance(v,str) and not v.strip()) or str(v).strip().lower()=="null"
-                    if empty and not (layer.name().lower()=="batiment" and ch in autorise):
-                        empties.append(ch)
-                        manquants[layer.name()][ch] += 1   # <--- Compte le nombre de valeurs manquantes par attribut
-                        if ch in rempl:
-                            tofill[layer.name()][ch].append(feat.id())
-                if empties:
-                    ids.append(feat.id())
-                    total += 1
-            layer.removeSelection()
-            layer.selectByIds(ids)
+        resultat = Resultat("Remplir Attributs")
+
+        for couche in grp:
+            # Batiment : les champs de comptage peuvent rester vides
+            exclus = autorise if couche.nom.lower()=="batiment" else ()
+            # Fréquences de REP, NOM_SR, PROJET relevées dans la même lecture que les vides
+            scan = scanner_nulls(couche, exclus, snap.feedback, compter=rempl)
+            for ch, fids in scan.vides.items():
+                manquants[couche.nom][ch] = len(fids)   # <--- Compte le nombre de valeurs manquantes par attribut
+                frequences = scan.frequences.get(ch)
+                if frequences:
+                    maj = frequences.most_common(1)[0][0]
+                    remplissage.setdefault(couche.layer, {})[ch] = (maj, fids)
+            total += len(scan.incompletes)
+            resultat.selectionner(couche.layer, scan.incompletes)
         if total == 0:
-            QMessageBox.information(None, "Remplir Attributs", "✅ PAS DE NULL VALUES.")
-            return
+            resultat.message = "✅ PAS DE NULL VALUES."
+            return resultat
 
         # => Création d'un message détaillant les vides par couche et attribut
         msg = f"🔍 {total} entités incomplètes sélectionnées.\n\n"
@@ -591,25 +591,27 @@ class MonPlugin:
         for couche, attributs in manquants.items():
             for attr, n in attributs.items():
                 msg += f"• {couche} : {attr} → {n} entités\n"
+        resultat.message = msg
+        resultat.donnees["remplissage"] = remplissage
+        return resultat
 
-        QMessageBox.information(None, "Remplir Attributs", msg)
+    def rapport_null_values(self, resultat):
+        self.rapport(resultat)
+        remplissage = resultat.donnees.get("remplissage")
 
-        if tofill:
+        if remplissage:
             ok = QMessageBox.question(None, "Remplissage automatique",
                 "Remplir REP, NOM_SR, PROJET avec la valeur la plus fréquente ?",
                 QMessageBox.Yes|QMessageBox.No)
             if ok == QMessageBox.Yes:
-                for lname, champs in tofill.items():
-                    layer = QgsProject.instance().mapLayersByName(lname)[0]
-                    layer.startEditing()
-                    for ch, ids in champs.items():
-                        vals = [str(f[ch]).strip() for f in layer.getFeatures() if f[ch] and str(f[ch]).strip().lower()!="null"]
-                        if not vals: continue
-                        maj = Counter(vals).most_common(1)[0][0]
+                # Une seule mise à jour par couche, tous champs confondus
+                for layer, champs in remplissage.items():
+                    changements = defaultdict(dict)
+                    for ch, (maj, ids) in champs.items():
                         idx = layer.fields().indexFromName(ch)
                         for fid in ids:
-                            layer.changeAttributeValue(fid, idx, maj)
-                    layer.commitChanges()
+                            changements[fid][idx] = maj
+                    ecrire_attributs(layer, dict(changements), "VERIF'INFRA – remplissage automatique")
                 QMessageBox.information(None, "Terminé", "✅ Champs remplis.")
 
 
@@ -620,26 +622,43 @@ class MonPlugin:
 # ============================================================
 
     def detecter_fantomes(self):
+        self.lancer_controles(["detecter_fantomes"], "Géométries fantômes")
+
+    def analyse_detecter_fantomes(self, snap, params=None):
         noms = ['Chambre','Canalisation','Support', 'Tranchee', 'Poteau', 'Point Technique', 'point GC', 'Site', 'Batiment']
-        project = QgsProject.instance()
+        resultat = Resultat("Entités Fantômes")
         total = 0
         layers_f = {}
         msg = ""
         for nm in noms:
-            couches = project.mapLayersByName(nm)
-            if not couches: continue
-            layer = couches[0]
-            if not isinstance(layer,QgsVectorLayer) or not layer.isValid(): continue
+            couche = snap.get(nm)
+            if couche is None or not couche.valide: continue
+            layer = couche.layer
             bad = []
-            for feat in layer.getFeatures():
+            tests_geos = 0
+            for feat in couche.features.values():
                 g = feat.geometry()
-                if g is None or g.isEmpty() or not g.isGeosValid():
+                if g is None or g.isEmpty():
                     bad.append(feat.id())
+                    continue
+                tests_geos += 1
+                if not g.isGeosValid():
+                    bad.append(feat.id())
+            compter_predicat("isGeosValid", tests_geos)
             if bad:
                 total += len(bad)
                 layers_f[layer] = bad
-                layer.selectByIds(bad)
-                msg += f"🧟 {len(bad)} entités fantômes dans {layer.name()}\n"
+                resultat.selectionner(layer, bad)
+                msg += f"🧟 {len(bad)} entités fantômes dans {couche.nom}\n"
+        resultat.message = msg if total > 0 else "✅ Aucune géométrie fantôme detectée ."
+        resultat.donnees["fantomes"] = layers_f
+        return resultat
+
+    def rapport_detecter_fantomes(self, resultat):
+        self.appliquer_selections(resultat)
+        msg = resultat.message
+        layers_f = resultat.donnees["fantomes"]
+        total = sum(len(ids) for ids in layers_f.values())
         if total > 0:
             r = QMessageBox.question(None, "Entités Fantômes",
                 f"{msg}\nTotal: {total} entitées Fantômes. \nLes supprimer ?",
@@ -665,86 +684,53 @@ class MonPlugin:
 # 
 
     def accrochage_lignes_points(self):
-        from collections import defaultdict
-        project = QgsProject.instance()
-        tol = 0
-        groupes = {
-            'Infrastructure': {'points':['Chambre','Point Technique','Poteau','Point GC','Site'],
-                            'lignes':['Canalisation','Support','Tranchee']},
-            'Cuivre':         {'points':['SR','Manchon','PC'],
-                            'lignes':['Cable Cuivre']},
-            'Fibre Optique':  {'points':['SRO','Closer','BPE','PCO'],
-                            'lignes':['Cable Fo']}
-        }
+        self.lancer_controles(["accrochage_lignes_points"], "Accrochage")
+
+    def parametres_accrochage_lignes_points(self):
+        groupes = self.GROUPES_ACCROCHAGE
         groupe, ok = QInputDialog.getItem(None, "Choisir groupe", "Groupe :", list(groupes.keys()), 0, False)
         if not ok: 
-            return
-        sel = groupes[groupe]
+            return None
+        return groupe, groupes[groupe]
+
+    def analyse_accrochage_lignes_points(self, snap, params):
+        groupe, sel = params
+        resultat = Resultat("Accrochage")
 
-        # --- Charger tous les points ---
-        pts = [(f.geometry().asPoint(), layer, f)
-            for typ in ['points'] 
-            for layer in [QgsProject.instance().mapLayersByName(n)[0]
-                            for n in sel[typ] if QgsProject.instance().mapLayersByName(n)]
-            for f in layer.getFeatures() if f.geometry() and f.geometry().type()==0]
+        # --- Graphe du groupe : points = nœuds, lignes = arêtes ---
+        # (les Canalisations ne s'accrochent pas aux Points GC, cf. graph.CONNEXIONS_EXCLUES)
+        graphe = snap.network_graph(sel['points'], sel['lignes'])
 
         # --- Charger toutes les lignes ---
-        lignes = [layer for n in sel['lignes'] if QgsProject.instance().mapLayersByName(n)
-                for layer in [QgsProject.instance().mapLayersByName(n)[0]]]
+        lignes = [couche for couche in [snap.get(n) for n in sel['lignes']] if couche is not None]
 
         errs = []
-        pts_connect = set()
-
-        def est_connecte(pt, pts_aut):
-            for p, lyr, feat in pts_aut:
-                if QgsGeometry.fromPointXY(QgsPointXY(pt)).distance(QgsGeometry.fromPointXY(p)) <= tol:
-                    pts_connect.add(feat.id())
-                    return True
-            return False
-
-        for lyr in lignes:
-            for f in lyr.getFeatures():
-                g = f.geometry()
-                if not g or g.type()!=1: 
-                    continue
-                poly = g.asMultiPolyline()[0] if g.isMultipart() else g.asPolyline()
-                if len(poly)<2: 
-                    continue
-                start, end = poly[0], poly[-1]
+        for couche in lignes:
+            lyr = couche.layer
+            for fid in couche.extremites:
+                f = couche.features[fid]
+                debut, fin = graphe.ends((couche.nom, fid))
                 manq = []
-                is_tr = "tranchee" in lyr.name().lower()
 
-                # --- Filtrage spécial Canalisation ---
-                if "canalisation" in lyr.name().lower():
-                    # On exclut les Points GC
-                    autor = [(p, l, ft) for (p, l, ft) in pts if "point gc" not in l.name().lower()]
-                else:
-                    autor = pts
-
-                # Tolérance spéciale pour tranchée (autor = pts doublé, même logique qu’avant)
-                if is_tr:
-                    autor = autor + autor
-
-                if not est_connecte(start, autor): 
+                if not debut: 
                     manq.append("A")
-                if not est_connecte(end, autor): 
+                if not fin: 
                     manq.append("B")
 
                 if manq:
-                    nom = f['NOM'] if 'NOM' in f.fields().names() else f"{lyr.name()}_{f.id()}"
+                    nom = f['NOM'] if 'NOM' in f.fields().names() else f"{couche.nom}_{f.id()}"
                     errs.append((lyr, f.id(), f"{nom} mal accrochée (extrémité {' et '.join(manq)})"))
 
         iso = []
-        for p in pts:
-            if p[2].id() in pts_connect: 
-                continue
-            iso.append((p[1], p[2].id(), p[2]['NOM'] if 'NOM' in p[2].fields().names() and p[2]['NOM'] else f"{p[1].name()}_{p[2].id()}"))
+        for nom_couche, fid in graphe.isolated_nodes():
+            couche = snap.get(nom_couche)
+            nom = couche.valeur(fid, 'NOM')
+            iso.append((couche.layer, fid, nom if nom else f"{nom_couche}_{fid}"))
 
-        sel_per = defaultdict(set)
-        for lyr, fid, _ in errs+iso:
-            sel_per[lyr].add(fid)
-        for lyr, ids in sel_per.items():
-            lyr.selectByIds(list(ids))
+        for lyr, fid, texte in errs:
+            resultat.constater(lyr, fid, texte)
+        for lyr, fid, texte in iso:
+            resultat.constater(lyr, fid, f"{texte} : point isolé")
 
         if errs or iso:
             text = f"<b>⚠ Problèmes – {groupe}</b><br><br>"
@@ -754,7 +740,8 @@ class MonPlugin:
                 text += "<b>Points isolés:</b><br>" + "<br>".join(f"• {p[2]}" for p in iso)
         else:
             text = f"✅ Tous connectés pour le groupe <b>{groupe}</b>."
-        QMessageBox.information(None, "Accrochage", text)
+        resultat.message = text
+        return resultat
 
 # ============================================================
 # ============================================================
@@ -764,88 +751,55 @@ class MonPlugin:
 
     # 
     def verifier_tranchee_canalisation(self):
-        try:
-            nom_couche_canalisation = 'Canalisation'
-            nom_couche_tranchee = 'Tranchee'
-
-            couche_canalisation = QgsProject.instance().mapLayersByName(nom_couche_canalisation)
-            couche_tranchee = QgsProject.instance().mapLayersByName(nom_couche_tranchee)
-
-            if not couche_canalisation or not couche_tranchee:
-                QMessageBox.critical(None, "Erreur", "❌ Vérifiez que les couches 'Canalisation' et 'Tranchée' sont bien chargées.")
-                return
-
-            couche_canalisation = couche_canalisation[0]
-            couche_tranchee = couche_tranchee[0]
-
-            index_tranchee = QgsSpatialIndex()
-            features_tranchee = {}
-            for feat in couche_tranchee.getFeatures():
-                features_tranchee[feat.id()] = feat
-                index_tranchee.insertFeature(feat)
-
-            index_canalisation = QgsSpatialIndex()
-            features_canalisation = {}
-            for feat in couche_canalisation.getFeatures():
-                features_canalisation[feat.id()] = feat
-                index_canalisation.insertFeature(feat)
-
-            erreurs_canalisation_hors = []
-            erreurs_tranchee_en_excès = []
+        self.lancer_controles(["verifier_tranchee_canalisation"], "Superposition canalisation / tranchée")
 
-            couche_canalisation.removeSelection()
-            couche_tranchee.removeSelection()
+    def analyse_verifier_tranchee_canalisation(self, snap, params=None):
+        nom_couche_canalisation = 'Canalisation'
+        nom_couche_tranchee = 'Tranchee'
 
-            # Vérification canalisations
-            for feat_can in features_canalisation.values():
-                geom_can = feat_can.geometry()
-                intersects_ids = index_tranchee.intersects(geom_can.boundingBox())
-                geoms_tranchee = [features_tranchee[fid].geometry() for fid in intersects_ids]
+        snap_canalisation = snap.get(nom_couche_canalisation)
+        snap_tranchee = snap.get(nom_couche_tranchee)
 
-                if not geoms_tranchee:
-                    erreurs_canalisation_hors.append(feat_can.id())
-                    continue
-
-                geom_union = geoms_tranchee[0]
-                for g in geoms_tranchee[1:]:
-                    geom_union = geom_union.combine(g)
-
-                if not geom_union.contains(geom_can):
-                    erreurs_canalisation_hors.append(feat_can.id())
-
-            # Vérification tranchées
-            for feat_tr in features_tranchee.values():
-                geom_tr = feat_tr.geometry()
-                intersects_ids = index_canalisation.intersects(geom_tr.boundingBox())
-                geoms_canalisation = [features_canalisation[fid].geometry() for fid in intersects_ids]
+        if snap_canalisation is None or snap_tranchee is None:
+            return Resultat("Erreur", "❌ Vérifiez que les couches 'Canalisation' et 'Tranchée' sont bien chargées.", "critical")
 
-                if not geoms_canalisation:
-                    erreurs_tranchee_en_excès.append(feat_tr.id())
-                    continue
+        # Longueur de chaque ligne couverte par l'autre couche, calculée en un seul passage
+        tolerance_m = 0.10  # au-delà, la ligne est considérée comme (partiellement) hors superposition
+        couverture_canalisation, couverture_tranchee = couverture(snap_canalisation, snap_tranchee)
 
-                geom_union = geoms_canalisation[0]
-                for g in geoms_canalisation[1:]:
-                    geom_union = geom_union.combine(g)
+        def hors_couverture(couche, couvertures):
+            tolerance = metres_en_unites(tolerance_m, couche.geographique)
+            return [fid for fid, c in couvertures.items() if c.longueur - c.couverte > tolerance]
 
-                if not geom_union.contains(geom_tr):
-                    erreurs_tranchee_en_excès.append(feat_tr.id())
+        def taux(c):
+            return c.couverte / c.longueur if c.longueur else 0.0
 
-            couche_canalisation.selectByIds(erreurs_canalisation_hors)
-            couche_tranchee.selectByIds(erreurs_tranchee_en_excès)
+        erreurs_canalisation_hors = hors_couverture(snap_canalisation, couverture_canalisation)
+        erreurs_tranchee_en_excès = hors_couverture(snap_tranchee, couverture_tranchee)
 
-            total_erreurs = len(erreurs_canalisation_hors) + len(erreurs_tranchee_en_excès)
-            if total_erreurs == 0:
-                QMessageBox.information(None, "CANAL SUR TRANCHEE", "✅ Tranchées et canalisations parfaitement superposées.")
-            else:
-                msg = "⚠️ Erreurs détectées dans la superposition :\n"
-                if erreurs_canalisation_hors:
-                    msg += f"\n❌ Canalisations partiellement ou totalement hors tranchée : {len(erreurs_canalisation_hors)}"
-                if erreurs_tranchee_en_excès:
-                    msg += f"\n❌ Tranchées en excès (dépassant les canalisations) : {len(erreurs_tranchee_en_excès)}"
-                QMessageBox.warning(None, "Problèmes détectés", msg)
+        resultat = Resultat("CANAL SUR TRANCHEE")
+        resultat.selectionner(snap_canalisation.layer, erreurs_canalisation_hors)
+        resultat.selectionner(snap_tranchee.layer, erreurs_tranchee_en_excès)
 
-        except Exception as e:
-            QMessageBox.critical(None, "Erreur", f"Une erreur est survenue :\n{str(e)}")
+        total_erreurs = len(erreurs_canalisation_hors) + len(erreurs_tranchee_en_excès)
+        if total_erreurs == 0:
+            resultat.message = "✅ Tranchées et canalisations parfaitement superposées."
+        else:
+            msg = "⚠️ Erreurs détectées dans la superposition :\n"
+            if erreurs_canalisation_hors:
+                msg += f"\n❌ Canalisations partiellement ou totalement hors tranchée : {len(erreurs_canalisation_hors)}"
+                for fid in erreurs_canalisation_hors:
+                    ligne = f"{snap_canalisation.libelle(fid)} : {taux(couverture_canalisation[fid])*100:.1f}% sur tranchée"
+                    resultat.constater(snap_canalisation.layer, fid, ligne)
+                    msg += f"\n   • {ligne}"
+            if erreurs_tranchee_en_excès:
+                msg += f"\n❌ Tranchées en excès (dépassant les canalisations) : {len(erreurs_tranchee_en_excès)}"
+                for fid in erreurs_tranchee_en_excès:
+                    ligne = f"{snap_tranchee.libelle(fid)} : {taux(couverture_tranchee[fid])*100:.1f}% sous canalisation"
+                    resultat.constater(snap_tranchee.layer, fid, ligne)
+                    msg += f"\n   • {ligne}"
+            resultat.titre, resultat.message, resultat.niveau = "Problèmes détectés", msg, "warning"
+        return resultat
 
 # ============================================================
 # ============================================================
@@ -854,43 +808,36 @@ class MonPlugin:
 # ============================================================
  
     def verifier_type_canal(self):
-        site_layer = self.get_layer_by_name("Site")
-        canal_layer = self.get_layer_by_name("Canalisation")
-        chambre_layer = self.get_layer_by_name("Chambre")
-        pt_layer = self.get_layer_by_name("Point Technique")
-        poteau_layer = self.get_layer_by_name("Poteau")
-
-        if not canal_layer or not chambre_layer or not pt_layer or not poteau_layer:
-            QMessageBox.warning(None, "Erreur", "Une ou plusieurs couches nécessaires sont absentes.")
-            return
-
-        def get_connected_type(point_geom):
-            for f in chambre_layer.getFeatures():
-                if f.geometry().intersects(point_geom):
-                    return "Chambre", None
-            for f in pt_layer.getFeatures():
-                if f.geometry().intersects(point_geom):
-                    return "Point Technique", f["TYPE"]
-            for f in poteau_layer.getFeatures():
-                if f.geometry().intersects(point_geom):
-                    return "Poteau", None
-            for f in site_layer.getFeatures():
-                if f.geometry().intersects(point_geom):
-                    return "Site", None
-            return "Inconnu", None
+        self.lancer_controles(["verifier_type_canal"], "TYPE CANAL")
+
+    def analyse_verifier_type_canal(self, snap, params=None):
+        canal = snap.get("Canalisation")
+        chambre = snap.get("Chambre")
+        pt = snap.get("Point Technique")
+        poteau = snap.get("Poteau")
+
+        if not canal or not chambre or not pt or not poteau:
+            return Resultat("Erreur", "Une ou plusieurs couches nécessaires sont absentes.", "warning")
+        graphe = snap.network_graph()
+        couches_connexion = {"Chambre", "Point Technique", "Poteau", "Site"}
+
+        def get_connected_type(fid, extremite):
+            # Priorité dans l'ordre des couches nœuds : Chambre, Point Technique, Poteau, Site
+            noeud = graphe.end_node(("Canalisation", fid), extremite, couches_connexion)
+            if noeud is None:
+                return "Inconnu", None
+            nom_couche, fid_noeud = noeud
+            if nom_couche == "Point Technique":
+                return nom_couche, pt.features[fid_noeud]["TYPE"]
+            return nom_couche, None
 
         erreurs, ids_erreurs = [], []
 
-        for feat in canal_layer.getFeatures():
-            geom = feat.geometry()
-            if not geom or geom.isEmpty():
-                continue
+        for fid in canal.extremites:
+            feat = canal.features[fid]
 
-            start_geom = geom.interpolate(0)
-            end_geom = geom.interpolate(geom.length())
-
-            t1, extra1 = get_connected_type(start_geom)
-            t2, extra2 = get_connected_type(end_geom)
+            t1, extra1 = get_connected_type(fid, 0)
+            t2, extra2 = get_connected_type(fid, 1)
 
             nom = feat["NOM"] or "Inconnu"
             current = feat["TYPE CANAL"]
@@ -919,33 +866,32 @@ class MonPlugin:
                 erreurs.append(f"{nom} → Connexion inconnue entre {t1} et {t2} (TYPE CANAL = '{current}')")
                 ids_erreurs.append(feat.id())
 
-        canal_layer.removeSelection()
-        if ids_erreurs:
-            canal_layer.selectByIds(ids_erreurs)
-
-        QMessageBox.information(None, "TYPE CANAL", "\n".join(erreurs) if erreurs else "✅ TYPE CANAL corrects.")
+        resultat = Resultat("TYPE CANAL", "\n".join(erreurs) if erreurs else "✅ TYPE CANAL corrects.")
+        resultat.selectionner(canal.layer)
+        for fid, message in zip(ids_erreurs, erreurs):
+            resultat.constater(canal.layer, fid, message)
+        return resultat
 
 # ============================================================
 # ============================================================
 # ===============     Fonction 8: vérificateur de Type de supports    ===============
 # ============================================================
 # ============================================================
-    def point_exact(self, point, couche):
-        for feat in couche.getFeatures():
-            geom = feat.geometry()
-            if geom and geom.asPoint() == point:
-                return feat
-        return None
-
     def verifier_supports(self):
-        couche_canal = self.get_layer_by_name("Canalisation")
-        couche_support = self.get_layer_by_name("Support")
-        couche_pts = self.get_layer_by_name("Point Technique")
-        couche_poteau = self.get_layer_by_name("Poteau")
+        self.lancer_controles(["verifier_supports"], "TYPE SUPPORT")
+
+    def analyse_verifier_supports(self, snap, params=None):
+        snap_support = snap.get("Support")
+        couche_pts = snap.get("Point Technique")
+        couche_poteau = snap.get("Poteau")
 
-        if not couche_support or not couche_pts or not couche_poteau:
-            QMessageBox.warning(None, "Erreur", "Les couches 'Support', 'Point Technique' ou 'Poteau' sont introuvables.")
-            return
+        if not snap_support or not couche_pts or not couche_poteau:
+            return Resultat("Erreur", "Les couches 'Support', 'Point Technique' ou 'Poteau' sont introuvables.", "warning")
+        graphe = snap.network_graph()
+
+        def noeud_feature(fid, extremite, couche):
+            noeud = graphe.end_node(("Support", fid), extremite, {couche.nom})
+            return couche.features[noeud[1]] if noeud else None
 
         ids_erreurs, erreurs = [], []
 
@@ -953,16 +899,10 @@ class MonPlugin:
         def type_contains(feat, mot):
             return feat and 'TYPE' in feat.fields().names() and mot in str(feat['TYPE']).lower()
 
-        for support in couche_support.getFeatures():
-            geom = support.geometry()
-            # Récupérer la liste des points du support (ligne)
-            points = geom.asMultiPolyline()[0] if geom.isMultipart() else geom.asPolyline()
-            if len(points) < 2:
-                continue
-
-            p1, p2 = QgsPointXY(points[0]), QgsPointXY(points[-1])
-            pt1, pt2 = self.point_exact(p1, couche_pts), self.point_exact(p2, couche_pts)
-            pot1, pot2 = self.point_exact(p1, couche_poteau), self.point_exact(p2, couche_poteau)
+        for fid in snap_support.extremites:
+            support = snap_support.features[fid]
+            pt1, pt2 = noeud_feature(fid, 0, couche_pts), noeud_feature(fid, 1, couche_pts)
+            pot1, pot2 = noeud_feature(fid, 0, couche_poteau), noeud_feature(fid, 1, couche_poteau)
 
             support_nom = support['NOM']
             support_type = str(support['TYPE']).strip().lower()
@@ -1010,14 +950,15 @@ class MonPlugin:
                     erreurs.append(f"❌ Support '{support_nom}' va d’un poteau vers un point technique mais n’est PAS de type 'aérien'.")
                     ids_erreurs.append(support.id())
 
-        couche_support.removeSelection()
-        if ids_erreurs:
-            couche_support.selectByIds(list(set(ids_erreurs)))
-
+        resultat = Resultat("Vérification des supports")
+        resultat.selectionner(snap_support.layer)
+        for fid, message in zip(ids_erreurs, erreurs):
+            resultat.constater(snap_support.layer, fid, message)
         if erreurs:
-            QMessageBox.warning(None, "Vérification des supports", "\n".join(erreurs))
+            resultat.message, resultat.niveau = "\n".join(erreurs), "warning"
         else:
-            QMessageBox.information(None, "Vérification des supports", "✅ TYPE Support corrects.")
+            resultat.message = "✅ TYPE Support corrects."
+        return resultat
     
 # ============================================================
 # ============================================================
@@ -1028,174 +969,54 @@ class MonPlugin:
 # 
 
     def verifier_connexions(self):
-    # Dictionnaire complet des connexions autorisées
-        connexion_valide = {
-                "CPS1": ["CANIVEAU TYPE A", "CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2","PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC","PNP6", "PNP6C"],
-                "CPS1M": ["CANIVEAU TYPE A", "CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2",
-                        "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER","PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-                "CPS1L": ["CANIVEAU TYPE A", "CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2","PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC","PNP6", "PNP6C"],
-                "CPS2": ["CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2",
-                        "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-                "CPS2M": ["CANIVEAU TYPE B", "PNS1", "PNS2", "PNS2C", "PN2",
-                        "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-                "CPS2L": ["PNS1","PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
-                        "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
-                        "PNP5L", "PNP5LC", "PNP6", "PNP6C", "CANIVEAU TYPE B"],
-                "CPS4": ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
-                        "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
-                        "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
-                "CPS4L": ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
-                        "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
-                        "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
-                "CPS4LBis": ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
-                            "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
-                            "PNP5L", "PNP5LC", "PNP6", "PNP6C"],
-                "CPS4M": ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
-                            "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
-                            "PNP5L", "PNP5LC", "PNP6", "PNP6C"],     
-                "CPS6"  :   ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
-                            "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
-                            "PNP5L", "PNP5LC", "PNP6", "PNP6C"],      
-
-                "CPS6L"  :   ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
-                            "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
-                            "PNP5L", "PNP5LC", "PNP6", "PNP6C"],     
-
-                "CPS6M"  :   ["PNS2", "PNS2C", "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC",
-                            "PN3", "PN3 TER", "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C",
-                            "PNP5L", "PNP5LC", "PNP6", "PNP6C"],            
-
-                "CPP9": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-                "CPP9AC": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-
-                "CPP9Bis": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                            "PNP6", "PNP6C"],
-                "CPP12": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-                "CPP12A.L": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-                
-                "CPP12A.M": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-                
-                "CPP15B.L": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-
-                "CPP15B.M": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"],
-
-                "CPP20" : ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP20B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP20B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP25": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP25B.L":  ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP25B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP30": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP30B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP30B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP35": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP35B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP35B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP42": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP42B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP42B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP49": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP49B.L": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-                "CPP49B.M": ["PNP5","PNP5C","PNP5L","PNP5LC","PNP6","PNP6C"],
-
-                "Buse de 10": ["Caniveau type A", "Caniveau type B", "PNS1", "PNS2", "PNS2C",
-                            "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L",
-                            "PNP5LC", "PNP6", "PNP6C"],
-
-                "Buse de 15": ["Caniveau type A", "Caniveau type B", "PNS1", "PNS2", "PNS2C",
-                            "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L",
-                            "PNP5LC", "PNP6", "PNP6C"],
-
-                "Buse de 20": ["Caniveau type A", "Caniveau type B", "PNS1", "PNS2", "PNS2C",
-                            "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L",
-                            "PNP5LC", "PNP6", "PNP6C"],
-
-                "Buse de 30": ["Caniveau type A", "Caniveau type B", "PNS1", "PNS2", "PNS2C",
-                            "PN2", "PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                            "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L",
-                            "PNP5LC", "PNP6", "PNP6C"],
-                
-                "Basement 5": ["PNS3", "PNS3C", "PNS3L", "PNS3LC", "PN3", "PN3 TER",
-                        "PNP4", "PNP4C", "PNP4L", "PNP4LC", "PNP5", "PNP5C", "PNP5L", "PNP5LC",
-                        "PNP6", "PNP6C"], #aucune source je précise, c'est moi, Sylvius j'ai pris cet engagement en me basant que le CPP9 comme c'était le CPP9 on prenaait avant à la place de Basement 5
-
-        }
-
-        couche_can = self.get_layer_by_name("Canalisation")
-        couche_ch = self.get_layer_by_name("Chambre")
-        if not couche_can or not couche_ch:
-            QMessageBox.warning(None, "Erreur", "Couches Canalisation ou Chambre manquantes.")
-            return
-
-        index_ch = QgsSpatialIndex(couche_ch.getFeatures())
+        self.lancer_controles(["verifier_connexions"], "TYPE CHAMBRE / CANALISATION")
+
+    def analyse_verifier_connexions(self, snap, params=None):
+        snap_can = snap.get("Canalisation")
+        snap_ch = snap.get("Chambre")
+        if not snap_can or not snap_ch:
+            return Resultat("Erreur", "Couches Canalisation ou Chambre manquantes.", "warning")
+
+        # Contacts par les extrémités des canalisations (une recherche par extrémité),
+        # types de chambre normalisés une fois
+        index_ch = snap.endpoint_index(["Chambre"])
+        types_ch = {fid: normaliser_type(feat["TYPE"]) for fid, feat in snap_ch.features.items()}
         erreurs = []
         ids_erreurs_can = []
         ids_erreurs_ch = []
 
-        for feat_can in couche_can.getFeatures():
+        for fid_can, (debut, fin) in snap_can.extremites.items():
+            contacts = dict.fromkeys(fid for _, fid in index_ch.nodes_at(debut) + index_ch.nodes_at(fin))
+            if not contacts:
+                continue
+            feat_can = snap_can.features[fid_can]
             type_can = feat_can["TYPE CPS"]
-            geom_can = feat_can.geometry()
+            autorisees = chambres_autorisees(type_can)
 
-            # Recherche des chambres en contact spatial
-            ids_ch = index_ch.intersects(geom_can.boundingBox())
-            for fid_ch in ids_ch:
-                feat_ch = couche_ch.getFeature(fid_ch)
-                if not geom_can.touches(feat_ch.geometry()):
+            for fid_ch in contacts:
+                if autorisees is not None and types_ch[fid_ch] in autorisees:
                     continue
+                feat_ch = snap_ch.features[fid_ch]
                 type_ch = feat_ch["TYPE"]
-                if type_can in connexion_valide:
-                    if type_ch not in connexion_valide[type_can]:
-                        erreurs.append(f"❌{type_can} ne correspond pas à {type_ch} ({feat_ch['NOM']} et {feat_can['NOM']})   ")
-                        ids_erreurs_can.append(feat_can.id())
-                        ids_erreurs_ch.append(feat_ch.id())
+                if autorisees is not None:
+                    erreurs.append(f"❌{type_can} ne correspond pas à {type_ch} ({feat_ch['NOM']} et {feat_can['NOM']})   ")
                 else:
                     erreurs.append(f"{feat_can['NOM']} ({type_can}) → {feat_ch['NOM']} ({type_ch}) ❌ (type canalisation inconnu)")
-                    ids_erreurs_can.append(feat_can.id())
-                    ids_erreurs_ch.append(feat_ch.id())
-
-        # Enlève les doublons d'IDs
-        ids_erreurs_can = list(set(ids_erreurs_can))
-        ids_erreurs_ch = list(set(ids_erreurs_ch))
-
-        # Nettoyage des sélections précédentes
-        couche_can.removeSelection()
-        couche_ch.removeSelection()
+                ids_erreurs_can.append(fid_can)
+                ids_erreurs_ch.append(fid_ch)
 
-        # Sélection des entités en erreur dans les deux couches
-        if ids_erreurs_can:
-            couche_can.selectByIds(ids_erreurs_can)
-        if ids_erreurs_ch:
-            couche_ch.selectByIds(ids_erreurs_ch)
+        # Sélection des entités en erreur dans les deux couches (les précédentes sont remplacées)
+        resultat = Resultat("Validation", "Toutes les connexions de chambres à canalisations sont valides ✅")
+        resultat.selectionner(snap_can.layer)
+        resultat.selectionner(snap_ch.layer)
+        for fid_can, fid_ch, message in zip(ids_erreurs_can, ids_erreurs_ch, erreurs):
+            resultat.constater(snap_can.layer, fid_can, message)
+            resultat.constater(snap_ch.layer, fid_ch, message)
 
         # Message à l'utilisateur
         if erreurs:
-            QMessageBox.warning(None, "Connexions invalides", "\n".join(erreurs))
-        else:
-            QMessageBox.information(None, "Validation", "Toutes les connexions de chambres à canalisations sont valides ✅")
+            resultat.titre, resultat.message, resultat.niveau = "Connexions invalides", "\n".join(erreurs), "warning"
+        return resultat
 
 # ============================================================
 # ============================================================
@@ -1204,14 +1025,15 @@ class MonPlugin:
 # ============================================================
 
     def verifier_cps_tranchee(self):
-        layer_canal = self.get_layer_by_name("Canalisation")
-        layer_tranch = self.get_layer_by_name("Tranchee")
+        self.lancer_controles(["verifier_cps_tranchee"], "CPS TRANCHEE / CANALISATION")
+
+    def analyse_verifier_cps_tranchee(self, snap, params=None):
+        snap_canal = snap.get("Canalisation")
+        snap_tranch = snap.get("Tranchee")
 
-        if not layer_canal or not layer_tranch:
-            QMessageBox.warning(None, "Erreur", "Couches Canalisation ou Tranchée manquantes.")
-            return
+        if not snap_canal or not snap_tranch:
+            return Resultat("Erreur", "Couches Canalisation ou Tranchée manquantes.", "warning")
 
-        index_tranch = QgsSpatialIndex(layer_tranch.getFeatures())
         erreurs = []
         ids_erreurs_canal = []
         ids_erreurs_tranch = []
@@ -1228,33 +1050,36 @@ class MonPlugin:
             else:
                 return False
 
-        for feat_canal in layer_canal.getFeatures():
-            geom_canal = feat_canal.geometry()
-            type_cps = str(feat_canal["TYPE CPS"]).strip().upper() if feat_canal["TYPE CPS"] else ""
-            ids_tranch = index_tranch.intersects(geom_canal.boundingBox())
-            for id_tr in ids_tranch:
-                feat_tranch = layer_tranch.getFeature(id_tr)
-                geom_tranch = feat_tranch.geometry()
-                type_tranch = str(feat_tranch["TYPE TRANC"]).strip().upper() if feat_tranch["TYPE TRANC"] else ""
-
-                inter_geom = geom_canal.intersection(geom_tranch)
-                if inter_geom and not inter_geom.isEmpty() and inter_geom.length() > 0:
-                    if not types_compatibles(type_cps, type_tranch):
-                        erreurs.append(f"Canal '{feat_canal['NOM']}' ≠ Tranchée '{feat_tranch['NOM']}' → {type_cps} ≠ {type_tranch}")
-                        ids_erreurs_canal.append(feat_canal.id())
-                        ids_erreurs_tranch.append(feat_tranch.id())
-
-        layer_canal.removeSelection()
-        layer_tranch.removeSelection()
-        if ids_erreurs_canal:
-            layer_canal.selectByIds(list(set(ids_erreurs_canal)))
-        if ids_erreurs_tranch:
-            layer_tranch.selectByIds(list(set(ids_erreurs_tranch)))
-
+        def type_normalise(feat, champ):
+            return str(feat[champ]).strip().upper() if feat[champ] else ""
+
+        # Tranchées dans lesquelles passe chaque canalisation (longueur commune significative,
+        # géométries déjà chargées) : les extrémités qui se touchent et les croisements sont ignorés
+        apparies = appariements(snap_canal, snap_tranch)
+        types_tranch = {}
+
+        for fid_canal, recs in apparies.items():
+            feat_canal = snap_canal.features[fid_canal]
+            type_cps = type_normalise(feat_canal, "TYPE CPS")
+            for rec in recs:
+                type_tranch = types_tranch.get(rec.fid2)
+                if type_tranch is None:
+                    type_tranch = types_tranch[rec.fid2] = type_normalise(snap_tranch.features[rec.fid2], "TYPE TRANC")
+                if not types_compatibles(type_cps, type_tranch):
+                    feat_tranch = snap_tranch.features[rec.fid2]
+                    erreurs.append(f"Canal '{feat_canal['NOM']}' ≠ Tranchée '{feat_tranch['NOM']}' → {type_cps} ≠ {type_tranch}")
+                    ids_erreurs_canal.append(fid_canal)
+                    ids_erreurs_tranch.append(rec.fid2)
+
+        resultat = Resultat("CPS CANAL/TRANCHEE", "✅ Types cohérents.")
+        resultat.selectionner(snap_canal.layer)
+        resultat.selectionner(snap_tranch.layer)
+        for fid_canal, fid_tranch, message in zip(ids_erreurs_canal, ids_erreurs_tranch, erreurs):
+            resultat.constater(snap_canal.layer, fid_canal, message)
+            resultat.constater(snap_tranch.layer, fid_tranch, message)
         if erreurs:
-            QMessageBox.warning(None, "Incohérences CPS vs Tranchée", "\n".join(erreurs))
-        else:
-            QMessageBox.information(None, "CPS CANAL/TRANCHEE", "✅ Types cohérents.")
+            resultat.titre, resultat.message, resultat.niveau = "Incohérences CPS vs Tranchée", "\n".join(erreurs), "warning"
+        return resultat
 
 
 # ============================================================
@@ -1264,91 +1089,56 @@ class MonPlugin:
 # ============================================================
 
     def verifier_fonction_chambre(self):
-        chambre_layer = self.get_layer_by_name("Chambre")
-        canalisation_layer = self.get_layer_by_name("Canalisation")
+        self.lancer_controles(["verifier_fonction_chambre"], "FONCTION CHAMBRE")
 
-        if not chambre_layer or not canalisation_layer:
-            QMessageBox.warning(None, "Erreur", "Couches 'Chambre' ou 'Canalisation' manquantes.")
-            return
+    def analyse_verifier_fonction_chambre(self, snap, params=None):
+        snap_chambre = snap.get("Chambre")
+        snap_canalisation = snap.get("Canalisation")
 
-        chambre_layer.removeSelection()
-        canalisation_layer.removeSelection()
+        if not snap_chambre or not snap_canalisation:
+            return Resultat("Erreur", "Couches 'Chambre' ou 'Canalisation' manquantes.", "warning")
 
-        index_canal = QgsSpatialIndex(canalisation_layer.getFeatures())
+        # Degré Distribution de toutes les chambres en un passage sur les extrémités des canalisations
+        index_ch = snap.endpoint_index(["Chambre"])
+        distribution = defaultdict(list)  # fid chambre -> fids des canalisations Distribution
+        for fid_can, (debut, fin) in snap_canalisation.extremites.items():
+            if snap_canalisation.features[fid_can]["TYPE CANAL"] != "Distribution":
+                continue
+            for fid_ch in dict.fromkeys(fid for _, fid in index_ch.nodes_at(debut) + index_ch.nodes_at(fin)):
+                distribution[fid_ch].append(fid_can)
 
         chambre_erreurs_ids = []
         canalisation_associees_ids = []
         erreurs_messages = []
 
-        for chambre in chambre_layer.getFeatures():
+        for fid_ch, canaux_distribution_ids in distribution.items():
+            chambre = snap_chambre.features[fid_ch]
             fonction_actuelle = chambre["FONCTION"]
 
             # Exception : ignorer les chambres de départ
             if fonction_actuelle == "Chambre de départ":
                 continue
 
-            geom_chambre = chambre.geometry()
-
-            ids_near = index_canal.intersects(geom_chambre.buffer(0.5, 1).boundingBox())
-
-            count_distribution = 0
-            canaux_distribution_ids = []
-
-            for fid in ids_near:
-                canal_feat = canalisation_layer.getFeature(fid)
-                if canal_feat["TYPE CANAL"] != "Distribution":
-                    continue
-
-                geom_line = canal_feat.geometry()
-                if geom_line.isMultipart():
-                    line_points = geom_line.asMultiPolyline()[0]
-                else:
-                    line_points = geom_line.asPolyline()
-
-                p1 = QgsPointXY(line_points[0])
-                p2 = QgsPointXY(line_points[-1])
-
-                if (geom_chambre.intersects(QgsGeometry.fromPointXY(p1)) or
-                    geom_chambre.intersects(QgsGeometry.fromPointXY(p2))):
-                    count_distribution += 1
-                    canaux_distribution_ids.append(fid)
-
-            if count_distribution == 0:
-                continue
-
-            if count_distribution >= 3:
-                fonction_attendue = "Chambre de raccordement"
-            elif count_distribution == 2:
-                fonction_attendue = "Chambre de tirage"
-            elif count_distribution == 1:
-                fonction_attendue = "Chambre de Terminaison"
-            else:
-                fonction_attendue = None
-
-            if fonction_actuelle != fonction_attendue:
-                chambre_erreurs_ids.append(chambre.id())
+            count_distribution = len(canaux_distribution_ids)
+            fonction = fonction_attendue(count_distribution)
+            if fonction_actuelle != fonction:
+                chambre_erreurs_ids.append(fid_ch)
                 canalisation_associees_ids.extend(canaux_distribution_ids)
                 nom_chambre = chambre["NOM"] if chambre["NOM"] else "(sans NOM)"
                 erreurs_messages.append(
-                    f"❌ Chambre '{nom_chambre}' a FONCTION '{fonction_actuelle}' mais devrait être '{fonction_attendue}' "
+                    f"❌ Chambre '{nom_chambre}' a FONCTION '{fonction_actuelle}' mais devrait être '{fonction}' "
                     f"(canalisations Distribution : {count_distribution})"
                 )
 
-        chambre_layer.selectByIds(chambre_erreurs_ids)
-        canalisation_layer.selectByIds(list(set(canalisation_associees_ids)))
+        resultat = Resultat("Vérification fonction chambre", "✅ Toutes les chambres ont une fonction correcte.")
+        resultat.selectionner(snap_chambre.layer)
+        for fid_ch, message in zip(chambre_erreurs_ids, erreurs_messages):
+            resultat.constater(snap_chambre.layer, fid_ch, message)
+        resultat.selectionner(snap_canalisation.layer, canalisation_associees_ids)
 
         if erreurs_messages:
-            QMessageBox.warning(
-                None,
-                "Vérification fonction chambre",
-                "\n".join(erreurs_messages)
-            )
-        else:
-            QMessageBox.information(
-                None,
-                "Vérification fonction chambre",
-                "✅ Toutes les chambres ont une fonction correcte."
-            )
+            resultat.message, resultat.niveau = "\n".join(erreurs_messages), "warning"
+        return resultat
 
 # ============================================================
 # ============================================================
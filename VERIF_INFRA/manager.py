@@ -1,10 +1,13 @@
-from qgis.PyQt.QtWidgets import QAction, QMenu, QMessageBox, QInputDialog
-from qgis.PyQt.QtGui import QIcon
-from qgis.core import QgsProject, QgsVectorLayer, QgsWkbTypes, QgsSpatialIndex
+from qgis.PyQt.QtWidgets import QAction, QMessageBox, QInputDialog
+from qgis.core import Qgis, QgsMessageLog, QgsProject, QgsVectorLayer
 import os
 
 
 from .main import MonPlugin
+from .scheduler import CONTROLES
+from .incremental import SuiviModifications
+from .export import dossier_export
+from .profiling import activer as activer_profilage, desactiver as desactiver_profilage, JOURNAL
 
 
 class MonPlugIn_(MonPlugin):
@@ -26,33 +29,32 @@ class MonPlugIn_(MonPlugin):
             action.triggered.connect(func)
             self.menu.addAction(action)
 
+        self.action_incremental = QAction("MODE INCRÉMENTAL", self.iface.mainWindow())
+        self.action_incremental.setCheckable(True)
+        self.action_incremental.toggled.connect(self.basculer_incremental)
+        self.menu.addAction(self.action_incremental)
+
+        self.action_profilage = QAction("PROFILAGE", self.iface.mainWindow())
+        self.action_profilage.setCheckable(True)
+        self.action_profilage.toggled.connect(self.basculer_profilage)
+        self.menu.addAction(self.action_profilage)
+
     # Ici tu ajoutes tes fonctions spécifiques Manager
 
 
     def run_all_checks(self):
         """
-        Exécute tous les contrôles en séquence
+        Exécute tous les contrôles dans une seule tâche de fond : couches lues une fois,
+        analyses en parallèle (cf. scheduler.py), progression par contrôle, annulable
+        depuis le gestionnaire de tâches QGIS.
+        Les saisies sont demandées avant le lancement, les rapports affichés à la fin.
         """
-        controles = [
-            self.null_values,
-            self.check_name_duplicates,
-            self.check_geometry_duplicates,
-            self.accrochage_lignes_points,
-            self.detecter_fantomes,
-            self.verifier_tranchee_canalisation,
-            self.verifier_type_canal,
-            self.verifier_supports,
-            self.verifier_connexions,
-            self.verifier_cps_tranchee,
-            self.verifier_fonction_chambre,
-        ]
+        # Un seul instantané pour toute l'exécution : chaque couche n'est lue qu'une fois
+        self.lancer_controles(CONTROLES, "VERIF'INFRA – TOTAL CONTROL", self.bilan_controles, parallele=True)
 
-        erreurs = []
-        for controle in controles:
-            try:
-                controle()
-            except Exception as e:
-                erreurs.append(f"{controle.__name__} → {str(e)}")
+    def bilan_controles(self, erreurs, non_executes):
+        if non_executes:
+            erreurs = erreurs + ["TOTAL CONTROL annulé, contrôles non exécutés : " + ", ".join(non_executes)]
 
         if erreurs:
             QMessageBox.warning(
@@ -69,6 +71,37 @@ class MonPlugIn_(MonPlugin):
 
 
 
+    def basculer_incremental(self, actif):
+        """Mode incrémental : les relances ne revérifient que les entités modifiées et leurs voisines."""
+        if self.suivi is not None:
+            self.suivi.arreter()
+            self.suivi = None
+        if not actif:
+            return
+        grp = QgsProject.instance().layerTreeRoot().findGroup("Infrastructure")
+        if grp is None:
+            QMessageBox.warning(None, "Mode incrémental", "❌ Groupe 'Infrastructure' introuvable.")
+            self.action_incremental.setChecked(False)
+            return
+        self.suivi = SuiviModifications()
+        self.suivi.suivre([node.layer() for node in grp.findLayers() if isinstance(node.layer(), QgsVectorLayer)])
+
+    def basculer_profilage(self, actif):
+        """Profilage : temps, lectures, requêtes d'index, prédicats GEOS et pic mémoire de chaque contrôle."""
+        if not actif:
+            desactiver_profilage()
+            return
+        aucun = "(aucun)"
+        controle, ok = QInputDialog.getItem(None, "Profilage", "Capture cProfile de l'analyse :",
+                                            [aucun] + CONTROLES, 0, False)
+        if not ok:
+            self.action_profilage.setChecked(False)
+            return
+        chemin = os.path.join(dossier_export(), "profilage.jsonl")
+        activer_profilage(chemin, cprofile=None if controle == aucun else controle)
+        QgsMessageLog.logMessage(f"Profilage actif : {chemin} (contrôles exécutés un par un pour le pic mémoire)",
+                                 JOURNAL, Qgis.Info)
+
     def verifier_couches_groupes(self):
 
         # Définition des groupes et leurs couches
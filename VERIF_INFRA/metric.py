@@ -0,0 +1,70 @@
+import math
+
+
+# Rayon moyen de la Terre (IUGG), en mètres
+RAYON_TERRE = 6371008.8
+
+
+def projeter_local(points, geographique):
+    """Coordonnées métriques {fid: (x, y)} à partir de {fid: QgsPointXY}.
+
+    Couche géographique (ex. EPSG:4326) : projection équirectangulaire centrée sur
+    la latitude moyenne des points, précise au centimètre à l'échelle d'une ZR.
+    Couche projetée : les coordonnées sont déjà en mètres et sont reprises telles quelles.
+    """
+    if not points:
+        return {}
+    if not geographique:
+        return {fid: (pt.x(), pt.y()) for fid, pt in points.items()}
+    lat0 = math.radians(sum(pt.y() for pt in points.values()) / len(points))
+    kx = RAYON_TERRE * math.cos(lat0) * math.pi / 180.0
+    ky = RAYON_TERRE * math.pi / 180.0
+    return {fid: (pt.x() * kx, pt.y() * ky) for fid, pt in points.items()}
+
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """Distance géodésique (sphère) en mètres entre deux points lon/lat en degrés."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dl = math.radians(lon2 - lon1)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RAYON_TERRE * math.asin(min(1.0, math.sqrt(a)))
+
+
+def metres_en_unites(metres, geographique):
+    """Longueur `metres` exprimée dans les unités d'une couche (degrés si géographique).
+
+    Un degré vaut au plus RAYON_TERRE·π/180 m (le long d'un méridien) : en degrés,
+    la longueur obtenue n'est jamais plus grande que `metres` sur le terrain.
+    """
+    return metres * 180.0 / (math.pi * RAYON_TERRE) if geographique else metres
+
+
+# Demi-voisinage : chaque paire de cellules voisines n'est visitée qu'une fois
+_VOISINES = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+def paires_voisines(points_m, rayon):
+    """Itère (fid1, fid2) pour chaque paire de points à au plus `rayon` mètres (chaque paire une fois).
+
+    points_m : {fid: (x, y)} en mètres. Grille de pas `rayon` : un point ne peut avoir de
+    voisin que dans sa cellule ou les 8 cellules autour, d'où un coût quasi linéaire.
+    """
+    grille = {}
+    for fid, (x, y) in points_m.items():
+        grille.setdefault((int(x // rayon), int(y // rayon)), []).append((fid, x, y))
+
+    r2 = rayon * rayon
+    for (cx, cy), membres in grille.items():
+        for i, (fa, xa, ya) in enumerate(membres):
+            for fb, xb, yb in membres[i + 1:]:
+                if (xa - xb) ** 2 + (ya - yb) ** 2 <= r2:
+                    yield fa, fb
+        for dx, dy in _VOISINES:
+            autres = grille.get((cx + dx, cy + dy))
+            if not autres:
+                continue
+            for fa, xa, ya in membres:
+                for fb, xb, yb in autres:
+                    if (xa - xb) ** 2 + (ya - yb) ** 2 <= r2:
+                        yield fa, fb
@@ -0,0 +1,246 @@
+import re
+import unicodedata
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+
+from .nulls import est_vide
+
+
+# ============================================================
+# Index d'unicité des NOM / id.
+# Les couches sont ajoutées une à une : seules les colonnes NOM et id sont
+# lues (LayerSnapshot.colonnes, sans géométrie). Pour chaque valeur, l'index
+# ne garde que sa première occurrence ; les occurrences suivantes sont
+# rangées à part, si bien que la mémoire reste proportionnelle au nombre de
+# noms distincts. Les NOM sont comparés sur tout le projet (collisions entre
+# couches comprises) ; les id, numérotés couche par couche, seulement à
+# l'intérieur de leur couche.
+# ============================================================
+
+CHAMPS_ID = ("id", "ID", "Id")
+
+Doublon = namedtuple("Doublon", "champ valeur occurrences")
+# occurrences : [(LayerSnapshot, [fids])], une entrée par couche concernée, dans l'ordre d'ajout
+
+
+def champ_id(couche):
+    """Champ d'identifiant métier d'une couche, ou None."""
+    for champ in CHAMPS_ID:
+        if couche.a_champ(champ):
+            return champ
+    return None
+
+
+def cle_nom(valeur):
+    """Clé de comparaison d'un NOM / id, ou None pour une valeur vide."""
+    if est_vide(valeur):
+        return None
+    return str(valeur).strip()
+
+
+# ============================================================
+# Noms proches : "Cham_001", "CHAM_1", "Cham-001 ", "Chàm_001" désignent
+# probablement la même entité. Chaque nom est réduit à une forme normalisée
+# (casse, accents, séparateurs, zéros de remplissage) : un squelette où les
+# nombres sont remplacés par '#', et la suite de ces nombres, qui doit rester
+# identique. Les fautes de frappe (une lettre en trop, en moins, remplacée ou
+# inversée) sont trouvées par blocs : parmi les noms portant les mêmes nombres,
+# chaque squelette est rangé sous lui-même et sous ses variantes privées d'une
+# lettre ; seuls les squelettes partageant un bloc sont comparés, jamais
+# toutes les paires.
+# ============================================================
+
+_JETONS = re.compile(r"[^\W\d_]+|\d+")
+
+# Dans un mot de moins de lettres, une lettre d'écart change le sens (PT / PC, Pot / PT) :
+# une faute de frappe n'est admise que dans un mot (jeton) d'au moins ce nombre de lettres
+LETTRES_MIN_FAUTE = 4
+
+NomNormalise = namedtuple("NomNormalise", "squelette nombres")
+
+
+def normaliser_nom(valeur):
+    """Forme normalisée d'un nom, ou None s'il est vide.
+
+    Minuscules sans accents, séparateurs ignorés, nombres sans zéros de tête :
+    'ZR-Chàm_00012' -> NomNormalise('zr_cham_#', (12,)).
+    """
+    cle = cle_nom(valeur)
+    if cle is None:
+        return None
+    if cle.isascii():
+        texte = cle.lower()
+    else:
+        texte = unicodedata.normalize("NFKD", cle)
+        texte = "".join(c for c in texte if not unicodedata.combining(c)).casefold()
+    squelette, nombres = [], []
+    for jeton in _JETONS.findall(texte):
+        if jeton.isdigit():
+            squelette.append("#")
+            nombres.append(int(jeton))
+        else:
+            squelette.append(jeton)
+    if not squelette:
+        return None
+    return NomNormalise("_".join(squelette), tuple(nombres))
+
+
+def _faute_possible(squelette, i):
+    """Vrai si squelette[i] est une lettre d'un jeton d'au moins LETTRES_MIN_FAUTE lettres."""
+    if i >= len(squelette) or not squelette[i].isalpha():
+        return False
+    debut = fin = i
+    while debut > 0 and squelette[debut - 1].isalpha():
+        debut -= 1
+    while fin < len(squelette) and squelette[fin].isalpha():
+        fin += 1
+    return fin - debut >= LETTRES_MIN_FAUTE
+
+
+@lru_cache(maxsize=4096)
+def _variantes(squelette):
+    """Le squelette et ses variantes privées d'une lettre (clés de blocs)."""
+    return (squelette,) + tuple(squelette[:i] + squelette[i + 1:]
+                                for i in range(len(squelette)) if _faute_possible(squelette, i))
+
+
+def une_faute(a, b):
+    """Vrai si a et b diffèrent d'au plus une lettre insérée, supprimée, remplacée ou inversée.
+
+    La lettre en cause doit appartenir à un jeton d'au moins LETTRES_MIN_FAUTE lettres :
+    'zr_cham_#' / 'zr_chm_#' oui, 'zr_pot_#' / 'zr_pt_#' non.
+    """
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    debut = 0
+    while debut < min(len(a), len(b)) and a[debut] == b[debut]:
+        debut += 1
+    if len(a) == len(b):
+        if a[debut + 1:] == b[debut + 1:]:
+            # remplacement
+            return _faute_possible(a, debut) and _faute_possible(b, debut)
+        # inversion de deux lettres voisines
+        return (a[debut] == b[debut + 1] and a[debut + 1] == b[debut] and a[debut + 2:] == b[debut + 2:]
+                and _faute_possible(a, debut) and _faute_possible(a, debut + 1))
+    court, long_ = (a, b) if len(a) < len(b) else (b, a)
+    return court[debut:] == long_[debut + 1:] and _faute_possible(long_, debut)
+
+
+class IndexProches:
+    """Groupes de noms distincts mais proches, alimenté nom par nom."""
+
+    def __init__(self):
+        self._normes = {}                      # NomNormalise -> [noms bruts]
+        self._squelettes = defaultdict(list)   # nombres -> [squelettes distincts]
+
+    def ajouter(self, nom):
+        """Indexe un nom brut distinct (déjà dédoublonné par l'appelant)."""
+        norme = normaliser_nom(nom)
+        if norme is None:
+            return
+        noms = self._normes.get(norme)
+        if noms is not None:
+            noms.append(nom)
+            return
+        self._normes[norme] = [nom]
+        self._squelettes[norme.nombres].append(norme.squelette)
+
+    def groupes(self):
+        """[[noms bruts]] proches, chaque groupe comptant au moins deux noms différents."""
+        parent = {}
+
+        def racine(n):
+            while parent.get(n, n) != n:
+                n = parent[n]
+            return n
+
+        for nombres, squelettes in self._squelettes.items():
+            if len(squelettes) < 2:
+                continue
+            blocs = defaultdict(list)
+            for squelette in squelettes:
+                for variante in _variantes(squelette):
+                    blocs[variante].append(squelette)
+            for bloc in blocs.values():
+                for i, a in enumerate(bloc):
+                    for b in bloc[i + 1:]:
+                        ra, rb = racine(NomNormalise(a, nombres)), racine(NomNormalise(b, nombres))
+                        if ra != rb and une_faute(a, b):
+                            parent[rb] = ra
+
+        groupes = defaultdict(list)
+        for norme, noms in self._normes.items():
+            groupes[racine(norme)].extend(noms)
+        return [noms for noms in groupes.values() if len(noms) > 1]
+
+
+class IndexUnicite:
+    """Doublons de NOM (tout le projet) et d'id (par couche), alimenté couche par couche."""
+
+    def __init__(self):
+        self.couches = []
+        self._premiers = {}                  # clé NOM -> (code couche, fid) de la première occurrence
+        self._suivants = defaultdict(list)   # clé NOM -> [(code couche, fid)] des occurrences suivantes
+        self._ids = []                       # Doublon d'id, par couche
+        self.proches = IndexProches()        # noms distincts mais proches
+
+    def ajouter(self, couche, feedback=None):
+        """Indexe les NOM / id d'un LayerSnapshot ; False si la couche n'a aucun des deux champs."""
+        id_champ = champ_id(couche)
+        champs = [ch for ch in ("NOM", id_champ) if ch and couche.a_champ(ch)]
+        if not champs:
+            return False
+        code = len(self.couches)
+        self.couches.append(couche)
+        fids, colonnes = couche.colonnes(champs, feedback)
+
+        if "NOM" in colonnes:
+            premiers, suivants = self._premiers, self._suivants
+            for fid, valeur in zip(fids, colonnes["NOM"]):
+                cle = cle_nom(valeur)
+                if cle is None:
+                    continue
+                if cle in premiers:
+                    suivants[cle].append((code, fid))
+                else:
+                    premiers[cle] = (code, fid)
+                    self.proches.ajouter(cle)
+
+        if id_champ in colonnes:
+            vus = {}
+            repetes = defaultdict(list)
+            for fid, valeur in zip(fids, colonnes[id_champ]):
+                cle = cle_nom(valeur)
+                if cle is None:
+                    continue
+                if cle in vus:
+                    repetes[cle].append(fid)
+                else:
+                    vus[cle] = fid
+            for cle, fids_suivants in repetes.items():
+                self._ids.append(Doublon(id_champ, cle, [(couche, [vus[cle]] + fids_suivants)]))
+        return True
+
+    def occurrences(self, *cles):
+        """[(LayerSnapshot, [fids])] des entités portant l'un des NOM `cles`."""
+        par_couche = defaultdict(list)
+        for cle in cles:
+            code, fid = self._premiers[cle]
+            par_couche[code].append(fid)
+            for code, fid in self._suivants.get(cle, ()):
+                par_couche[code].append(fid)
+        return [(self.couches[c], fids) for c, fids in sorted(par_couche.items())]
+
+    def doublons_noms(self):
+        """[Doublon] des NOM répétés, dans une même couche ou entre plusieurs couches."""
+        return [Doublon("NOM", cle, self.occurrences(cle)) for cle in self._suivants]
+
+    def noms_proches(self):
+        """[Doublon] des NOM proches ; valeur : tuple des variantes rencontrées."""
+        return [Doublon("NOM", tuple(sorted(noms)), self.occurrences(*noms)) for noms in self.proches.groupes()]
+
+    def doublons_ids(self):
+        """[Doublon] des id répétés dans leur couche."""
+        return list(self._ids)
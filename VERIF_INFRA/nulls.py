@@ -0,0 +1,60 @@
+from collections import Counter, namedtuple
+
+
+# ============================================================
+# Scan des valeurs vides par colonnes : seuls les attributs contrôlés sont
+# lus, sans géométrie (cf. LayerSnapshot.colonnes), et chaque colonne est
+# évaluée d'un bloc. Les valeurs numériques ne sont jamais converties en
+# texte ; seules les chaînes et les valeurs d'autres types (NULL QGIS...)
+# passent par le test textuel.
+# ============================================================
+
+# Types dont une valeur n'est jamais vide
+_TYPES_PLEINS = (int, float, bool)
+
+ScanNulls = namedtuple("ScanNulls", "vides incompletes frequences")
+# vides       : {champ: [fids des valeurs vides]}  (seulement les champs concernés)
+# incompletes : [fids des entités ayant au moins une valeur vide], dans l'ordre de lecture
+# frequences  : {champ: Counter(valeur texte)} des valeurs renseignées des champs `compter`
+
+
+def est_vide(v):
+    """None, NULL, chaîne vide / blanche ou 'null' (toute casse)."""
+    if v is None:
+        return True
+    if v.__class__ is str:
+        v = v.strip()
+        return not v or v.lower() == "null"
+    if isinstance(v, _TYPES_PLEINS):
+        return False
+    return str(v).strip().lower() == "null"
+
+
+def indices_vides(valeurs):
+    """Positions des valeurs vides d'une colonne."""
+    return [i for i, v in enumerate(valeurs)
+            if v is None or (v.__class__ not in _TYPES_PLEINS and est_vide(v))]
+
+
+def scanner_nulls(couche, exclus=(), feedback=None, compter=()):
+    """Valeurs vides de tous les champs d'un LayerSnapshot, sauf ceux de `exclus`.
+
+    Pour les champs de `compter`, les fréquences des valeurs renseignées sont relevées
+    dans la même lecture (valeur majoritaire du remplissage automatique).
+    """
+    champs = [ch for ch in couche.fields.names() if ch not in exclus]
+    fids, colonnes = couche.colonnes(champs, feedback)
+
+    vides = {}
+    frequences = {}
+    incomplete = bytearray(len(fids))
+    for champ in champs:
+        valeurs = colonnes.get(champ, ())
+        positions = indices_vides(valeurs)
+        if positions:
+            vides[champ] = [fids[i] for i in positions]
+            for i in positions:
+                incomplete[i] = 1
+        if champ in compter:
+            frequences[champ] = Counter(str(v).strip() for v in valeurs if v and not est_vide(v))
+    return ScanNulls(vides, [fid for fid, marque in zip(fids, incomplete) if marque], frequences)
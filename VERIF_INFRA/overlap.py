@@ -0,0 +1,131 @@
+from collections import defaultdict, namedtuple
+
+from qgis.core import QgsGeometry
+
+from .profiling import compter, compter_predicat, phase
+
+
+# ============================================================
+# Moteur de recouvrement de lignes : géométries préparées (GEOS) et
+# prédicats peu coûteux avant tout calcul d'intersection complet.
+#   1. index spatial      -> emprises qui se chevauchent
+#   2. intersects préparé -> les lignes se touchent-elles vraiment ?
+#   3. touches / crosses  -> contact en un point seulement (extrémités,
+#                            croisement) : aucune longueur commune possible
+#   4. intersection       -> uniquement pour les paires restantes
+# ============================================================
+
+Recouvrement = namedtuple("Recouvrement", "fid1 fid2 longueur ratio1 ratio2 commun")
+
+Couverture = namedtuple("Couverture", "couverte longueur")  # unités de la couche
+
+
+def recouvrements(couche_a, couche_b=None):
+    """Itère les Recouvrement (longueur commune > 0) entre lignes de deux LayerSnapshot.
+
+    Sans `couche_b`, compare la couche à elle-même (chaque paire une seule fois, fid1 < fid2).
+    ratio1 / ratio2 : part de la longueur de chaque ligne couverte par la partie commune.
+    commun : géométrie de la partie commune (QgsGeometry).
+    """
+    meme_couche = couche_b is None
+    couche_b = couche_a if meme_couche else couche_b
+    index_b = couche_b.spatial_index()
+    geoms_b = dict(couche_b.geometries())
+    longueurs_b = {}
+    requetes = intersects = contacts = intersections = 0  # compteurs du profilage
+
+    # phase() n'entoure que les appels GEOS, jamais le yield : le travail de l'appelant
+    # n'est pas compté comme prédicats, et un itérateur abandonné ne laisse aucune phase ouverte
+    for fid_a, geom_a in couche_a.geometries():
+        moteur = None
+        longueur_a = None
+        requetes += 1
+        for fid_b in index_b.intersects(geom_a.boundingBox()):
+            if meme_couche and fid_b <= fid_a:
+                continue
+            geom_b = geoms_b[fid_b]
+            autre = geom_b.constGet()
+            with phase("predicats"):
+                if moteur is None:
+                    moteur = QgsGeometry.createGeometryEngine(geom_a.constGet())
+                    moteur.prepareGeometry()
+                intersects += 1
+                if not moteur.intersects(autre):
+                    continue
+                contacts += 1
+                if moteur.touches(autre) or moteur.crosses(autre):
+                    continue
+                intersections += 1
+                commun = geom_a.intersection(geom_b)
+                longueur = commun.length()
+            if longueur <= 0:
+                continue
+            if longueur_a is None:
+                longueur_a = geom_a.length()
+            longueur_b = longueurs_b.get(fid_b)
+            if longueur_b is None:
+                longueur_b = longueurs_b[fid_b] = geom_b.length()
+            yield Recouvrement(fid_a, fid_b, longueur,
+                               longueur / longueur_a if longueur_a else 0.0,
+                               longueur / longueur_b if longueur_b else 0.0,
+                               commun)
+
+    compter("requetes_index", requetes)
+    compter_predicat("intersects", intersects)
+    compter_predicat("touches/crosses", contacts)
+    compter_predicat("intersection", intersections)
+
+
+def classer(recouvrement, seuil_total=0.99, seuil_partiel=0.1):
+    """'totale', 'partielle' ou None selon les ratios de recouvrement des deux lignes."""
+    if recouvrement.ratio1 >= seuil_total and recouvrement.ratio2 >= seuil_total:
+        return "totale"
+    if recouvrement.ratio1 >= seuil_partiel or recouvrement.ratio2 >= seuil_partiel:
+        return "partielle"
+    return None
+
+
+def couverture(couche_a, couche_b):
+    """Longueurs couvertes croisées de deux couches linéaires, en un seul passage.
+
+    Retourne (couverture_a, couverture_b) : {fid: Couverture(couverte, longueur)} pour toutes
+    les lignes à géométrie non vide de chaque couche. Les parties communes d'une ligne avec
+    plusieurs lignes de l'autre couche sont fusionnées avant d'être mesurées : deux tranchées
+    superposées sur le même tronçon de canalisation ne le comptent qu'une fois.
+    """
+    communs_a, communs_b = defaultdict(list), defaultdict(list)
+    for rec in recouvrements(couche_a, couche_b):
+        communs_a[rec.fid1].append(rec.commun)
+        communs_b[rec.fid2].append(rec.commun)
+    return _couverture(couche_a, communs_a), _couverture(couche_b, communs_b)
+
+
+def _couverture(couche, communs):
+    resultat = {}
+    for fid, geom in couche.geometries():
+        longueur = geom.length()
+        parties = communs.get(fid)
+        if not parties:
+            couverte = 0.0
+        elif len(parties) == 1:
+            couverte = parties[0].length()
+        else:
+            couverte = QgsGeometry.unaryUnion(parties).length()
+        resultat[fid] = Couverture(min(couverte, longueur), longueur)
+    return resultat
+
+
+def appariements(couche_a, couche_b, seuil=0.1):
+    """Pour chaque ligne de couche_a, les lignes de couche_b qu'elle longe réellement.
+
+    Retourne {fid_a: [Recouvrement]}, triés par longueur commune décroissante : le premier
+    est l'appariement dominant. Les recouvrements anecdotiques (moins de `seuil` de chacune
+    des deux lignes, ex. quelques centimètres communs à une jonction) sont écartés.
+    """
+    apparies = defaultdict(list)
+    for rec in recouvrements(couche_a, couche_b):
+        if rec.ratio1 >= seuil or rec.ratio2 >= seuil:
+            apparies[rec.fid1].append(rec)
+    for recs in apparies.values():
+        recs.sort(key=lambda rec: rec.longueur, reverse=True)
+    return dict(apparies)
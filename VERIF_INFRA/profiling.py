@@ -0,0 +1,291 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from qgis.core import QgsMessageLog, Qgis
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# ============================================================
+# Profilage des contrôles.
+# Quand un Profileur est actif (activer / desactiver), chaque contrôle est
+# mesuré autour de son analyse (scheduler.executer_une), chaque lecture de
+# couche de TOTAL CONTROL autour de son préchargement, chaque export de
+# constats dans la tâche, chaque rapport sur le thread principal. Les
+# chemins chauds y ajoutent leurs compteurs :
+#   compter()          lectures fournisseur et entités lues (snapshot.py),
+#                      index construits, requêtes d'index (endpoints.py, overlap.py)
+#   compter_predicat() prédicats GEOS (overlap.py, géométries fantômes)
+#   phase()            temps exclusif par phase : lecture, index, predicats,
+#                      selection ; le reste est compté dans l'étape elle-même
+# La mesure courante est propre au thread : des contrôles exécutés en
+# parallèle ne mélangent pas leurs compteurs. La mémoire est celle du
+# processus (mémoire résidente, allocations C++ de QGIS et GEOS comprises) :
+# chaque mesure relève le pic du processus à sa fin, et la hausse de ce pic
+# n'est attribuée qu'aux mesures qui ne se sont chevauchées avec aucune autre.
+# Avec la mémoire (par défaut), les contrôles sont donc exécutés un par un
+# (cf. sequentiel()) ; seule la hausse du pic au-delà de celui déjà atteint
+# est visible. Dans un processus dédié (ligne de commande), remettre_pic
+# remet le pic à zéro au début de chaque mesure (Linux : clear_refs, qui
+# touche tout le processus, jamais fait dans QGIS).
+# Chaque mesure est écrite dans le journal QGIS et en une ligne JSON ;
+# un seul contrôle peut en plus être capturé par cProfile (.prof + .txt).
+# Sans profileur, compter() et phase() ne font qu'un test.
+# ============================================================
+
+JOURNAL = "VERIF'INFRA – Profilage"
+
+LIGNES_CPROFILE = 40  # fonctions listées dans le résumé texte d'une capture cProfile
+
+_courante = threading.local()  # .mesure : Mesure en cours dans ce thread
+_profileur = None
+
+actif = False  # test le moins coûteux possible pour les boucles les plus chaudes
+
+
+class Mesure:
+    """Compteurs d'une étape (analyse, lecture ou rapport) d'un contrôle."""
+
+    def __init__(self, controle, etape):
+        self.controle = controle
+        self.etape = etape
+        self.debut = time.perf_counter()
+        self.secondes = 0.0
+        self.compteurs = Counter()             # entites_lues, lectures, requetes_index, index_construits
+        self.predicats = Counter()             # prédicat GEOS -> nombre d'appels
+        self.couches = defaultdict(Counter)    # nom de couche -> Counter(entites_lues, lectures)
+        self.phases = Counter()                # phase -> secondes (temps exclusif)
+        self.memoire_pic = None                # hausse du pic mémoire du processus pendant la mesure (octets)
+        self.rss_pic = None                    # pic mémoire du processus à la fin de la mesure (octets)
+        self.seule = True                      # aucune autre mesure ouverte pendant celle-ci
+        self.erreur = None
+        self.cprofile = None                   # chemin de la capture cProfile
+        self._pile = [etape]
+        self._depuis = self.debut
+        self._memoire_debut = None
+        self._profil = None
+
+    def basculer(self, phase):
+        """Entre dans `phase` (ou revient à la phase précédente si None), en comptant le temps écoulé."""
+        maintenant = time.perf_counter()
+        self.phases[self._pile[-1]] += maintenant - self._depuis
+        self._depuis = maintenant
+        if phase is None:
+            self._pile.pop()
+        else:
+            self._pile.append(phase)
+
+    def dict(self):
+        return {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "controle": self.controle,
+            "etape": self.etape,
+            "secondes": round(self.secondes, 4),
+            "phases": {phase: round(s, 4) for phase, s in self.phases.most_common()},
+            "entites_lues": self.compteurs["entites_lues"],
+            "lectures": self.compteurs["lectures"],
+            "requetes_index": self.compteurs["requetes_index"],
+            "index_construits": self.compteurs["index_construits"],
+            "predicats": dict(self.predicats),
+            "couches": {nom: dict(c) for nom, c in self.couches.items()},
+            "memoire_pic": self.memoire_pic,
+            "rss_pic": self.rss_pic,
+            "cprofile": self.cprofile,
+            "erreur": self.erreur,
+        }
+
+    def resume(self):
+        texte = (f"⏱ {self.controle} [{self.etape}] {self.secondes:.3f} s — "
+                 f"{self.compteurs['entites_lues']} entité(s) lue(s) en {self.compteurs['lectures']} lecture(s), "
+                 f"{self.compteurs['requetes_index']} requête(s) d'index, "
+                 f"{sum(self.predicats.values())} prédicat(s) GEOS")
+        if self.memoire_pic is not None:
+            texte += f", pic mémoire +{self.memoire_pic / 1e6:.1f} Mo"
+        if self.rss_pic is not None:
+            texte += f" (processus {self.rss_pic / 1e6:.0f} Mo)"
+        phases = ", ".join(f"{phase} {s:.3f} s" for phase, s in self.phases.most_common() if s >= 0.001)
+        return texte + (f" — {phases}" if phases else "")
+
+
+class Profileur:
+    """Reçoit les mesures : journal QGIS, fichier JSON lignes, capture cProfile d'un contrôle."""
+
+    def __init__(self, chemin, cprofile=None, memoire=True, remettre_pic=False):
+        self.chemin = chemin
+        self.cprofile = cprofile      # nom du contrôle dont l'analyse est capturée, ou None
+        self.memoire = memoire and pic_memoire() is not None
+        self.remettre_pic = remettre_pic
+        self._verrou = threading.Lock()
+        self._ouvertes = set()
+        dossier = os.path.dirname(os.path.abspath(chemin))
+        os.makedirs(dossier, exist_ok=True)
+
+    def ouvrir(self, controle, etape):
+        mesure = Mesure(controle, etape)
+        with self._verrou:
+            if self._ouvertes:
+                mesure.seule = False
+                for autre in self._ouvertes:
+                    autre.seule = False
+            elif self.memoire:
+                if self.remettre_pic:
+                    _remettre_pic_memoire()
+                mesure._memoire_debut = pic_memoire()
+            self._ouvertes.add(mesure)
+        if controle == self.cprofile and etape == "analyse":
+            mesure._profil = cProfile.Profile()
+            try:
+                mesure._profil.enable()
+            except ValueError:  # un autre profileur est déjà actif
+                mesure._profil = None
+        return mesure
+
+    def fermer(self, mesure):
+        if mesure._profil is not None:
+            mesure._profil.disable()
+        mesure.basculer(None)
+        mesure.secondes = time.perf_counter() - mesure.debut
+        with self._verrou:
+            self._ouvertes.discard(mesure)
+            if self.memoire:
+                mesure.rss_pic = pic_memoire()
+                if mesure.seule and mesure._memoire_debut is not None:
+                    mesure.memoire_pic = max(0, mesure.rss_pic - mesure._memoire_debut)
+            if mesure._profil is not None:
+                mesure.cprofile = self._ecrire_cprofile(mesure)
+            with open(self.chemin, "a", encoding="utf-8") as f:
+                f.write(json.dumps(mesure.dict(), ensure_ascii=False) + "\n")
+        QgsMessageLog.logMessage(mesure.resume(), JOURNAL, Qgis.Info)
+
+    def _ecrire_cprofile(self, mesure):
+        """Écrit la capture (.prof, pour snakeviz / pstats) et son résumé texte ; retourne le .prof."""
+        base = os.path.join(os.path.dirname(os.path.abspath(self.chemin)),
+                            f"{mesure.controle}_{datetime.now():%Y%m%d_%H%M%S}")
+        mesure._profil.dump_stats(base + ".prof")
+        texte = io.StringIO()
+        pstats.Stats(mesure._profil, stream=texte).sort_stats("cumulative").print_stats(LIGNES_CPROFILE)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(texte.getvalue())
+        return base + ".prof"
+
+
+def pic_memoire():
+    """Pic de mémoire résidente du processus en octets (allocations C++ comprises), ou None."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:  # Linux : VmHWM, remis à zéro par clear_refs
+            for ligne in f:
+                if ligne.startswith("VmHWM:"):
+                    return int(ligne.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    if psutil is not None:
+        pic = getattr(psutil.Process().memory_info(), "peak_wset", None)  # Windows
+        if pic is not None:
+            return pic
+    if resource is not None:
+        pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pic if sys.platform == "darwin" else pic * 1024  # octets sous macOS, Ko ailleurs
+    return None
+
+
+def _remettre_pic_memoire():
+    """Ramène le pic à la mémoire résidente actuelle (Linux seulement) ; False si impossible."""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def activer(chemin, cprofile=None, memoire=True, remettre_pic=False):
+    """Active le profilage ; les mesures sont ajoutées au fichier JSON lignes `chemin`.
+
+    cprofile : nom d'un contrôle dont l'analyse est aussi capturée par cProfile.
+    memoire=False : sans pic mémoire par contrôle, TOTAL CONTROL reste alors parallèle.
+    remettre_pic : pic mémoire remis à zéro à chaque mesure ; processus dédié seulement.
+    """
+    global _profileur, actif
+    desactiver()
+    _profileur = Profileur(chemin, cprofile, memoire, remettre_pic)
+    actif = True
+    return _profileur
+
+
+def desactiver():
+    global _profileur, actif
+    actif = False
+    _profileur = None
+
+
+def sequentiel():
+    """Vrai si les contrôles doivent être exécutés un par un : pic mémoire attribuable à chacun."""
+    profileur_actif = _profileur
+    return profileur_actif is not None and profileur_actif.memoire
+
+
+@contextmanager
+def mesurer(controle, etape="analyse"):
+    """Mesure le bloc comme étape `etape` du contrôle `controle` (rien sans profileur actif)."""
+    profileur_actif = _profileur
+    if profileur_actif is None:
+        yield None
+        return
+    mesure = profileur_actif.ouvrir(controle, etape)
+    precedente = getattr(_courante, "mesure", None)
+    _courante.mesure = mesure
+    try:
+        yield mesure
+    except BaseException as e:
+        mesure.erreur = type(e).__name__
+        raise
+    finally:
+        _courante.mesure = precedente
+        profileur_actif.fermer(mesure)
+
+
+@contextmanager
+def phase(nom):
+    """Compte le temps du bloc dans la phase `nom` de la mesure en cours (temps exclusif)."""
+    mesure = getattr(_courante, "mesure", None)
+    if mesure is None:
+        yield
+        return
+    mesure.basculer(nom)
+    try:
+        yield
+    finally:
+        mesure.basculer(None)
+
+
+def compter(cle, n=1, couche=None):
+    """Ajoute `n` au compteur `cle` de la mesure en cours (et de la couche `couche`)."""
+    mesure = getattr(_courante, "mesure", None)
+    if mesure is None:
+        return
+    mesure.compteurs[cle] += n
+    if couche is not None:
+        mesure.couches[couche][cle] += n
+
+
+def compter_predicat(nom, n=1):
+    mesure = getattr(_courante, "mesure", None)
+    if mesure is not None:
+        mesure.predicats[nom] += n
@@ -0,0 +1,236 @@
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from qgis.PyQt.QtWidgets import (
+    QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QLabel, QPushButton,
+    QTableView, QHeaderView, QAbstractItemView
+)
+
+from .tasks import Constat
+
+
+# ============================================================
+# Panneau des résultats.
+# Les constats (un par entité en erreur) sont gardés dans une simple liste
+# de tuples ; la table n'en présente que les lignes déjà demandées par la vue
+# (canFetchMore / fetchMore, par lots), si bien que 100 000 constats
+# s'affichent sans bloquer l'interface. Le texte de recherche de chaque
+# constat (en minuscules) est calculé une fois, à la publication ; le filtre,
+# appliqué une fois la saisie arrêtée (DELAI_FILTRE), n'est plus qu'une
+# recherche de sous-chaîne sur ces textes, puis la table repart de son
+# premier lot.
+# Un clic sur une ligne centre la carte sur l'entité.
+# ============================================================
+
+LOT_LIGNES = 500
+
+# Délai (ms) sans frappe avant d'appliquer le filtre : un seul filtrage par saisie
+DELAI_FILTRE = 250
+
+# Au-delà, le message des boîtes de dialogue est abrégé (détail dans le panneau)
+LIGNES_MESSAGE_MAX = 40
+
+NIVEAUX = {"information": "Info", "warning": "Avertissement", "critical": "Critique"}
+
+COLONNES = ["Contrôle", "Couche", "Entité", "Gravité", "Message"]
+
+
+def constats_resultat(nom, resultat):
+    """[Constat] publiables d'un Resultat.
+
+    Constats explicites (Resultat.constater) complétés du nom du contrôle et du niveau
+    du résultat ; à défaut, un constat par entité sélectionnée, avec le titre du résultat.
+    """
+    if resultat.constats:
+        return [Constat(nom, c.couche, c.fid, c.niveau or resultat.niveau, c.message)
+                for c in resultat.constats]
+    return [Constat(nom, layer, fid, resultat.niveau, resultat.titre)
+            for layer, fids in resultat.selections.items()
+            for fid in sorted(fids)]
+
+
+def abreger(message, lignes_max=LIGNES_MESSAGE_MAX):
+    """Message limité à `lignes_max` lignes (texte ou HTML), avec le nombre de lignes omises."""
+    separateur = "<br>" if "<br>" in message else "\n"
+    lignes = message.split(separateur)
+    if len(lignes) <= lignes_max:
+        return message
+    reste = len(lignes) - lignes_max
+    return separateur.join(lignes[:lignes_max] + [f"… {reste} ligne(s) de plus dans le panneau VERIF'INFRA – Résultats"])
+
+
+class ModeleConstats(QAbstractTableModel):
+    """Table des constats, chargée par lots à mesure du défilement."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._constats = []   # tous les constats
+        self._textes = []     # texte de recherche en minuscules de chaque constat (même ordre)
+        self._lignes = []     # indices des constats retenus par le filtre
+        self._charges = 0     # lignes déjà présentées à la vue
+        self._filtre = ""
+
+    # ---------- contenu ----------
+
+    def remplacer(self, controles, constats):
+        """Remplace les constats des contrôles `controles` par `constats`."""
+        controles = set(controles)
+        self.beginResetModel()
+        gardes = [i for i, c in enumerate(self._constats) if c.controle not in controles]
+        self._constats = [self._constats[i] for i in gardes]
+        self._textes = [self._textes[i] for i in gardes]
+        noms = {}
+        for constat in constats:
+            self._constats.append(constat)
+            self._textes.append(self._texte(constat, noms))
+        self._appliquer_filtre()
+        self.endResetModel()
+
+    def vider(self):
+        self.beginResetModel()
+        self._constats, self._textes, self._lignes, self._charges = [], [], [], 0
+        self.endResetModel()
+
+    def filtrer(self, texte):
+        self.beginResetModel()
+        self._filtre = texte.strip().lower()
+        self._appliquer_filtre()
+        self.endResetModel()
+
+    def _appliquer_filtre(self):
+        if not self._filtre:
+            self._lignes = list(range(len(self._constats)))
+        else:
+            self._lignes = [i for i, texte in enumerate(self._textes) if self._filtre in texte]
+        self._charges = min(LOT_LIGNES, len(self._lignes))
+
+    def _texte(self, constat, noms):
+        cle = id(constat.couche)
+        if cle not in noms:
+            noms[cle] = _nom_couche(constat.couche).lower()
+        return f"{constat.controle} {noms[cle]} {constat.fid} {constat.niveau} {constat.message}".lower()
+
+    def constat(self, ligne):
+        return self._constats[self._lignes[ligne]]
+
+    def total(self):
+        return len(self._constats)
+
+    def retenus(self):
+        return len(self._lignes)
+
+    # ---------- chargement par lots ----------
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._charges < len(self._lignes)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        n = min(LOT_LIGNES, len(self._lignes) - self._charges)
+        if n <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._charges, self._charges + n - 1)
+        self._charges += n
+        self.endInsertRows()
+
+    # ---------- QAbstractTableModel ----------
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._charges
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLONNES)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLONNES[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        constat = self.constat(index.row())
+        colonne = index.column()
+        if colonne == 0:
+            return constat.controle
+        if colonne == 1:
+            return _nom_couche(constat.couche)
+        if colonne == 2:
+            return str(constat.fid)
+        if colonne == 3:
+            return NIVEAUX.get(constat.niveau, constat.niveau)
+        return constat.message
+
+
+def _nom_couche(layer):
+    return "(couche supprimée)" if sip.isdeleted(layer) else layer.name()
+
+
+class DockConstats(QDockWidget):
+    """Panneau ancrable listant les constats ; un clic zoome sur l'entité."""
+
+    def __init__(self, iface, parent=None):
+        super().__init__("VERIF'INFRA – Résultats", parent)
+        self.setObjectName("VerifInfraResultats")
+        self.iface = iface
+        self.modele = ModeleConstats(self)
+
+        self.filtre = QLineEdit()
+        self.filtre.setPlaceholderText("Filtrer (contrôle, couche, message…)")
+        self.filtre.setClearButtonEnabled(True)
+        self._minuterie_filtre = QTimer(self)
+        self._minuterie_filtre.setSingleShot(True)
+        self._minuterie_filtre.setInterval(DELAI_FILTRE)
+        self._minuterie_filtre.timeout.connect(self._filtrer)
+        self.filtre.textChanged.connect(lambda _texte: self._minuterie_filtre.start())  # relancée à chaque frappe
+        self.compte = QLabel()
+        bouton_vider = QPushButton("Vider")
+        bouton_vider.clicked.connect(self.vider)
+
+        self.table = QTableView()
+        self.table.setModel(self.modele)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setWordWrap(False)
+        self.table.verticalHeader().setVisible(False)
+        # Hauteur de ligne fixe : la vue ne mesure pas chaque ligne
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(self.table.fontMetrics().height() + 6)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.clicked.connect(self.zoomer)
+
+        barre = QHBoxLayout()
+        barre.addWidget(self.filtre)
+        barre.addWidget(self.compte)
+        barre.addWidget(bouton_vider)
+        contenu = QWidget()
+        disposition = QVBoxLayout(contenu)
+        disposition.addLayout(barre)
+        disposition.addWidget(self.table)
+        self.setWidget(contenu)
+        self._compter()
+
+    def publier(self, controles, constats):
+        self.modele.remplacer(controles, constats)
+        self._compter()
+
+    def vider(self):
+        self.modele.vider()
+        self._compter()
+
+    def _filtrer(self):
+        self.modele.filtrer(self.filtre.text())
+        self._compter()
+
+    def _compter(self):
+        total, retenus = self.modele.total(), self.modele.retenus()
+        self.compte.setText(f"{retenus} / {total}" if retenus != total else f"{total} constat(s)")
+
+    def zoomer(self, index):
+        constat = self.modele.constat(index.row())
+        layer = constat.couche
+        if sip.isdeleted(layer) or constat.fid is None:
+            return
+        canvas = self.iface.mapCanvas()
+        canvas.zoomToFeatureIds(layer, [constat.fid])
+        canvas.flashFeatureIds(layer, [constat.fid])
@@ -0,0 +1,180 @@
+import os
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from qgis.core import QgsMessageLog, Qgis
+
+from .endpoints import COUCHES_NOEUDS
+from .graph import COUCHES_ARETES
+from .snapshot import ControleAnnule
+from .profiling import mesurer
+
+
+# ============================================================
+# Ordonnanceur de TOTAL CONTROL.
+# Chaque contrôle déclare les couches qu'il lit (analyse) et celles qu'il
+# peut modifier (rapport : remplissage, suppression, renommage). Les analyses
+# ne font que lire l'instantané : elles tournent toutes en parallèle sur des
+# threads, après une lecture unique et parallèle des couches nécessaires.
+# Les rapports qui écrivent sont repoussés à la fin, pour que les sélections
+# des autres contrôles portent sur les données analysées.
+# Noms : couche, groupe de l'arbre des couches, ou '*' pour tout le projet.
+# ============================================================
+
+# Contrôles de TOTAL CONTROL, dans l'ordre des rapports
+CONTROLES = [
+    "null_values",
+    "check_name_duplicates",
+    "check_geometry_duplicates",
+    "accrochage_lignes_points",
+    "detecter_fantomes",
+    "verifier_tranchee_canalisation",
+    "verifier_type_canal",
+    "verifier_supports",
+    "verifier_connexions",
+    "verifier_cps_tranchee",
+    "verifier_fonction_chambre",
+]
+
+COUCHES_RESEAU = COUCHES_NOEUDS + COUCHES_ARETES
+
+COUCHES_FANTOMES = ['Chambre', 'Canalisation', 'Support', 'Tranchee', 'Poteau',
+                    'Point Technique', 'point GC', 'Site', 'Batiment']
+
+
+def _couches_accrochage(params):
+    _, sel = params
+    return sel['points'] + sel['lignes']
+
+
+LECTURES = {
+    "null_values": ["Infrastructure"],
+    "check_name_duplicates": ["*"],
+    "check_geometry_duplicates": ["Infrastructure"],
+    "accrochage_lignes_points": _couches_accrochage,  # dépend du groupe choisi
+    "detecter_fantomes": COUCHES_FANTOMES,
+    "verifier_tranchee_canalisation": ["Canalisation", "Tranchee"],
+    "verifier_type_canal": COUCHES_RESEAU,
+    "verifier_supports": COUCHES_RESEAU,
+    "verifier_connexions": ["Canalisation", "Chambre"],
+    "verifier_cps_tranchee": ["Canalisation", "Tranchee"],
+    "verifier_fonction_chambre": ["Canalisation", "Chambre"],
+}
+
+# Contrôles qui ne lisent que des colonnes, sans géométrie (LayerSnapshot.colonnes) :
+# leurs couches ne sont pas préchargées en entier par TOTAL CONTROL
+COLONNES_SEULES = {"null_values", "check_name_duplicates"}
+
+ECRITURES = {
+    "null_values": ["Infrastructure"],  # REP, NOM_SR, PROJET
+    "check_name_duplicates": ['Chambre', 'Point Technique', 'Poteau', 'Batiment',
+                              'Tranchee', 'Canalisation', 'Support'],  # renommage
+    "detecter_fantomes": COUCHES_FANTOMES,  # suppression
+}
+
+
+def couches_lues(nom, params=None):
+    lectures = LECTURES.get(nom, ["*"])
+    return lectures(params) if callable(lectures) else lectures
+
+
+def ordre_rapports(resultats):
+    """Rapports en lecture seule d'abord, puis ceux qui écrivent (ordre d'origine conservé)."""
+    return sorted(resultats, key=lambda r: r[0] in ECRITURES)
+
+
+def executer_une(nom, analyse, snap, params):
+    """(nom, Resultat, None) ou (nom, None, message d'erreur) ; ControleAnnule est propagée.
+
+    Un contrôle dont la tâche est déjà annulée (snap.feedback) n'est pas commencé.
+    """
+    if snap.feedback is not None and snap.feedback.isCanceled():
+        raise ControleAnnule()
+    try:
+        with mesurer(nom):
+            return nom, analyse(snap, params), None
+    except ControleAnnule:
+        raise
+    except Exception as e:
+        QgsMessageLog.logMessage(f"{nom} :\n{traceback.format_exc()}", "VERIF'INFRA", Qgis.Critical)
+        return nom, None, str(e)
+
+
+def _precharger(snap, layer):
+    with mesurer(snap.get(layer, charger=False).nom, "lecture"):
+        return snap.get(layer)
+
+
+def executer_en_parallele(snap, etapes, progression=None, max_workers=None, precharger=True, a_chaque=None):
+    """Exécute les analyses `etapes` [(nom, analyse, params)] sur un pool de threads.
+
+    Les couches lues par les contrôles sont d'abord chargées en parallèle (une lecture par
+    couche, sauf precharger=False : revalidation incrémentale qui ne lit que les entités
+    utiles ; les contrôles COLONNES_SEULES lisent eux-mêmes leurs colonnes), puis chaque
+    analyse tourne sur l'instantané en lecture seule. Un contrôle dont une couche n'a pas
+    pu être lue n'est pas lancé : il reçoit l'erreur de lecture.
+    progression(faits, total) est appelé après chaque contrôle terminé, précédé de
+    a_chaque(nom, resultat, erreur), tous deux dans le thread appelant.
+    Retourne les résultats dans l'ordre des étapes ; en cas d'annulation, les analyses
+    pas encore commencées sont abandonnées et celles qui n'ont pas abouti valent None.
+    """
+    noms = []
+    for nom, _, params in etapes:
+        if nom not in COLONNES_SEULES:
+            noms.extend(couches_lues(nom, params))
+    couches = snap.resoudre(noms) if precharger else []
+    echecs = {}  # layer.id() -> erreur de lecture
+
+    workers = max_workers or min(len(etapes) + len(couches), os.cpu_count() or 1)
+    resultats = [None] * len(etapes)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_precharger, snap, layer): layer for layer in couches}
+        try:
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                try:
+                    future.result()
+                except ControleAnnule:
+                    raise
+                except Exception as e:
+                    layer = futures[future]
+                    QgsMessageLog.logMessage(f"lecture {layer.name()} :\n{traceback.format_exc()}",
+                                             "VERIF'INFRA", Qgis.Critical)
+                    echecs[layer.id()] = f"lecture de la couche '{layer.name()}' impossible : {e}"
+        except ControleAnnule:
+            for future in futures:
+                future.cancel()
+            return resultats
+
+        faits = 0
+        futures = {}
+        for i, (nom, analyse, params) in enumerate(etapes):
+            erreurs = [] if nom in COLONNES_SEULES else [
+                echecs[layer.id()] for layer in snap.resoudre(couches_lues(nom, params)) if layer.id() in echecs]
+            if erreurs:
+                resultats[i] = (nom, None, erreurs[0])
+                faits += 1
+                if a_chaque is not None:
+                    a_chaque(*resultats[i])
+                if progression is not None:
+                    progression(faits, len(etapes))
+                continue
+            futures[pool.submit(executer_une, nom, analyse, snap, params)] = i
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            try:
+                resultats[futures[future]] = resultat = future.result()
+            except ControleAnnule:
+                # Les analyses en attente ne sont pas lancées ; celles en cours s'arrêtent
+                # à leur prochaine lecture, ou aboutissent et sont conservées
+                for autre in futures:
+                    autre.cancel()
+                continue
+            faits += 1
+            if a_chaque is not None:
+                a_chaque(*resultat)
+            if progression is not None:
+                progression(faits, len(etapes))
+    return resultats
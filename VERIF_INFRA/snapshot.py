@@ -0,0 +1,348 @@
+import copy
+import threading
+from operator import itemgetter
+
+from qgis.core import (
+    QgsProject, QgsVectorLayer, QgsVectorLayerFeatureSource, QgsLayerTreeGroup, QgsFeatureRequest,
+    QgsWkbTypes, QgsPointXY, QgsSpatialIndex
+)
+
+from .endpoints import EndpointIndex, COUCHES_NOEUDS
+from .graph import NetworkGraph, COUCHES_ARETES
+from .metric import projeter_local
+from .profiling import compter, phase
+
+
+# ============================================================
+# Instantané des couches : chaque couche n'est lue qu'une seule fois par
+# exécution (TOTAL CONTROL), puis tous les contrôles lisent l'instantané
+# au lieu de refaire un layer.getFeatures() sur le fournisseur.
+#
+# Tout ce qui touche aux objets QGIS du projet (couches, arbre des couches,
+# sources d'entités) est capturé à la création, sur le thread principal ;
+# les entités sont ensuite lues depuis des QgsVectorLayerFeatureSource,
+# utilisables depuis une tâche de fond (cf. tasks.py).
+# ============================================================
+
+
+class ControleAnnule(Exception):
+    """Levée pendant la lecture d'une couche quand la tâche en cours a été annulée."""
+
+
+def extremites_ligne(geom):
+    """Retourne (début, fin) d'une ligne (1re partie si multiligne), ou None."""
+    if geom is None or geom.isEmpty():
+        return None
+    if geom.isMultipart():
+        parties = geom.asMultiPolyline()
+        if not parties:
+            return None
+        points = parties[0]
+    else:
+        points = geom.asPolyline()
+    if len(points) < 2:
+        return None
+    return QgsPointXY(points[0]), QgsPointXY(points[-1])
+
+
+def point_unique(geom):
+    """Retourne le point d'une géométrie ponctuelle (1er point si multipoint), ou None."""
+    if geom is None or geom.isEmpty():
+        return None
+    if geom.isMultipart():
+        points = geom.asMultiPoint()
+        return QgsPointXY(points[0]) if points else None
+    return QgsPointXY(geom.asPoint())
+
+
+class LayerSnapshot:
+    """Copie en mémoire d'une couche : entités, points, extrémités, index spatial.
+
+    Les métadonnées sont lues à la création (thread principal) ; les entités sont
+    lues par charger() depuis `source` (QgsVectorLayerFeatureSource), ou jamais si
+    la couche est invalide.
+    """
+
+    def __init__(self, layer, source=None):
+        self.layer = layer
+        self.nom = layer.name()
+        self.valide = layer.isValid()
+        self.fields = layer.fields()
+        self.noms_champs = set(self.fields.names())
+        self.type_geom = QgsWkbTypes.geometryType(layer.wkbType())
+        self.crs = layer.crs()
+        self.geographique = self.crs.isGeographic()
+        self.source = source
+        self.requete = None   # QgsFeatureRequest optionnelle (instantané restreint)
+
+        self.features = {}    # fid -> QgsFeature (attributs + géométrie)
+        self.points = {}      # fid -> QgsPointXY      (couches ponctuelles)
+        self.extremites = {}  # fid -> (début, fin)    (couches linéaires)
+        self.charge = False
+        self._verrou = threading.Lock()  # lecture et structures dérivées, une fois par couche
+        self._index = None
+        self._points_m = None
+
+    def charger(self, feedback=None):
+        """Lit toutes les entités depuis la source (une seule fois, même depuis plusieurs threads)."""
+        if self.charge:
+            return
+        with phase("lecture"), self._verrou:
+            if not self.charge:
+                self._lire(feedback)
+
+    def _lire(self, feedback):
+        if self.source is not None:
+            entites = self.source.getFeatures(self.requete) if self.requete is not None else self.source.getFeatures()
+            compter("lectures", couche=self.nom)
+            for i, feat in enumerate(entites):
+                if feedback is not None and i % 1000 == 0 and feedback.isCanceled():
+                    raise ControleAnnule()
+                fid = feat.id()
+                self.features[fid] = feat
+                geom = feat.geometry()
+                if self.type_geom == QgsWkbTypes.PointGeometry:
+                    pt = point_unique(geom)
+                    if pt is not None:
+                        self.points[fid] = pt
+                elif self.type_geom == QgsWkbTypes.LineGeometry:
+                    ext = extremites_ligne(geom)
+                    if ext is not None:
+                        self.extremites[fid] = ext
+            compter("entites_lues", len(self.features), couche=self.nom)
+        self.charge = True
+
+    def colonnes(self, noms=None, feedback=None):
+        """Lecture par colonnes, sans géométrie : (fids, {champ: [valeurs dans l'ordre des fids]}).
+
+        Reprend les entités déjà chargées ; sinon ne lit depuis la source que les attributs
+        demandés (QgsFeatureRequest NoGeometry + sous-ensemble d'attributs), sans rien garder.
+        """
+        noms = self.fields.names() if noms is None else [n for n in noms if n in self.noms_champs]
+        if not noms:
+            return [], {}
+        index = [self.fields.indexFromName(n) for n in noms]
+        prendre = itemgetter(*index) if len(index) > 1 else (lambda attrs: (attrs[index[0]],))
+
+        if not self.charge and self.requete is not None:
+            self.charger(feedback)  # instantané restreint : peu d'entités, lues par identifiant
+        if self.charge:
+            return self._extraire(self.features.values(), noms, prendre, feedback)
+        # Une seule lecture à la fois par source : un autre thread peut être en train de
+        # charger la couche (TOTAL CONTROL), auquel cas ses entités sont reprises à la fin
+        with self._verrou:
+            if self.charge:
+                return self._extraire(self.features.values(), noms, prendre, feedback)
+            if self.source is None:
+                return self._extraire((), noms, prendre, feedback)
+            requete = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes(index)
+            compter("lectures", couche=self.nom)
+            with phase("lecture"):
+                fids, colonnes = self._extraire(self.source.getFeatures(requete), noms, prendre, feedback)
+            compter("entites_lues", len(fids), couche=self.nom)
+            return fids, colonnes
+
+    @staticmethod
+    def _extraire(entites, noms, prendre, feedback):
+        fids, lignes = [], []
+        for i, feat in enumerate(entites):
+            if feedback is not None and i % 1000 == 0 and feedback.isCanceled():
+                raise ControleAnnule()
+            fids.append(feat.id())
+            lignes.append(prendre(feat.attributes()))
+        colonnes = list(zip(*lignes)) if lignes else [()] * len(noms)
+        return fids, dict(zip(noms, colonnes))
+
+    def restreinte(self, fids):
+        """Copie non chargée de la couche limitée aux entités `fids` (lues par identifiant)."""
+        copie = copy.copy(self)
+        copie.features, copie.points, copie.extremites = {}, {}, {}
+        copie.charge = False
+        copie._verrou = threading.Lock()
+        copie._index = copie._points_m = None
+        if fids:
+            copie.requete = QgsFeatureRequest().setFilterFids(list(fids))
+        else:
+            copie.source = None
+        return copie
+
+    def est_point(self):
+        return self.type_geom == QgsWkbTypes.PointGeometry
+
+    def est_ligne(self):
+        return self.type_geom == QgsWkbTypes.LineGeometry
+
+    def a_champ(self, nom):
+        return nom in self.noms_champs
+
+    def valeur(self, fid, champ, defaut=None):
+        """Valeur d'un champ, ou `defaut` si le champ n'existe pas dans la couche."""
+        if champ not in self.noms_champs:
+            return defaut
+        return self.features[fid][champ]
+
+    def libelle(self, fid):
+        """NOM de l'entité, ou 'ID <fid>' à défaut."""
+        nom = self.valeur(fid, "NOM")
+        return nom if nom else f"ID {fid}"
+
+    def geometries(self):
+        """Itère (fid, géométrie) sur les entités à géométrie non vide."""
+        for fid, feat in self.features.items():
+            geom = feat.geometry()
+            if geom and not geom.isEmpty():
+                yield fid, geom
+
+    def metric_points(self):
+        """Points en coordonnées métriques locales {fid: (x, y)}, calculés une seule fois."""
+        with phase("index"), self._verrou:
+            if self._points_m is None:
+                self._points_m = projeter_local(self.points, self.geographique)
+        return self._points_m
+
+    def spatial_index(self):
+        """Index spatial construit une seule fois à la première demande."""
+        with phase("index"), self._verrou:
+            if self._index is None:
+                index = QgsSpatialIndex()
+                for fid, _ in self.geometries():
+                    index.addFeature(self.features[fid])
+                self._index = index
+                compter("index_construits")
+        return self._index
+
+
+def _lire_groupes(noeud, groupes):
+    """Couches de chaque groupe de l'arbre, dans l'ordre de findGroup() (premier trouvé)."""
+    for enfant in noeud.children():
+        if isinstance(enfant, QgsLayerTreeGroup):
+            groupes.setdefault(enfant.name(), [n.layerId() for n in enfant.findLayers()])
+            _lire_groupes(enfant, groupes)
+
+
+class ProjectSnapshot:
+    """Instantané paresseux du projet : une couche est lue à sa première demande.
+
+    À créer sur le thread principal ; ses méthodes de lecture peuvent ensuite être
+    appelées depuis une tâche de fond. `feedback` (QgsFeedback) permet d'interrompre
+    la lecture d'une couche quand la tâche est annulée.
+    Hors projet (ligne de commande, cf. cli.py) : `layers` donne la liste des couches
+    et `groupes` leur répartition {nom de groupe: [couches]}.
+    """
+
+    def __init__(self, project=None, layers=None, groupes=None):
+        self.project = project or QgsProject.instance()
+        self.feedback = None
+        self._verrou = threading.RLock()
+        self._par_nom = {}   # nom -> première couche de ce nom (comme mapLayersByName()[0])
+        self._cache = {}     # layer.id() -> LayerSnapshot (entités lues à la demande)
+        self._groupes = {}   # nom de groupe -> [layer.id()]
+        self._endpoint_indexes = {}  # tuple de noms de couches -> EndpointIndex
+        self._graphs = {}  # (noeuds, arêtes) -> NetworkGraph
+
+        if layers is None:
+            layers = self.project.mapLayers().values()
+        for layer in layers:
+            self._par_nom.setdefault(layer.name(), layer)
+            if isinstance(layer, QgsVectorLayer):
+                self._cache[layer.id()] = self._decrire(layer)
+        if groupes is None:
+            _lire_groupes(self.project.layerTreeRoot(), self._groupes)
+        else:
+            self._groupes = {nom: [layer.id() for layer in couches] for nom, couches in groupes.items()}
+
+    @staticmethod
+    def _decrire(layer):
+        source = QgsVectorLayerFeatureSource(layer) if layer.isValid() else None
+        return LayerSnapshot(layer, source)
+
+    def layer(self, name):
+        return self._par_nom.get(name)
+
+    def get(self, layer_or_name, charger=True):
+        """LayerSnapshot d'une couche (objet ou nom), ou None si absente / non vectorielle.
+
+        charger=False : métadonnées et source seulement, sans lire les entités.
+        """
+        layer = self.layer(layer_or_name) if isinstance(layer_or_name, str) else layer_or_name
+        if not isinstance(layer, QgsVectorLayer):
+            return None
+        snap = self._cache.get(layer.id())
+        if snap is None:
+            return None
+        if charger:
+            snap.charger(self.feedback)
+        return snap
+
+    def group(self, name, charger=True):
+        """Instantanés des couches vecteur d'un groupe, ou None si le groupe est introuvable."""
+        ids = self._groupes.get(name)
+        if ids is None:
+            return None
+        return [self.get(self._cache[layer_id].layer, charger) for layer_id in ids if layer_id in self._cache]
+
+    def resoudre(self, noms):
+        """Couches (objets) désignées par des noms de groupes, de couches, ou '*' pour toutes."""
+        couches = {}
+        for nom in noms:
+            if nom == "*":
+                ids = list(self._cache)
+            elif nom in self._groupes:
+                ids = [layer_id for layer_id in self._groupes[nom] if layer_id in self._cache]
+            else:
+                layer = self.layer(nom)
+                ids = [layer.id()] if isinstance(layer, QgsVectorLayer) and layer.id() in self._cache else []
+            for layer_id in ids:
+                couches[layer_id] = self._cache[layer_id].layer
+        return list(couches.values())
+
+    def endpoint_index(self, noms=COUCHES_NOEUDS):
+        """Index des nœuds des couches `noms` (construit une fois, puis partagé)."""
+        cle = tuple(noms)
+        with phase("index"), self._verrou:
+            index = self._endpoint_indexes.get(cle)
+            if index is None:
+                index = EndpointIndex()
+                for nom in noms:
+                    couche = self.get(nom)
+                    if couche is not None:
+                        index.add_layer(couche)
+                self._endpoint_indexes[cle] = index
+                compter("index_construits")
+        return index
+
+    def network_graph(self, noeuds=COUCHES_NOEUDS, aretes=COUCHES_ARETES):
+        """Graphe du réseau (points = nœuds, lignes = arêtes), construit une fois puis partagé."""
+        cle = (tuple(noeuds), tuple(aretes))
+        with phase("index"), self._verrou:
+            graphe = self._graphs.get(cle)
+            if graphe is None:
+                graphe = NetworkGraph.build(self, noeuds, aretes)
+                self._graphs[cle] = graphe
+                compter("index_construits")
+        return graphe
+
+    def vue(self, fids_par_couche):
+        """Instantané restreint aux entités {layer.id(): fids} ; les autres couches y sont vides.
+
+        Les contrôles s'exécutent dessus sans modification (cf. incremental.py).
+        """
+        vue = copy.copy(self)
+        vue._verrou = threading.RLock()
+        vue._endpoint_indexes = {}
+        vue._graphs = {}
+        vue._cache = {layer_id: couche.restreinte(fids_par_couche.get(layer_id))
+                      for layer_id, couche in self._cache.items()}
+        return vue
+
+    def vector_layers(self, charger=True):
+        return [self.get(couche.layer, charger) for couche in list(self._cache.values())]
+
+    def invalidate(self, layer=None):
+        """À appeler (thread principal) après toute écriture dans une couche, ou sans argument pour tout relire."""
+        with self._verrou:
+            couches = [layer] if layer is not None else [c.layer for c in self._cache.values()]
+            for lyr in couches:
+                self._cache[lyr.id()] = self._decrire(lyr)
+            self._endpoint_indexes.clear()
+            self._graphs.clear()
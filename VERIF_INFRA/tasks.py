@@ -0,0 +1,102 @@
+from collections import namedtuple
+
+from qgis.core import QgsTask, QgsFeedback
+
+from .scheduler import executer_une, executer_en_parallele
+from .snapshot import ControleAnnule
+
+
+# ============================================================
+# Exécution des contrôles en tâche de fond (QgsTask).
+# Un contrôle X de MonPlugin se décompose en :
+#   parametres_X()          thread principal, optionnel : saisies utilisateur
+#   analyse_X(snap, params) tâche de fond : lecture seule de l'instantané,
+#                           retourne un Resultat (aucun dialogue, aucune écriture)
+#   rapport_X(resultat)     thread principal, optionnel : sélections, messages,
+#                           questions et écritures éventuelles
+# ============================================================
+
+
+Constat = namedtuple("Constat", "controle couche fid niveau message")
+# Un constat par entité en erreur : couche = QgsVectorLayer ; controle et niveau à None
+# tant que le constat n'est pas publié (nom du contrôle et niveau du Resultat par défaut)
+
+
+class Resultat:
+    """Résultat d'une analyse, présenté ensuite sur le thread principal."""
+
+    def __init__(self, titre, message="", niveau="information"):
+        self.titre = titre
+        self.message = message
+        self.niveau = niveau    # "information", "warning" ou "critical"
+        self.selections = {}    # layer -> set(fids) ; un ensemble vide vide la sélection
+        self.donnees = {}       # données utiles au rapport (remplissage, suppression...)
+        self.constats = []      # [Constat] détaillés par entité (panneau des résultats, export)
+
+    def selectionner(self, layer, fids=()):
+        """Ajoute des entités à la sélection à appliquer (la sélection précédente est remplacée)."""
+        self.selections.setdefault(layer, set()).update(fids)
+
+    def constater(self, layer, fid, message, niveau=None):
+        """Enregistre un constat sur une entité et l'ajoute à la sélection."""
+        self.constats.append(Constat(None, layer, fid, niveau, message))
+        self.selections.setdefault(layer, set()).add(fid)
+
+
+class ControlesTask(QgsTask):
+    """Exécute les analyses d'une liste de contrôles en tâche de fond, annulable.
+
+    etapes : [(nom, analyse, params)] ; la progression avance d'un cran par contrôle.
+    Avec `parallele`, les analyses sont réparties sur un pool de threads (scheduler.py),
+    après lecture de toutes les couches nécessaires si `precharger`.
+    termine(resultats, non_executes) est appelé sur le thread principal à la fin, avec
+    resultats = [(nom, Resultat ou None, message d'erreur ou None)] des contrôles exécutés
+    et non_executes = noms des contrôles abandonnés par une annulation (vide sinon).
+    a_chaque(nom, resultat, erreur) est appelé dans la tâche, hors du thread principal, dès
+    qu'un contrôle se termine (export des constats au fil de l'eau).
+    """
+
+    def __init__(self, description, snap, etapes, termine, parallele=False, precharger=True, a_chaque=None):
+        super().__init__(description, QgsTask.CanCancel)
+        self.snap = snap
+        self.etapes = etapes
+        self.termine = termine
+        self.parallele = parallele
+        self.precharger = precharger
+        self.a_chaque = a_chaque
+        self.resultats = []
+        self.non_executes = [nom for nom, _, _ in etapes]  # tant que run() ne les a pas exécutés
+        self.feedback = QgsFeedback()
+        snap.feedback = self.feedback
+
+    def run(self):
+        n = len(self.etapes)
+        if self.parallele:
+            resultats = executer_en_parallele(
+                self.snap, self.etapes, lambda faits, total: self.setProgress(100.0 * faits / total),
+                precharger=self.precharger, a_chaque=self.a_chaque)
+            self.resultats = [r for r in resultats if r is not None]
+            self.non_executes = [nom for (nom, _, _), r in zip(self.etapes, resultats) if r is None]
+            return not self.non_executes
+        for i, (nom, analyse, params) in enumerate(self.etapes):
+            if self.isCanceled():
+                return False
+            self.setProgress(100.0 * i / n)
+            try:
+                resultat = executer_une(nom, analyse, self.snap, params)
+            except ControleAnnule:
+                return False
+            self.resultats.append(resultat)
+            self.non_executes.remove(nom)
+            if self.a_chaque is not None:
+                self.a_chaque(*resultat)
+        self.setProgress(100.0)
+        return True
+
+    def cancel(self):
+        self.feedback.cancel()
+        super().cancel()
+
+    def finished(self, ok):
+        self.snap.feedback = None
+        self.termine(self.resultats, self.non_executes if not ok else [])
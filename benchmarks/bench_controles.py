@@ -0,0 +1,187 @@
+"""
+Montée en charge des contrôles de TOTAL CONTROL sur des réseaux synthétiques.
+
+    python -m benchmarks.bench_controles
+    python -m benchmarks.bench_controles --tailles 1000 10000 --controles verifier_connexions
+    python -m benchmarks.bench_controles --enregistrer
+
+Pour chaque taille, un réseau (benchmarks.reseau, graine fixe) est écrit une fois dans
+un GeoPackage du dossier de travail, puis chaque contrôle est chronométré séparément
+sur un instantané neuf, rien n'étant lu avant le début du chronomètre : l'analyse lit
+elle-même ce dont elle a besoin (entités, colonnes seules, index), comme un contrôle
+lancé seul dans la tâche de fond, et le temps mesuré comprend donc ces lectures.
+TOTAL CONTROL complet (lecture et analyses en parallèle) est mesuré en dernier.
+Le détail par phase d'un contrôle s'obtient avec le profilage (cli.py --profil).
+
+Les mesures sont écrites en JSON (--sortie) et comparées à la référence de la machine
+(benchmarks/baselines/<machine>.json) : un contrôle plus lent que la référence au-delà
+de --tolerance est signalé et le code de sortie vaut 1. --enregistrer remplace la
+référence par les mesures du jour.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from qgis.core import Qgis
+
+from VERIF_INFRA.cli import PARAMETRES_DEFAUT, _demarrer_qgis, ouvrir_geopackage
+from VERIF_INFRA.main import MonPlugin
+from VERIF_INFRA.results import constats_resultat
+from VERIF_INFRA.scheduler import CONTROLES, executer_en_parallele, executer_une
+from VERIF_INFRA.snapshot import ProjectSnapshot
+
+from .reseau import TAUX_ERREURS, VERSION, Reseau, ecrire_geopackage
+
+
+TAILLES = [1000, 10000, 100000, 1000000]
+
+GRAINE = 42
+
+DOSSIER_BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Ralentissement toléré par rapport à la référence, et écart absolu en dessous duquel
+# une différence relève du bruit de mesure
+TOLERANCE = 0.25
+ECART_MIN = 0.05  # s
+
+
+def reseau_geopackage(taille, graine, taux, dossier):
+    """(Reseau, chemin du GeoPackage), écrit seulement s'il n'est pas déjà en cache."""
+    reseau = Reseau(taille, graine, taux)
+    chemin = os.path.join(dossier, f"reseau_v{VERSION}_{taille}_{graine}_{taux:g}.gpkg")
+    if not os.path.exists(chemin):
+        ecrire_geopackage(reseau, chemin + ".tmp")
+        os.replace(chemin + ".tmp", chemin)
+    return reseau, chemin
+
+
+def mesurer_controle(plugin, nom, layers, groupes):
+    """{"total" (s), "constats", "erreur"} d'un contrôle sur un instantané neuf, lecture comprise."""
+    snap = ProjectSnapshot(layers=layers, groupes=groupes)
+    params = PARAMETRES_DEFAUT.get(nom)
+    debut = time.perf_counter()
+    _, resultat, erreur = executer_une(nom, getattr(plugin, "analyse_" + nom), snap, params)
+    return {
+        "total": round(time.perf_counter() - debut, 4),
+        "constats": len(constats_resultat(nom, resultat)) if resultat is not None else None,
+        "erreur": erreur,
+    }
+
+
+def mesurer_total_control(plugin, layers, groupes):
+    snap = ProjectSnapshot(layers=layers, groupes=groupes)
+    etapes = [(nom, getattr(plugin, "analyse_" + nom), PARAMETRES_DEFAUT.get(nom)) for nom in CONTROLES]
+    debut = time.perf_counter()
+    executer_en_parallele(snap, etapes)
+    return round(time.perf_counter() - debut, 4)
+
+
+def mesurer_taille(taille, args):
+    reseau, chemin = reseau_geopackage(taille, args.graine, args.taux, args.dossier)
+    layers, groupes = ouvrir_geopackage(chemin)
+    plugin = MonPlugin(None)
+    mesures = {
+        "entites": {layer.name(): layer.featureCount() for layer in layers},
+        "plantees": dict(reseau.plantees),
+        "controles": {},
+    }
+    for nom in args.controles:
+        # Meilleur temps sur les répétitions : le moins perturbé par la machine
+        essais = [mesurer_controle(plugin, nom, layers, groupes) for _ in range(args.repetitions)]
+        mesures["controles"][nom] = min(essais, key=lambda m: m["total"])
+        m = mesures["controles"][nom]
+        print(f"{taille:>9}  {nom:<32} {m['total']:9.3f} s"
+              f"  {m['constats'] if m['erreur'] is None else '❌ ' + m['erreur']} constat(s)")
+    if args.total:
+        mesures["total_control"] = min(mesurer_total_control(plugin, layers, groupes)
+                                       for _ in range(args.repetitions))
+        print(f"{taille:>9}  {'TOTAL CONTROL':<32} {mesures['total_control']:9.3f} s")
+    return mesures
+
+
+def comparer(mesures, reference, tolerance=TOLERANCE):
+    """Lignes décrivant les contrôles plus lents que la référence (tailles et contrôles communs)."""
+    regressions = []
+    for taille, actuelles in mesures["tailles"].items():
+        anciennes = reference.get("tailles", {}).get(taille)
+        if anciennes is None:
+            continue
+        paires = [(nom, anciennes["controles"].get(nom, {}).get("total"), m["total"])
+                  for nom, m in actuelles["controles"].items()]
+        paires.append(("TOTAL CONTROL", anciennes.get("total_control"), actuelles.get("total_control")))
+        for nom, avant, apres in paires:
+            if avant is None or apres is None:
+                continue
+            if apres > avant * (1 + tolerance) and apres - avant > ECART_MIN:
+                regressions.append(f"{taille:>9}  {nom:<32} {avant:9.3f} s → {apres:9.3f} s  (×{apres / avant:.2f})")
+    return regressions
+
+
+def _ecrire(chemin, donnees):
+    os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(donnees, f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VERIF'INFRA : montée en charge des contrôles.")
+    parser.add_argument("--tailles", type=int, nargs="+", default=TAILLES, help="nombres d'entités visés")
+    parser.add_argument("--controles", nargs="+", choices=CONTROLES, default=CONTROLES)
+    parser.add_argument("--graine", type=int, default=GRAINE)
+    parser.add_argument("--taux", type=float, default=TAUX_ERREURS, help="part des chambres portant chaque erreur")
+    parser.add_argument("--repetitions", type=int, default=1, help="mesures par contrôle (meilleur temps retenu)")
+    parser.add_argument("--sans-total", dest="total", action="store_false", help="ne pas mesurer TOTAL CONTROL")
+    parser.add_argument("--dossier", default=os.path.join(tempfile.gettempdir(), "verif_infra_bench"),
+                        help="dossier des GeoPackages générés (conservés d'une exécution à l'autre)")
+    parser.add_argument("--reference", default=os.path.join(DOSSIER_BASELINES, platform.node() + ".json"),
+                        help="référence JSON de la machine")
+    parser.add_argument("--enregistrer", action="store_true", help="remplacer la référence par ces mesures")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="ralentissement toléré (0.25 = +25 %%)")
+    parser.add_argument("--sortie", help="fichier JSON des mesures (par défaut : dans --dossier)")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.dossier, exist_ok=True)
+    _demarrer_qgis()
+    mesures = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.node(),
+        "plateforme": platform.platform(),
+        "python": platform.python_version(),
+        "qgis": Qgis.version(),
+        "version_reseau": VERSION,
+        "graine": args.graine,
+        "taux": args.taux,
+        "tailles": {str(taille): mesurer_taille(taille, args) for taille in args.tailles},
+    }
+
+    sortie = args.sortie or os.path.join(args.dossier, datetime.now().strftime("mesures_%Y%m%d_%H%M%S.json"))
+    _ecrire(sortie, mesures)
+    print(f"Mesures : {sortie}")
+
+    regressions = []
+    if os.path.exists(args.reference):
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+        if (reference.get("version_reseau"), reference.get("graine"), reference.get("taux")) != \
+                (VERSION, args.graine, args.taux):
+            print(f"⚠ Référence {args.reference} mesurée sur un autre réseau : comparaison ignorée")
+        else:
+            regressions = comparer(mesures, reference, args.tolerance)
+            print(f"Référence : {args.reference} ({reference.get('date')})")
+            for ligne in regressions:
+                print(f"❌ {ligne}")
+            if not regressions:
+                print("✅ Aucun ralentissement au-delà de la tolérance.")
+    if args.enregistrer:
+        _ecrire(args.reference, mesures)
+        print(f"Référence enregistrée : {args.reference}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
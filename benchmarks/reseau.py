@@ -0,0 +1,355 @@
+"""
+Réseau télécom synthétique pour les mesures de performance.
+
+    python -m benchmarks.reseau 100000 reseau.gpkg --graine 42
+
+Les couches portent les noms et champs lus par les contrôles (Chambre, Canalisation,
+Tranchee, Point Technique, Poteau, Support, Site ; NOM, TYPE, TYPE CANAL, TYPE CPS,
+TYPE TRANC, FONCTION, REP / NOM_SR / PROJET). Le réseau est entièrement déterminé par
+sa taille et sa graine ; des erreurs y sont plantées pour chaque contrôle.
+"""
+import argparse
+import math
+import os
+import random
+import sys
+from collections import Counter
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.core import (
+    QgsCoordinateReferenceSystem, QgsCoordinateTransformContext, QgsFeature, QgsField, QgsFields,
+    QgsGeometry, QgsPointXY, QgsVectorFileWriter, QgsWkbTypes
+)
+
+from VERIF_INFRA.cli import _demarrer_qgis
+from VERIF_INFRA.connexions import fonction_attendue
+
+
+# ============================================================
+# Réseau synthétique.
+# Les chambres sont posées sur une grille (pas ESPACEMENT, Lambert-93) et
+# reliées en arbre par des canalisations Distribution : chaque rangée est une
+# chaîne, les rangées sont raccordées par la première colonne. Une chambre
+# sur 4 dessert un Point Technique (Façade, Immeuble ou Armoire), une sur 8
+# deux Poteaux (adduction aérienne puis support aérien), une sur 16 un Site.
+# Chaque canalisation est doublée d'une tranchée de même géométrie.
+# Rien n'est gardé en mémoire entité par entité : seules quelques listes
+# par chambre / canalisation (types, degrés) sont tirées à la construction,
+# et les entités sont produites couche par couche (Reseau.entites), si bien
+# qu'un réseau d'un million d'entités s'écrit en mémoire bornée.
+# ============================================================
+
+VERSION = 2  # à incrémenter dès que le réseau produit change (GeoPackages en cache)
+
+ESPACEMENT = 50.0
+ORIGINE = (650000.0, 6860000.0)
+SCR = "EPSG:2154"
+
+# Moyenne d'entités créées par chambre (arbre, dessertes, tranchées), pour viser une taille
+ENTITES_PAR_CHAMBRE = 4.73
+
+CHAMPS_COMMUNS = ["REP", "NOM_SR", "PROJET"]
+
+COUCHES = {
+    "Chambre": (QgsWkbTypes.Point, ["NOM", "TYPE", "FONCTION"]),
+    "Point Technique": (QgsWkbTypes.Point, ["NOM", "TYPE"]),
+    "Poteau": (QgsWkbTypes.Point, ["NOM", "TYPE"]),
+    "Site": (QgsWkbTypes.Point, ["NOM", "TYPE"]),
+    "Canalisation": (QgsWkbTypes.LineString, ["NOM", "TYPE CANAL", "TYPE CPS"]),
+    "Tranchee": (QgsWkbTypes.LineString, ["NOM", "TYPE TRANC"]),
+    "Support": (QgsWkbTypes.LineString, ["NOM", "TYPE"]),
+}
+
+# Types compatibles entre eux (cf. connexions.CONNEXION_VALIDE) : CPS2, CPS4 et CPS6
+# acceptent toutes ces chambres, CANIVEAU TYPE A n'est accepté par aucun
+TYPES_CHAMBRE = ("PNS3", "PNP4", "PN3", "PNP5")
+TYPES_CPS = ("CPS2", "CPS4", "CPS6")
+TYPE_CHAMBRE_INCOMPATIBLE = "CANIVEAU TYPE A"
+TYPE_TRANC_INCOMPATIBLE = "CPS1"
+
+# TYPE du Point Technique desservi -> TYPE CANAL attendu (cf. analyse_verifier_type_canal)
+TYPES_PT = {"Point Façade": "Adduction Façade", "Immeuble": "Adduction Immeuble", "Armoire": "Distribution"}
+
+TAUX_ERREURS = 0.01  # part des chambres portant chaque erreur plantée
+
+TAILLE_LOT = 10000  # entités par appel à addFeatures
+
+
+class Reseau:
+    """Réseau d'environ `taille` entités, entièrement déterminé par `graine`.
+
+    plantees : Counter {contrôle: nombre d'entités modifiées pour lui}.
+    """
+
+    def __init__(self, taille, graine=0, taux_erreurs=TAUX_ERREURS):
+        self.taille, self.graine = taille, graine
+        rng = random.Random(graine)
+        k = self.chambres = max(2, round(taille / ENTITES_PAR_CHAMBRE))
+        self.colonnes = math.ceil(math.sqrt(k))
+
+        self._types_ch = [rng.choice(TYPES_CHAMBRE) for _ in range(k)]
+        self._types_pt = [rng.choice(list(TYPES_PT)) if self._a_pt(i) else None for i in range(k)]
+
+        # Degré Distribution des chambres et numéros des canalisations / supports aériens,
+        # dans l'ordre où _canaux et entites("Support") les produisent
+        degres = [0] * k
+        for j in range(1, k):
+            degres[self._parent(j)] += 1
+            degres[j] += 1
+        n_canaux, n_supports = k - 1, 0
+        canaux_aeriens, supports_aeriens = [], []
+        for i in range(k):
+            if self._a_pt(i):
+                degres[i] += TYPES_PT[self._types_pt[i]] == "Distribution"
+                n_canaux += 1
+                n_supports += self._types_pt[i] == "Point Façade"
+            if self._a_poteau(i):
+                canaux_aeriens.append(n_canaux)
+                supports_aeriens.append(n_supports)
+                n_canaux += 1
+                n_supports += 1
+            if self._a_site(i):
+                degres[i] += 1
+                n_canaux += 1
+        self._degres = degres
+        self._cps = [rng.choice(TYPES_CPS) for _ in range(n_canaux)]
+        self._tranc = [cps + "C" if rng.random() < 0.1 else cps for cps in self._cps]
+
+        # --- Erreurs plantées : ensembles disjoints de chambres / canalisations ---
+        m = max(1, round(taux_erreurs * k))
+        cibles = rng.sample(range(k), min(k, 6 * m))
+        lots = [set(cibles[n::6]) for n in range(6)]
+        self._vides, copies, proches, self._doublons, self._incompatibles, self._fonctions = lots
+        # Noms repris de chambres hors de tout lot : aucune cible n'est elle-même renommée,
+        # chaque chambre renommée est exactement une erreur plantée
+        renommees = sorted(copies) + sorted(proches)
+        cibles = set(cibles)
+        intactes = [j for j in range(k) if j not in cibles]
+        modeles = dict(zip(renommees, rng.sample(intactes, min(len(intactes), len(renommees)))))
+        self._noms = {i: f"CH_{j:06d}" if i in copies else f"Ch-{j}"          # NOM d'une autre chambre,
+                      for i, j in modeles.items()}                             # ou même NOM, autre écriture
+        self._isoles = m                                                       # Points Techniques sans canalisation
+        self._fantomes = m                                                     # Points Techniques sans géométrie
+        canaux = rng.sample(range(n_canaux), min(n_canaux, 2 * m))
+        self._sans_tranchee, self._tranc_incompatibles = set(canaux[::2]), set(canaux[1::2])
+        self._canaux_faux = set(rng.sample(canaux_aeriens, min(len(canaux_aeriens), m)))
+        self._supports_faux = set(rng.sample(supports_aeriens, min(len(supports_aeriens), m)))
+
+        self.plantees = Counter({
+            "null_values": len(self._vides),
+            "check_name_duplicates": len(self._noms),
+            "check_geometry_duplicates": len(self._doublons),
+            "accrochage_lignes_points": self._isoles,
+            "detecter_fantomes": self._fantomes,
+            "verifier_tranchee_canalisation": len(self._sans_tranchee),
+            "verifier_type_canal": len(self._canaux_faux),
+            "verifier_supports": len(self._supports_faux),
+            "verifier_connexions": len(self._incompatibles),
+            "verifier_cps_tranchee": len(self._tranc_incompatibles),
+            "verifier_fonction_chambre": len(self._fonctions),
+        })
+
+    # ---------- structure ----------
+
+    @staticmethod
+    def _a_pt(i):
+        return i % 4 == 1
+
+    @staticmethod
+    def _a_poteau(i):
+        return i % 8 == 3
+
+    @staticmethod
+    def _a_site(i):
+        return i % 16 == 7
+
+    def _parent(self, j):
+        """Chambre à laquelle la chambre j (> 0) est raccordée dans l'arbre."""
+        return j - 1 if j % self.colonnes else j - self.colonnes
+
+    def _position(self, i, dx=0.0, dy=0.0):
+        """Position de la chambre i, décalée de (dx, dy) fractions d'ESPACEMENT."""
+        x0, y0 = ORIGINE
+        return (x0 + (i % self.colonnes + dx) * ESPACEMENT, y0 + (i // self.colonnes + dy) * ESPACEMENT)
+
+    # Décalages des dessertes autour de leur chambre : distincts, jamais sur la grille
+    def _pt(self, i):
+        return self._position(i, 0.3, 0.4)
+
+    def _pt_facade(self, i):
+        return self._position(i, 0.3, 0.2)
+
+    def _poteaux(self, i):
+        return self._position(i, 0.4, -0.3), self._position(i, 0.6, -0.3)
+
+    def _site(self, i):
+        return self._position(i, -0.3, 0.3)
+
+    def _canaux(self):
+        """(numéro, [extrémités], TYPE CANAL attendu) de toutes les canalisations, dans l'ordre."""
+        n = 0
+        for j in range(1, self.chambres):
+            yield n, [self._position(self._parent(j)), self._position(j)], "Distribution"
+            n += 1
+        for i in range(self.chambres):
+            if self._a_pt(i):
+                yield n, [self._position(i), self._pt(i)], TYPES_PT[self._types_pt[i]]
+                n += 1
+            if self._a_poteau(i):
+                yield n, [self._position(i), self._poteaux(i)[0]], "Adduction Aérien"
+                n += 1
+            if self._a_site(i):
+                yield n, [self._position(i), self._site(i)], "Distribution"
+                n += 1
+
+    # ---------- entités ----------
+
+    def _communs(self, i, vide=False):
+        return {"REP": None if vide else f"REP{i % 7:02d}", "NOM_SR": f"SR{i // 500:04d}", "PROJET": "BENCH"}
+
+    def entites(self, nom_couche):
+        """Itère les (coordonnées [(x, y)], {champ: valeur}) d'une couche ; [] : géométrie vide."""
+        return {
+            "Chambre": self._entites_chambre,
+            "Point Technique": self._entites_point_technique,
+            "Poteau": self._entites_poteau,
+            "Site": self._entites_site,
+            "Canalisation": self._entites_canalisation,
+            "Tranchee": self._entites_tranchee,
+            "Support": self._entites_support,
+        }[nom_couche]()
+
+    def _entites_chambre(self):
+        for i in range(self.chambres):
+            fonction = fonction_attendue(self._degres[i])
+            if i in self._fonctions:
+                fonction = "Chambre de Terminaison" if fonction == "Chambre de tirage" else "Chambre de tirage"
+            yield [self._position(i)], dict(
+                self._communs(i, i in self._vides),
+                NOM=self._noms.get(i, f"CH_{i:06d}"),
+                TYPE=TYPE_CHAMBRE_INCOMPATIBLE if i in self._incompatibles else self._types_ch[i],
+                FONCTION=fonction,
+            )
+        # Doublons géométriques : une seconde chambre, même type et même fonction, au même endroit
+        for n, i in enumerate(sorted(self._doublons)):
+            yield [self._position(i)], dict(self._communs(i), NOM=f"CH_{self.chambres + n:06d}",
+                                            TYPE=self._types_ch[i], FONCTION=fonction_attendue(self._degres[i]))
+
+    def _entites_point_technique(self):
+        n = 0
+        for i in range(self.chambres):
+            if not self._a_pt(i):
+                continue
+            type_pt = self._types_pt[i]
+            yield [self._pt(i)], dict(self._communs(i), NOM=f"PT_{n:06d}", TYPE=type_pt)
+            n += 1
+            if type_pt == "Point Façade":
+                yield [self._pt_facade(i)], dict(self._communs(i), NOM=f"PT_{n:06d}", TYPE=type_pt)
+                n += 1
+        for i in range(self._isoles):
+            yield [self._position(i, 0.5, 0.5)], dict(self._communs(i), NOM=f"PT_{n:06d}", TYPE="Armoire")
+            n += 1
+        for i in range(self._fantomes):
+            yield [], dict(self._communs(i), NOM=f"PT_{n:06d}", TYPE="Armoire")
+            n += 1
+
+    def _entites_poteau(self):
+        n = 0
+        for i in range(self.chambres):
+            if self._a_poteau(i):
+                for position in self._poteaux(i):
+                    yield [position], dict(self._communs(i), NOM=f"PO_{n:06d}", TYPE="Bois")
+                    n += 1
+
+    def _entites_site(self):
+        n = 0
+        for i in range(self.chambres):
+            if self._a_site(i):
+                yield [self._site(i)], dict(self._communs(i), NOM=f"SI_{n:06d}", TYPE="NRO")
+                n += 1
+
+    def _entites_support(self):
+        n = 0
+        for i in range(self.chambres):
+            if self._a_pt(i) and self._types_pt[i] == "Point Façade":
+                yield [self._pt(i), self._pt_facade(i)], dict(self._communs(i), NOM=f"SU_{n:06d}", TYPE="Façade")
+                n += 1
+            if self._a_poteau(i):
+                type_support = "Façade" if n in self._supports_faux else "Aérien"
+                yield list(self._poteaux(i)), dict(self._communs(i), NOM=f"SU_{n:06d}", TYPE=type_support)
+                n += 1
+
+    def _entites_canalisation(self):
+        for n, extremites, type_canal in self._canaux():
+            if n in self._canaux_faux:
+                type_canal = "Adduction Façade"
+            yield extremites, dict(self._communs(n), NOM=f"CA_{n:06d}", **{"TYPE CANAL": type_canal,
+                                                                             "TYPE CPS": self._cps[n]})
+
+    def _entites_tranchee(self):
+        for n, extremites, _ in self._canaux():
+            if n in self._sans_tranchee:
+                continue
+            type_tranc = TYPE_TRANC_INCOMPATIBLE if n in self._tranc_incompatibles else self._tranc[n]
+            yield extremites, dict(self._communs(n), NOM=f"TR_{n:06d}", **{"TYPE TRANC": type_tranc})
+
+    def compter(self):
+        """{couche: nombre d'entités} (parcourt le réseau)."""
+        return {nom: sum(1 for _ in self.entites(nom)) for nom in COUCHES}
+
+
+def ecrire_geopackage(reseau, chemin):
+    """Écrit toutes les couches de `reseau` dans le GeoPackage `chemin` (remplacé s'il existe)."""
+    if os.path.exists(chemin):
+        os.remove(chemin)
+    crs = QgsCoordinateReferenceSystem(SCR)
+    contexte = QgsCoordinateTransformContext()
+    for nom, (type_wkb, champs_couche) in COUCHES.items():
+        noms_champs = champs_couche + CHAMPS_COMMUNS
+        champs = QgsFields()
+        for champ in noms_champs:
+            champs.append(QgsField(champ, QVariant.String))
+        options = QgsVectorFileWriter.SaveVectorOptions()
+        options.driverName = "GPKG"
+        options.layerName = nom
+        if os.path.exists(chemin):
+            options.actionOnExistingFile = QgsVectorFileWriter.CreateOrOverwriteLayer
+        ecrivain = QgsVectorFileWriter.create(chemin, champs, type_wkb, crs, contexte, options)
+        if ecrivain.hasError() != QgsVectorFileWriter.NoError:
+            raise IOError(f"{chemin} : {ecrivain.errorMessage()}")
+
+        lot = []
+        for coords, attributs in reseau.entites(nom):
+            feat = QgsFeature(champs)
+            feat.setAttributes([attributs.get(champ) for champ in noms_champs])
+            if len(coords) == 1:
+                feat.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(*coords[0])))
+            elif coords:
+                feat.setGeometry(QgsGeometry.fromPolylineXY([QgsPointXY(x, y) for x, y in coords]))
+            lot.append(feat)
+            if len(lot) >= TAILLE_LOT:
+                ecrivain.addFeatures(lot)
+                lot = []
+        ecrivain.addFeatures(lot)
+        del ecrivain  # ferme la couche
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VERIF'INFRA : réseau synthétique de test.")
+    parser.add_argument("taille", type=int, help="nombre d'entités visé, toutes couches confondues")
+    parser.add_argument("chemin", help="GeoPackage à écrire")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--taux", type=float, default=TAUX_ERREURS, help="part des chambres portant chaque erreur")
+    args = parser.parse_args(argv)
+
+    _demarrer_qgis()
+    reseau = Reseau(args.taille, args.graine, args.taux)
+    ecrire_geopackage(reseau, args.chemin)
+    print(f"{args.chemin} : {reseau.chambres} chambres")
+    for controle, n in sorted(reseau.plantees.items()):
+        print(f"  {n:>7} erreur(s) plantée(s) pour {controle}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
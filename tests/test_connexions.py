@@ -0,0 +1,23 @@
+from VERIF_INFRA.connexions import chambres_autorisees, fonction_attendue, normaliser_type
+
+
+def test_normaliser_type():
+    assert normaliser_type("  Caniveau   type a ") == "CANIVEAU TYPE A"
+    assert normaliser_type("CPP12A.L") == "CPP12A.L"
+    for valeur in (None, "", "  ", "NULL"):
+        assert normaliser_type(valeur) == ""
+
+
+def test_chambres_autorisees_sans_casse():
+    # "Buse de 10" est déclarée avec "Caniveau type A", CPS1 avec "CANIVEAU TYPE A"
+    assert "CANIVEAU TYPE A" in chambres_autorisees("buse de 10")
+    assert "CANIVEAU TYPE A" in chambres_autorisees(" cps1 ")
+    assert "PNS1" not in chambres_autorisees("CPS4")
+    assert chambres_autorisees("CPS99") is None
+
+
+def test_fonction_attendue():
+    assert fonction_attendue(0) is None
+    assert fonction_attendue(1) == "Chambre de Terminaison"
+    assert fonction_attendue(2) == "Chambre de tirage"
+    assert fonction_attendue(3) == fonction_attendue(7) == "Chambre de raccordement"
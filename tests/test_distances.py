@@ -0,0 +1,57 @@
+from VERIF_INFRA.distances import regrouper_regles, violations_regles
+
+
+class CoucheMetrique:
+    """LayerSnapshot projeté réduit à ce que lit violations_regles."""
+
+    geographique = False
+
+    def __init__(self, points_m, types=None):
+        self._points_m = points_m
+        self._types = types or {}
+
+    def metric_points(self):
+        return self._points_m
+
+    def valeur(self, fid, champ):
+        return self._types.get(fid) if champ == "TYPE" else None
+
+
+def violations(couche, regles):
+    return sorted((min(f1, f2), max(f1, f2), round(d, 3), dist_min)
+                  for f1, f2, d, dist_min in violations_regles(couche, regles))
+
+
+def test_regrouper_regles_intra_couche():
+    regles = regrouper_regles([
+        ("Chambre", "Chambre", 1.0),
+        ("Point Technique", "Point Technique", 5.0, "PT_A", "PT_B"),
+        ("Chambre", "Poteau", 2.0),
+    ])
+    assert regles == {
+        "Chambre": [(1.0, None)],
+        "Point Technique": [(5.0, frozenset({"PT_A", "PT_B"}))],
+    }
+
+
+def test_violations_regle_simple():
+    couche = CoucheMetrique({1: (0.0, 0.0), 2: (0.6, 0.8), 3: (5.0, 0.0)})
+    assert violations(couche, [(1.5, None)]) == [(1, 2, 1.0, 1.5)]
+    assert violations(couche, [(1.0, None)]) == []  # distance égale au minimum : admise
+
+
+def test_violations_regles_typees():
+    couche = CoucheMetrique({1: (0.0, 0.0), 2: (3.0, 0.0), 3: (0.0, 4.0)},
+                            {1: "PT_A", 2: "PT_B", 3: "PT_C"})
+    assert violations(couche, [(5.0, frozenset({"PT_A", "PT_B"}))]) == [(1, 2, 3.0, 5.0)]
+
+
+def test_violations_plusieurs_regles_un_balayage():
+    couche = CoucheMetrique({1: (0.0, 0.0), 2: (3.0, 0.0), 3: (0.0, 0.5)},
+                            {1: "PT_A", 2: "PT_B", 3: "PT_C"})
+    regles = [(1.0, None), (5.0, frozenset({"PT_A", "PT_B"}))]
+    assert violations(couche, regles) == [(1, 2, 3.0, 5.0), (1, 3, 0.5, 1.0)]
+
+
+def test_violations_sans_regle():
+    assert violations_regles(CoucheMetrique({1: (0.0, 0.0)}), []) == []
@@ -0,0 +1,84 @@
+import pytest
+
+from VERIF_INFRA.duplicates import detecter_doublons
+
+
+class Point:
+    def __init__(self, x, y):
+        self._x, self._y = x, y
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+
+class CouchePoints:
+    """LayerSnapshot réduit à ce que lit detecter_doublons."""
+
+    def __init__(self, nom, points, crs="EPSG:2154"):
+        self.nom = nom
+        self.points = {fid: Point(x, y) for fid, (x, y) in points.items()}
+        self.crs = crs
+        self.geographique = crs == "EPSG:4326"
+
+
+# ============================================================
+# Mode exact (tolérance nulle)
+# ============================================================
+
+def test_exact_doublons_et_superpositions():
+    chambres = CouchePoints("Chambre", {1: (10.0, 10.0), 2: (10.0, 10.0), 3: (20.0, 20.0)})
+    poteaux = CouchePoints("Poteau", {1: (20.0, 20.0), 2: (30.0, 30.0)})
+    doublons, superpositions = detecter_doublons([chambres, poteaux], [0, 0])
+    assert doublons == [(0, [1, 2])]
+    assert superpositions == [(0, 3, 1, 1)]
+
+
+def test_exact_paires_autorisees():
+    chambres = CouchePoints("Chambre", {1: (20.0, 20.0)})
+    poteaux = CouchePoints("Poteau", {1: (20.0, 20.0)})
+    assert detecter_doublons([chambres, poteaux], [0, 0], [("Poteau", "Chambre")]) == ([], [])
+
+
+def test_entite_en_doublon_pas_reprise_en_superposition():
+    chambres = CouchePoints("Chambre", {1: (10.0, 10.0), 2: (10.0, 10.0)})
+    poteaux = CouchePoints("Poteau", {1: (10.0, 10.0)})
+    doublons, superpositions = detecter_doublons([chambres, poteaux], [0, 0])
+    assert doublons == [(0, [1, 2])]
+    assert superpositions == []
+
+
+# ============================================================
+# Tolérance métrique
+# ============================================================
+
+def test_tolerance_de_proche_en_proche():
+    # 1-2 et 2-3 à 8 cm : un seul groupe, bien que 1-3 soient à 16 cm
+    chambres = CouchePoints("Chambre", {1: (0.0, 0.0), 2: (0.08, 0.0), 3: (0.16, 0.0), 4: (1.0, 0.0)})
+    assert detecter_doublons([chambres], [0.1]) == ([(0, [1, 2, 3])], [])
+
+
+def test_tolerance_la_plus_grande_entre_couches():
+    chambres = CouchePoints("Chambre", {1: (0.0, 0.0)})
+    pts = CouchePoints("Point Technique", {1: (0.08, 0.0), 2: (0.0, 0.3)})
+    assert detecter_doublons([chambres, pts], [0.1, 0.05]) == ([], [(0, 1, 1, 1)])
+
+
+def test_tolerance_en_degres_sans_arrondi():
+    # EPSG:4326 : ~0.9 m d'écart, mêmes coordonnées une fois arrondies à 5 décimales
+    proches = {1: (2.0, 48.000046), 2: (2.0, 48.000054)}
+    assert detecter_doublons([CouchePoints("Chambre", proches, "EPSG:4326")], [0.1]) == ([], [])
+    assert detecter_doublons([CouchePoints("Chambre", proches, "EPSG:4326")], [0]) == ([(0, [1, 2])], [])
+
+    # ~4 cm d'écart : sous la tolérance de 10 cm
+    assert detecter_doublons([CouchePoints("Chambre", {1: (2.0, 48.0), 2: (2.0, 48.0000004)}, "EPSG:4326")],
+                             [0.1]) == ([(0, [1, 2])], [])
+
+
+def test_scr_differents_refuses():
+    chambres = CouchePoints("Chambre", {1: (0.0, 0.0)})
+    poteaux = CouchePoints("Poteau", {1: (0.0, 0.0)}, "EPSG:4326")
+    with pytest.raises(ValueError):
+        detecter_doublons([chambres, poteaux], [0, 0])
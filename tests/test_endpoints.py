@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("qgis.core")  # endpoints -> profiling -> journal QGIS
+
+from VERIF_INFRA.endpoints import EndpointIndex  # noqa: E402
+
+
+class Point:
+    def __init__(self, x, y):
+        self._x, self._y = x, y
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+
+class CouchePoints:
+    def __init__(self, nom, points):
+        self.nom = nom
+        self.points = {fid: Point(x, y) for fid, (x, y) in points.items()}
+
+
+def test_coordonnee_exacte():
+    index = EndpointIndex(tolerance=0)
+    index.add_layer(CouchePoints("Chambre", {1: (10.0, 10.0)}))
+    index.add_layer(CouchePoints("Poteau", {4: (10.0, 10.0), 5: (20.0, 20.0)}))
+    assert index.nodes_at(Point(10.0, 10.0)) == [("Chambre", 1), ("Poteau", 4)]
+    assert index.nodes_at(Point(10.0, 10.0), {"Poteau"}) == [("Poteau", 4)]
+    assert index.nodes_at(Point(10.0, 10.000001)) == []
+
+
+def test_tolerance_cellules_voisines_ordre_d_ajout():
+    index = EndpointIndex(tolerance=0.1)
+    # Le point Poteau tombe dans une autre cellule que l'extrémité recherchée
+    index.add_layer(CouchePoints("Chambre", {1: (0.95, 0.0)}))
+    index.add_layer(CouchePoints("Poteau", {2: (1.04, 0.0), 3: (1.2, 0.0)}))
+    assert index.nodes_at(Point(1.0, 0.0)) == [("Chambre", 1), ("Poteau", 2)]
+    assert index.first_at(Point(1.0, 0.0), {"Poteau"}) == ("Poteau", 2)
+    assert index.first_at(Point(5.0, 5.0)) is None
+
+
+def test_tolerance_par_defaut_comme_qgspointxy():
+    index = EndpointIndex()
+    index.add("Site", 7, Point(100.0, 200.0))
+    assert index.first_at(Point(100.0 + 5e-9, 200.0)) == ("Site", 7)
+    assert index.first_at(Point(100.0 + 1e-6, 200.0)) is None
@@ -0,0 +1,42 @@
+from VERIF_INFRA.metric import haversine, metres_en_unites, paires_voisines
+
+
+def paires(points_m, rayon):
+    return sorted(tuple(sorted(paire)) for paire in paires_voisines(points_m, rayon))
+
+
+# ============================================================
+# paires_voisines
+# ============================================================
+
+def test_paires_dans_le_rayon_seulement():
+    points_m = {1: (0.0, 0.0), 2: (3.0, 4.0), 3: (10.0, 0.0), 4: (10.0, 4.9)}
+    assert paires(points_m, 5.0) == [(1, 2), (3, 4)]
+
+
+def test_paires_entre_cellules_voisines_une_seule_fois():
+    # Points de part et d'autre des limites de cellules, dans les 8 directions
+    points_m = {0: (4.9, 4.9)}
+    for fid, (dx, dy) in enumerate(((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)), 1):
+        points_m[fid] = (4.9 + 0.2 * dx, 4.9 + 0.2 * dy)
+    trouvees = [tuple(sorted(paire)) for paire in paires_voisines(points_m, 5.0)]
+    assert len(trouvees) == len(set(trouvees)) == 9 * 8 // 2
+
+
+def test_paires_coordonnees_negatives_et_limite_incluse():
+    points_m = {1: (-0.5, -0.5), 2: (0.5, -0.5), 3: (-0.5, 0.5)}
+    assert paires(points_m, 1.0) == [(1, 2), (1, 3)]
+
+
+def test_paires_aucun_point():
+    assert paires({}, 1.0) == []
+
+
+# ============================================================
+# Conversions
+# ============================================================
+
+def test_metres_en_unites():
+    assert metres_en_unites(5.0, False) == 5.0
+    degres = metres_en_unites(5.0, True)
+    assert abs(haversine(2.0, 48.0, 2.0, 48.0 + degres) - 5.0) < 1e-6
@@ -0,0 +1,104 @@
+from VERIF_INFRA.names import IndexProches, IndexUnicite, NomNormalise, normaliser_nom, une_faute
+
+
+def groupes(*noms):
+    index = IndexProches()
+    for nom in noms:
+        index.ajouter(nom)
+    return sorted(sorted(groupe) for groupe in index.groupes())
+
+
+class CoucheNoms:
+    """LayerSnapshot réduit aux colonnes lues par IndexUnicite."""
+
+    def __init__(self, nom, colonnes):
+        self.nom = nom
+        self._colonnes = colonnes
+
+    def a_champ(self, champ):
+        return champ in self._colonnes
+
+    def colonnes(self, champs, feedback=None):
+        n = len(next(iter(self._colonnes.values())))
+        return list(range(1, n + 1)), {champ: self._colonnes[champ] for champ in champs}
+
+
+# ============================================================
+# normaliser_nom
+# ============================================================
+
+def test_normaliser_casse_accents_separateurs_zeros():
+    assert normaliser_nom("ZR-Chàm_00012") == NomNormalise("zr_cham_#", (12,))
+    assert normaliser_nom(" zr cham 12 ") == normaliser_nom("ZR-Chàm_00012")
+
+
+def test_normaliser_vide():
+    for valeur in (None, "", "   ", "NULL", "-_-"):
+        assert normaliser_nom(valeur) is None
+
+
+# ============================================================
+# une_faute
+# ============================================================
+
+def test_une_faute_dans_un_mot_long():
+    assert une_faute("zr_cham_#", "zr_chm_#")      # lettre en moins
+    assert une_faute("zr_cham_#", "zr_chaam_#")    # lettre en trop
+    assert une_faute("zr_cham_#", "zr_chem_#")     # lettre remplacée
+    assert une_faute("zr_cham_#", "zr_hcam_#")     # lettres inversées
+
+
+def test_une_faute_refusee_dans_un_mot_court():
+    # Le préfixe ZR- ne compte pas : seules les lettres du mot modifié comptent
+    assert not une_faute("zr_pot_#", "zr_pt_#")
+    assert not une_faute("zr_pc_#", "zr_pt_#")
+    assert not une_faute("zr_pt_#", "zr_tp_#")
+
+
+def test_une_faute_refusee_au_dela_d_une_lettre():
+    assert not une_faute("zr_cham_#", "zr_chmp_#")
+    assert not une_faute("zr_cham_#", "zr_ch_#")
+
+
+# ============================================================
+# IndexProches : schéma de renommage ZR-<type>_<numéro>
+# ============================================================
+
+def test_proches_variantes_d_ecriture():
+    assert groupes("ZR-Cham_00001", "zr_cham_1", "ZR-Chàm-001") == [["ZR-Cham_00001", "ZR-Chàm-001", "zr_cham_1"]]
+
+
+def test_proches_faute_de_frappe():
+    assert groupes("ZR-Cham_00007", "ZR-Chm_00007", "ZR-Cham_00008") == [["ZR-Cham_00007", "ZR-Chm_00007"]]
+
+
+def test_proches_types_courts_distincts():
+    assert groupes("ZR-Pot_00001", "ZR-PT_00001", "ZR-PC_00004", "ZR-PT_00004") == []
+
+
+def test_proches_numeros_differents():
+    assert groupes("ZR-Cham_00001", "ZR-Cham_00002", "ZR-Cham_00010") == []
+
+
+# ============================================================
+# IndexUnicite
+# ============================================================
+
+def test_unicite_noms_entre_couches_et_ids_par_couche():
+    index = IndexUnicite()
+    chambres = CoucheNoms("Chambre", {"NOM": ["ZR-Cham_00001", "ZR-Cham_00002", None], "id": [1, 2, 1]})
+    poteaux = CoucheNoms("Poteau", {"NOM": ["ZR-Cham_00001", "ZR-Pot_00001"], "id": [1, 2]})
+    sans_champ = CoucheNoms("Site", {"CODE": ["S1"]})
+    assert index.ajouter(chambres)
+    assert index.ajouter(poteaux)
+    assert not index.ajouter(sans_champ)
+
+    (nom,) = index.doublons_noms()
+    assert nom.valeur == "ZR-Cham_00001"
+    assert [(couche.nom, fids) for couche, fids in nom.occurrences] == [("Chambre", [1]), ("Poteau", [1])]
+
+    (ident,) = index.doublons_ids()
+    assert (ident.champ, ident.valeur) == ("id", "1")
+    assert [(couche.nom, fids) for couche, fids in ident.occurrences] == [("Chambre", [1, 3])]
+
+    assert index.noms_proches() == []
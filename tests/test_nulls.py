@@ -0,0 +1,56 @@
+from collections import Counter
+
+from VERIF_INFRA.nulls import est_vide, scanner_nulls
+
+
+class Champs:
+    def __init__(self, noms):
+        self._noms = noms
+
+    def names(self):
+        return list(self._noms)
+
+
+class CoucheColonnes:
+    """LayerSnapshot réduit aux colonnes lues par scanner_nulls."""
+
+    def __init__(self, fids, colonnes):
+        self.fields = Champs(colonnes)
+        self._fids = fids
+        self._colonnes = colonnes
+
+    def colonnes(self, champs, feedback=None):
+        return list(self._fids), {champ: self._colonnes[champ] for champ in champs}
+
+
+class Null:
+    """Valeur NULL d'un attribut QGIS (QVariant nul), affichée 'NULL'."""
+
+    def __str__(self):
+        return "NULL"
+
+
+def test_est_vide():
+    for valeur in (None, "", "  ", "null", " NULL ", Null()):
+        assert est_vide(valeur)
+    for valeur in (0, 0.0, False, "0", "PNS1"):
+        assert not est_vide(valeur)
+
+
+def test_scanner_nulls():
+    couche = CoucheColonnes([10, 20, 30], {
+        "NOM": ["A", "", "C"],
+        "TYPE": ["PNS1", "PNS1", None],
+        "PROF": [0, 1.5, Null()],
+        "ID": [1, 2, 3],
+    })
+    scan = scanner_nulls(couche, exclus=("ID",), compter=("TYPE",))
+    assert scan.vides == {"NOM": [20], "TYPE": [30], "PROF": [30]}
+    assert scan.incompletes == [20, 30]
+    assert scan.frequences == {"TYPE": Counter({"PNS1": 2})}
+
+
+def test_scanner_nulls_couche_complete():
+    couche = CoucheColonnes([1, 2], {"NOM": ["A", "B"]})
+    scan = scanner_nulls(couche)
+    assert (scan.vides, scan.incompletes, scan.frequences) == ({}, [], {})